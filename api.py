@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+import metrics
+from translations import TRANSLATIONS
+from engine import ACTIVITY_ORDER, ACTIVITY_META, make_inputs, calculate_rows, summarize, get_activity_label, uncertainty_ranges
+from factor_registry import factors_for
+from pdf_cache import PDF_CACHE, PDF_SPOOL, pdf_cache_key, results_digest, spooled, render_to_file, iter_file
+from evidence import get_evidence_store
+
+# --- HEADLESS HTTP API (ASGI) ---
+# POST /v1/assessments       Step 1 + Step 2 fields as JSON -> totals and detail rows
+# POST /v1/assessments/pdf   same body -> Carbon Pack PDF (large reports are streamed from the on-disk spool)
+# POST /v1/evidence?name=f   raw file body, streamed to the evidence store -> {"name", "sha256", "size"};
+#                            reference it from an assessment as "evidence": [{"name": ..., "sha256": ...}]
+# "uncertainty": true in the body adds Monte Carlo 95% ranges (~30 ms of CPU per request)
+# Calculations run on a thread, build_pdf in a process pool. Each stage admits a bounded
+# number of requests and queues a bounded number more; beyond that the API answers 503.
+API_WORKERS = int(os.environ.get("ESG_API_WORKERS", 0)) or os.cpu_count() or 1
+MAX_INFLIGHT_CALC = int(os.environ.get("ESG_API_MAX_INFLIGHT_CALC", 64))
+MAX_INFLIGHT_PDF = int(os.environ.get("ESG_API_MAX_INFLIGHT_PDF", 0)) or API_WORKERS * 4
+MAX_QUEUED = int(os.environ.get("ESG_API_MAX_QUEUED", 512))
+QUEUE_TIMEOUT_S = float(os.environ.get("ESG_API_QUEUE_TIMEOUT_S", 10))
+MAX_BODY_BYTES = int(os.environ.get("ESG_API_MAX_BODY_BYTES", 64 * 1024))
+MAX_EVIDENCE_BYTES = int(os.environ.get("ESG_API_MAX_EVIDENCE_BYTES", 1024 * 1024 * 1024))
+RETRY_AFTER_S = 1
+
+DEFAULTS = {"country": "France", "year": "2025", "currency": "EUR", "lang": "fr", "evidence": []}
+
+class Overloaded(Exception):
+    pass
+
+class Admission:
+    # Concurrency gate with a bounded wait queue: callers beyond limit + max_queued, or that
+    # wait longer than timeout, are turned away instead of piling up on the event loop.
+    def __init__(self, name, limit, max_queued=MAX_QUEUED, timeout=QUEUE_TIMEOUT_S):
+        self.name = name
+        self.limit = limit
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._sem = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._sem.locked() and self.queued >= self.max_queued:
+            metrics.inc("esg_api_rejected_total", stage=self.name, reason="queue_full")
+            raise Overloaded(f"{self.name} queue full")
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            metrics.inc("esg_api_rejected_total", stage=self.name, reason="timeout")
+            raise Overloaded(f"{self.name} queue timeout")
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._sem.release()
+
+# --- 1. REQUEST PARSING (SAME RULES AS STEPS 1-2 OF THE APP) ---
+def _number(value, field):
+    # JSON number (or numeric string) -> finite float; booleans, NaN and Infinity are rejected
+    if isinstance(value, bool): raise ValueError(f"{field} must be a number")
+    try:
+        x = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+    if not math.isfinite(x): raise ValueError(f"{field} must be a finite number")
+    return x
+
+def _text(rec, field, allow_int=False):
+    value = rec.get(field)
+    if value is None: return ""
+    if isinstance(value, str) or (allow_int and isinstance(value, int) and not isinstance(value, bool)): return str(value)
+    raise ValueError(f"{field} must be a string")
+
+def parse_assessment(payload):
+    if not isinstance(payload, dict): raise ValueError("JSON object expected")
+    rec = {**DEFAULTS, **payload}
+    for field in ("lang", "country", "currency", "company", "signer"): _text(rec, field)
+    lang = rec["lang"] if rec["lang"] in TRANSLATIONS else "fr"
+    T = TRANSLATIONS[lang]
+    revenue = _number(rec.get("revenue"), "revenue")
+    company = _text(rec, "company").strip().upper()
+    signer = _text(rec, "signer").strip()
+    if not company or revenue <= 0: raise ValueError(T["err_company"])
+    if len(signer) < 3: raise ValueError(T["err_signer"])
+
+    activities = rec.get("activities") or {}
+    if not isinstance(activities, dict): raise ValueError("activities must be an object of key: quantity")
+    unknown = sorted(set(activities) - set(ACTIVITY_ORDER))
+    if unknown: raise ValueError(f"unknown activity keys: {', '.join(unknown)}")
+    quantities = {}
+    for k in ACTIVITY_ORDER:
+        q = _number(activities.get(k), f"{k}: quantity")
+        if q < 0: raise ValueError(f"{k}: quantity must be >= 0")
+        quantities[k] = q
+
+    evidence = rec["evidence"]
+    if isinstance(evidence, str): evidence = evidence.split(";")
+    if not isinstance(evidence, list): raise ValueError("evidence must be a list")
+    files = []
+    for e in evidence:
+        if isinstance(e, dict):
+            ref = get_evidence_store().ref(str(e.get("sha256") or "").lower(), e.get("name"))
+            if ref is None: raise ValueError(f"unknown evidence sha256: {e.get('sha256')}")
+            files.append(ref)
+        elif str(e).strip():
+            files.append(str(e).strip())
+    year = _text(rec, "year", allow_int=True).strip()
+    if not year.isdigit(): raise ValueError("year must be a number, e.g. 2025")
+    return {
+        "company": company, "country": _text(rec, "country"), "year": year, "revenue": revenue,
+        "currency": _text(rec, "currency"), "signer": signer, "lang": lang,
+        "evidence": files, "quantities": quantities,
+        "uncertainty": bool(rec.get("uncertainty")),
+    }
+
+def assess(rec):
+    inputs = make_inputs(rec["quantities"])
+    factors = factors_for(rec["country"], rec["year"])
+    df = calculate_rows(inputs, factors)
+    ranges = uncertainty_ranges(df, factors) if rec["uncertainty"] else None
+    return df, summarize(df), [k for k, v in inputs.items() if v.quantity > 0], ranges
+
+def pdf_args(rec, df, totals, input_keys, ranges):
+    return (rec["company"], rec["country"], rec["year"], rec["revenue"], rec["currency"],
+            df, totals, rec["evidence"], rec["signer"], input_keys, rec["lang"], ranges)
+
+def _warm_worker():
+    # Pay for ReportLab and both templates once per worker, not on its first request
+    from report import get_template
+    for lang in TRANSLATIONS: get_template(lang)
+
+def _render(args):
+    from report import build_pdf
+    return build_pdf(*args)
+
+# --- 2. SERVICE ---
+class ReportService:
+    def __init__(self, workers=API_WORKERS):
+        self.workers = workers
+        self.pool = None
+        self.calc_gate = Admission("calc", MAX_INFLIGHT_CALC)
+        self.pdf_gate = Admission("pdf", MAX_INFLIGHT_PDF)
+        self._building = {}  # cache key -> future, so identical concurrent requests render once
+
+    def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+
+    def stop(self):
+        if self.pool is not None: self.pool.shutdown(wait=True, cancel_futures=True)
+        self.pool = None
+
+    async def assess(self, rec):
+        async with self.calc_gate.slot():
+            return await asyncio.to_thread(assess, rec)
+
+    async def pdf(self, rec):
+        # -> (PDF bytes or spooled file path, totals)
+        df, totals, input_keys, ranges = await self.assess(rec)
+        args = pdf_args(rec, df, totals, input_keys, ranges)
+        key = pdf_cache_key(*args, digest=results_digest(df))
+        large = spooled(df)
+        data = PDF_SPOOL.get(key) if large else PDF_CACHE.get(key)
+        if data is not None: return data, totals
+        # One render task per key, owned by no request: a client that disconnects cancels only its own
+        # wait, and the render still finishes and fills the cache for the others
+        task = self._building.get(key)
+        if task is None:
+            task = self._building[key] = asyncio.ensure_future(self._render_shared(key, args, large))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())  # retrieved even with no waiters left
+        return await asyncio.shield(task), totals
+
+    async def _render_shared(self, key, args, large):
+        tmp = None
+        try:
+            async with self.pdf_gate.slot():
+                if large:
+                    # The worker writes the file itself: no PDF bytes cross the process boundary
+                    tmp = PDF_SPOOL.new_file()
+                    await asyncio.get_running_loop().run_in_executor(self.pool, render_to_file, args, tmp)
+                    return PDF_SPOOL.add(key, tmp)
+                data = await asyncio.get_running_loop().run_in_executor(self.pool, _render, args)
+            PDF_CACHE.put(key, data)
+            return data
+        finally:
+            self._building.pop(key, None)
+            if tmp is not None and os.path.exists(tmp): os.remove(tmp)  # failed or cancelled before add() renamed it
+
+SERVICE = ReportService()
+
+@metrics.register_collector
+def _api_gauges():
+    out = []
+    for gate in (SERVICE.calc_gate, SERVICE.pdf_gate):
+        out.append(("esg_api_in_flight", {"stage": gate.name}, gate.in_flight))
+        out.append(("esg_api_queued", {"stage": gate.name}, gate.queued))
+    return out
+
+# --- 3. ROUTES ---
+def error(status, message, **headers):
+    metrics.inc("esg_api_errors_total", status=status)
+    return JSONResponse({"error": message}, status_code=status, headers=headers or None)
+
+async def read_assessment(request):
+    if int(request.headers.get("content-length") or 0) > MAX_BODY_BYTES: raise OverflowError
+    body = await request.body()
+    if len(body) > MAX_BODY_BYTES: raise OverflowError
+    return parse_assessment(json.loads(body or b"{}"))
+
+def handles_errors(handler):
+    async def endpoint(request):
+        try:
+            with metrics.timer("esg_api_request_seconds", route=request.url.path):
+                return await handler(request)
+        except OverflowError:
+            return error(413, f"request body exceeds {MAX_BODY_BYTES} bytes")
+        except json.JSONDecodeError as e:
+            return error(400, f"invalid JSON: {e}")
+        except ValueError as e:
+            return error(400, str(e))
+        except Overloaded as e:
+            return error(503, str(e), **{"Retry-After": str(RETRY_AFTER_S)})
+    return endpoint
+
+@handles_errors
+async def post_assessment(request):
+    rec = await read_assessment(request)
+    df, totals, _, ranges = await SERVICE.assess(rec)
+    rows = df.records(rec["lang"])
+    intensity = totals["total"] / rec["revenue"]
+    out = {"company": rec["company"], "country": rec["country"], "year": rec["year"],
+           "currency": rec["currency"], "lang": rec["lang"], "totals": totals,
+           "carbon_intensity": intensity, "rows": rows}
+    if ranges is not None: out["uncertainty_95"] = {k: list(v) for k, v in ranges.items()}
+    return JSONResponse(out)
+
+@handles_errors
+async def post_assessment_pdf(request):
+    rec = await read_assessment(request)
+    data, totals = await SERVICE.pdf(rec)
+    headers = {
+        "Content-Disposition": 'attachment; filename="Carbon_Pack.pdf"',
+        "X-Total-kgCO2e": f"{totals['total']:.2f}",
+    }
+    if isinstance(data, str):
+        # Spooled report: streamed from disk in chunks
+        return StreamingResponse(iterate_in_threadpool(iter_file(data)), media_type="application/pdf", headers=headers)
+    return Response(data, media_type="application/pdf", headers=headers)
+
+@handles_errors
+async def post_evidence(request):
+    # The body is never held whole: each received chunk is hashed and appended to a temp file
+    if int(request.headers.get("content-length") or 0) > MAX_EVIDENCE_BYTES:
+        return error(413, f"evidence file exceeds {MAX_EVIDENCE_BYTES} bytes")
+    writer = await asyncio.to_thread(get_evidence_store().writer, MAX_EVIDENCE_BYTES)
+    try:
+        async for chunk in request.stream():
+            if chunk: await asyncio.to_thread(writer.write, chunk)
+    except OverflowError as e:
+        return error(413, str(e))
+    except BaseException:
+        writer.abort()
+        raise
+    ref, duplicate = await asyncio.to_thread(writer.commit, request.query_params.get("name"))
+    return JSONResponse({"name": ref.name, "sha256": ref.sha256, "size": ref.size, "duplicate": duplicate},
+                        status_code=200 if duplicate else 201)
+
+async def get_activities(request):
+    lang = request.query_params.get("lang", "fr")
+    if lang not in TRANSLATIONS: lang = "fr"
+    return JSONResponse([{"key": k, "label": get_activity_label(k, lang), "unit": ACTIVITY_META[k][0],
+                          "category": ACTIVITY_META[k][1]} for k in ACTIVITY_ORDER])
+
+async def get_health(request):
+    return JSONResponse({"status": "ok", "workers": SERVICE.workers})
+
+async def get_metrics(request):
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@asynccontextmanager
+async def lifespan(app):
+    SERVICE.start()
+    try:
+        yield
+    finally:
+        SERVICE.stop()
+
+app = Starlette(lifespan=lifespan, routes=[
+    Route("/v1/assessments", post_assessment, methods=["POST"]),
+    Route("/v1/assessments/pdf", post_assessment_pdf, methods=["POST"]),
+    Route("/v1/evidence", post_evidence, methods=["POST"]),
+    Route("/v1/activities", get_activities, methods=["GET"]),
+    Route("/health", get_health, methods=["GET"]),
+    Route("/metrics", get_metrics, methods=["GET"]),
+])
+
+def main(argv=None):
+    import uvicorn
+    p = argparse.ArgumentParser(description="Serve the ESG calculation / Carbon Pack API.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    args = p.parse_args(argv)
+    # One event loop per process; PDF rendering scales through the worker pool (ESG_API_WORKERS)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", backlog=2048)
+
+if __name__ == "__main__":
+    main()
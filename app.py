@@ -1,570 +1,41 @@
+import hashlib
 import streamlit as st
-import pandas as pd
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, KeepTogether
-from datetime import datetime
-from dataclasses import dataclass
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from perf_budget import start_rerun, finish_rerun
+import metrics
+from translations import TRANSLATIONS, LANGUAGE_NAMES
+# pandas (engine, importer, store) and ReportLab (report) are imported where first needed,
+# so a fresh worker draws Step 1 without paying for them. Modules load once per process.
 
-# --- 1. TRANSLATION ENGINE ---
-TRANSLATIONS = {
-    "en": {
-        "title": "🏢 Supplier ESG Enterprise OS",
-        "caption": "Aligned with GHG Protocol (Scope 1, 2 & Business Travel)",
-        "sidebar_lang": "Language / Langue",
-        "step1_header": "Step 1: Company Profile",
-        "company_label": "Company Legal Name",
-        "country_label": "Site Country",
-        "country_default": "France",
-        "year_label": "Reporting Period",
-        "revenue_label": "Annual Revenue",
-        "currency_label": "Currency",
-        "btn_start": "Start Assessment",
-        "err_company": "Company Name and Revenue are required.",
-        
-        "step2_header": "Step 2: Activity Data",
-        "s1_header": "🔥 Scope 1: Direct Emissions",
-        "s1_stat": "**Stationary Combustion**",
-        "gas_label": "Natural Gas (kWh)",
-        "oil_label": "Heating Oil (Liters)",
-        "propane_label": "Propane (kg)",
-        "s1_mobile": "**Mobile Combustion (Company Fleet)**",
-        "diesel_label": "Fleet Diesel (Liters)",
-        "petrol_label": "Fleet Petrol (Liters)",
-        "s1_fugitive": "**Fugitive Emissions (Refrigerants)**",
-        "r410a_label": "R410A Refill (kg)",
-        "r32_label": "R32 Refill (kg)",
-        "r134a_label": "R134a Refill (kg)",
-        "s2_header": "⚡ Scope 2: Indirect Energy",
-        "elec_label": "Electricity (kWh)",
-        "heat_label": "District Heating (kWh)",
-        
-        "s3_header": "✈️ Scope 3: Business Travel",
-        "s3_desc": "Business travel not covered in Scope 1 (Grey Fleet, Flights, Hotels).",
-        "grey_label": "Employee Vehicles (km driven)",
-        "flight_label": "Business Flights (km flown)",
-        "hotel_label": "Hotel Nights (number of nights)",
-        
-        "upload_label": "Upload Evidence",
-        "signer_label": "Full Legal Name of Authorized Signer (e.g. Jean Dupont)",
-        "btn_gen": "Generate Report",
-        "err_signer": "Please enter a valid full name for the attestation signature.",
-        
-        "step3_header": "Step 3: Validated",
-        "total_footprint": "Total Footprint",
-        "btn_download": "Download Corporate Carbon Pack (PDF)",
-        "btn_new": "New Assessment",
-        
-        # PDF Content
-        "pdf_title": "CORPORATE CARBON FOOTPRINT DECLARATION",
-        "pdf_method": "Methodology Aligned with GHG Protocol & ISO 14064-1",
-        "pdf_date": "Date:",
-        "pdf_company": "Company Name:",
-        "pdf_country": "Site Country:",
-        "pdf_period": "Reporting Period:",
-        "pdf_revenue": "Annual Revenue:",
-        "pdf_boundary_title": "BOUNDARY STATEMENT:",
-        "pdf_boundary_text": """
-        This report covers <b>Scope 1</b> (Direct), <b>Scope 2</b> (Energy Indirect), and selected <b>Scope 3</b> 
-        (Business Travel/Grey Fleet). Excludes upstream/downstream Scope 3 categories unless noted.
-        Calculations use <b>ADEME Base Carbone</b> emission factors.
-        """,
-        "pdf_summary_title": "EMISSIONS SUMMARY",
-        "pdf_col_metric": "METRIC",
-        "pdf_col_value": "VALUE",
-        "pdf_s1": "Scope 1 (Direct Emissions)",
-        "pdf_s2": "Scope 2 (Indirect Energy)",
-        "pdf_s3": "Scope 3 (Business Travel)",
-        "pdf_total": "TOTAL FOOTPRINT",
-        "pdf_intensity": "CARBON INTENSITY",
-        "pdf_detail_title": "Detailed Breakdown:",
-        "pdf_tab_scope": "Scope",
-        "pdf_tab_act": "Activity",
-        "pdf_tab_qty": "Qty",
-        "pdf_tab_emi": "Emissions (kg)",
-        
-        "pdf_evidence_title": "Evidence & Assurance:",
-        "pdf_assurance_level": "<b>Assurance Level:</b> Limited (self-attested, document trail available)",
-        "pdf_doc_retained": "<b>Supporting documentation retained by supplier:</b>",
-        "pdf_no_mat": "No material emissions reported.",
-        "pdf_avail": "Available upon buyer request",
-        "pdf_attached": "digital files attached",
-        "pdf_no_files": "No digital files attached",
-        
-        "pdf_attest_title": "ATTESTATION:",
-        "pdf_attest_text": "I, <b>{signer}</b>, certify that the activity data and revenue provided are accurate to the best of my knowledge.",
-        "pdf_sig": "Authorized Signature",
-        
-        # DISCLAIMER POINTS
-        "pdf_disc_title": "DISCLAIMER & LIMITATIONS:",
-        "disc_p1": "<b>Methodology:</b> Calculations use supplier-provided activity data and ADEME Base Carbone v23.0 emission factors.",
-        "disc_p2": "<b>Assurance:</b> This report is self-declared and has not been independently verified.",
-        "disc_p3_intro": "<b>Boundary Exclusions:</b> The following sources were assessed but excluded due to zero reported activity:",
-        "disc_p3_none": "<b>Boundary Exclusions:</b> None (All standard boundary categories were reported).",
-        "disc_p4": "<b>Liability:</b> Buyers must conduct due diligence for CSRD reporting compliance.",
-        "disc_p5": "<b>Verification:</b> For third-party verification inquiries, contact <b>verify@vsme.io</b>",
-        
-        "footer_l1": "Generated by VSME Supplier ESG OS",
-        "footer_l2": "Aligned with GHG Protocol & ISO 14064-1 quantification methodologies.",
-        "footer_l3": "Supports CSRD ESRS E1 quantitative reporting requirements.",
-        "footer_l4": "Emission Factors: ADEME Base Carbone v23.0 (France)",
-        
-        # Evidence Labels
-        "ev_gas": "Natural Gas Invoices",
-        "ev_oil": "Heating Oil Purchase Receipts",
-        "ev_prop": "Propane Purchase Receipts",
-        "ev_diesel": "Fuel Logs/Receipts (Diesel)",
-        "ev_petrol": "Fuel Logs/Receipts (Petrol)",
-        "ev_hvac": "HVAC Maintenance Log (Refrigerants)",
-        "ev_elec": "Electricity Utility Invoices",
-        "ev_heat": "District Heating Invoices",
-        "ev_travel": "Mileage Claims / Travel Logs",
-        "ev_flight": "Flight Tickets / Travel Agency Reports",
-        "ev_hotel": "Hotel Invoices / Expense Reports",
-        
-        # Exclusions Labels
-        "ex_gas": "Natural Gas",
-        "ex_oil": "Heating Oil",
-        "ex_prop": "Propane",
-        "ex_diesel": "Fleet Diesel",
-        "ex_petrol": "Fleet Petrol",
-        "ex_ref": "Fugitive Emissions (Refrigerants)",
-        "ex_elec": "Electricity",
-        "ex_heat": "District Heating",
-        "ex_grey": "Employee Vehicles",
-        "ex_flight": "Business Flights",
-        "ex_hotel": "Hotel Nights"
-    },
-    
-    "fr": {
-        "title": "🏢 VSME Enterprise OS (RSE Fournisseur)",
-        "caption": "Aligné avec le GHG Protocol (Scope 1, 2 & Déplacements Pro)",
-        "sidebar_lang": "Langue / Language",
-        "step1_header": "Étape 1 : Profil de l'Entreprise",
-        "company_label": "Raison Sociale",
-        "country_label": "Pays du Site",
-        "country_default": "France",
-        "year_label": "Période de Reporting",
-        "revenue_label": "Chiffre d'Affaires Annuel",
-        "currency_label": "Devise",
-        "btn_start": "Commencer l'évaluation",
-        "err_company": "Le nom de l'entreprise et le CA sont requis.",
-        
-        "step2_header": "Étape 2 : Données d'Activité",
-        "s1_header": "🔥 Scope 1 : Émissions Directes",
-        "s1_stat": "**Combustion Stationnaire**",
-        "gas_label": "Gaz Naturel (kWh)",
-        "oil_label": "Fioul Domestique (Litres)",
-        "propane_label": "Propane (kg)",
-        "s1_mobile": "**Combustion Mobile (Flotte Entreprise)**",
-        "diesel_label": "Diesel Flotte (Litres)",
-        "petrol_label": "Essence Flotte (Litres)",
-        "s1_fugitive": "**Émissions Fugitives (Frigorifiques)**",
-        "r410a_label": "Recharge R410A (kg)",
-        "r32_label": "Recharge R32 (kg)",
-        "r134a_label": "Recharge R134a (kg)",
-        "s2_header": "⚡ Scope 2 : Énergie Indirecte",
-        "elec_label": "Électricité (kWh)",
-        "heat_label": "Chauffage Urbain (kWh)",
-        
-        "s3_header": "✈️ Scope 3 : Déplacements Pro",
-        "s3_desc": "Déplacements non inclus dans le Scope 1 (Véhicules Perso, Vols, Hôtels).",
-        "grey_label": "Véhicules Salariés (km parcourus)",
-        "flight_label": "Vols Affaires (km parcourus)",
-        "hotel_label": "Nuitées d'Hôtel (nombre de nuits)",
-        
-        "upload_label": "Télécharger Justificatifs",
-        "signer_label": "Nom complet du signataire autorisé (ex: Jean Dupont)",
-        "btn_gen": "Générer le Rapport",
-        "err_signer": "Veuillez entrer un nom valide pour la signature.",
-        
-        "step3_header": "Étape 3 : Validation",
-        "total_footprint": "Empreinte Totale",
-        "btn_download": "Télécharger le Pack Carbone (PDF)",
-        "btn_new": "Nouvelle Évaluation",
-        
-        # PDF Content
-        "pdf_title": "DÉCLARATION D'EMPREINTE CARBONE",
-        "pdf_method": "Méthodologie alignée avec GHG Protocol & ISO 14064-1",
-        "pdf_date": "Date :",
-        "pdf_company": "Entreprise :",
-        "pdf_country": "Pays du Site :",
-        "pdf_period": "Période :",
-        "pdf_revenue": "Chiffre d'Affaires :",
-        "pdf_boundary_title": "DÉCLARATION DE PÉRIMÈTRE :",
-        "pdf_boundary_text": """
-        Ce rapport couvre le <b>Scope 1</b> (Direct), le <b>Scope 2</b> (Énergie Indirecte), et le <b>Scope 3</b> 
-        sélectionné (Déplacements Pro : Véhicules/Vols/Hôtels). Exclut les autres catégories Scope 3.
-        Calculs basés sur les facteurs d'émission <b>ADEME Base Carbone</b>.
-        """,
-        "pdf_summary_title": "RÉSUMÉ DES ÉMISSIONS",
-        "pdf_col_metric": "MÉTRIQUE",
-        "pdf_col_value": "VALEUR",
-        "pdf_s1": "Scope 1 (Émissions Directes)",
-        "pdf_s2": "Scope 2 (Énergie Indirecte)",
-        "pdf_s3": "Scope 3 (Déplacements Pro)",
-        "pdf_total": "EMPREINTE TOTALE",
-        "pdf_intensity": "INTENSITÉ CARBONE",
-        "pdf_detail_title": "Détail des Calculs :",
-        "pdf_tab_scope": "Scope",
-        "pdf_tab_act": "Activité",
-        "pdf_tab_qty": "Qté",
-        "pdf_tab_emi": "Émissions (kg)",
-        
-        "pdf_evidence_title": "Preuves & Assurance :",
-        "pdf_assurance_level": "<b>Niveau d'Assurance :</b> Limité (auto-déclaratif, traçabilité documentaire disponible)",
-        "pdf_doc_retained": "<b>Documentation justificative conservée par le fournisseur :</b>",
-        "pdf_no_mat": "Aucune émission significative déclarée.",
-        "pdf_avail": "Disponible sur demande de l'acheteur",
-        "pdf_attached": "fichiers joints",
-        "pdf_no_files": "Aucun fichier numérique joint",
-        
-        "pdf_attest_title": "ATTESTATION SUR L'HONNEUR :",
-        "pdf_attest_text": "Je soussigné(e), <b>{signer}</b>, certifie que les données d'activité et le CA fournis sont exacts et sincères.",
-        "pdf_sig": "Signature Autorisée",
-        
-        # DISCLAIMER POINTS
-        "pdf_disc_title": "AVERTISSEMENT & LIMITATIONS :",
-        "disc_p1": "<b>Méthodologie :</b> Les calculs utilisent les données d'activité fournies par le fournisseur et les facteurs ADEME Base Carbone v23.0.",
-        "disc_p2": "<b>Assurance :</b> Ce rapport est auto-déclaratif et n'a pas fait l'objet d'une vérification indépendante.",
-        "disc_p3_intro": "<b>Exclusions :</b> Les sources suivantes ont été évaluées mais exclues en raison d'une activité nulle déclarée :",
-        "disc_p3_none": "<b>Exclusions :</b> Aucune (Toutes les catégories standard ont été déclarées).",
-        "disc_p4": "<b>Responsabilité :</b> Les acheteurs doivent effectuer leurs propres vérifications pour la conformité CSRD.",
-        "disc_p5": "<b>Vérification :</b> Pour toute demande de vérification tierce, contacter <b>verify@vsme.io</b>",
-        
-        "footer_l1": "Généré par VSME Supplier ESG OS",
-        "footer_l2": "Aligné avec les méthodologies de quantification GHG Protocol & ISO 14064-1.",
-        "footer_l3": "Supporte les exigences de reporting quantitatif CSRD ESRS E1.",
-        "footer_l4": "Facteurs d'Émission : ADEME Base Carbone v23.0 (France)",
-        
-        # Evidence Labels
-        "ev_gas": "Factures de Gaz Naturel",
-        "ev_oil": "Factures d'achat Fioul",
-        "ev_prop": "Factures d'achat Propane",
-        "ev_diesel": "Relevés/Factures Carburant (Diesel)",
-        "ev_petrol": "Relevés/Factures Carburant (Essence)",
-        "ev_hvac": "Carnet d'entretien CVC (Fluides Frigorigènes)",
-        "ev_elec": "Factures d'Électricité",
-        "ev_heat": "Factures Chauffage Urbain",
-        "ev_travel": "Notes de Frais / Relevés Kilométriques",
-        "ev_flight": "Billets d'Avion / Relevés Agence",
-        "ev_hotel": "Factures d'Hôtel / Notes de Frais",
-        
-        # Exclusions Labels
-        "ex_gas": "Gaz Naturel",
-        "ex_oil": "Fioul Domestique",
-        "ex_prop": "Propane",
-        "ex_diesel": "Diesel Flotte",
-        "ex_petrol": "Essence Flotte",
-        "ex_ref": "Émissions Fugitives (Refrigérants)",
-        "ex_elec": "Électricité",
-        "ex_heat": "Chauffage Urbain",
-        "ex_grey": "Véhicules Salariés",
-        "ex_flight": "Vols Affaires",
-        "ex_hotel": "Nuitées d'Hôtel"
-    }
-}
-
-# --- 2. DATA CLASSES & LOGIC ---
-@dataclass
-class ActivityInput:
-    key: str 
-    quantity: float
-    unit: str
-    category: str
-
-@dataclass
-class Factor:
-    key: str
-    value: float
-    unit: str
-    source: str
-    id: str
+RERUN_STARTED = start_rerun()
 
-def get_activity_label(key, lang):
-    map_keys = {
-        "natural_gas": "gas_label", "heating_oil": "oil_label", "propane": "propane_label",
-        "diesel": "diesel_label", "petrol": "petrol_label",
-        "ref_R410A": "r410a_label", "ref_R32": "r32_label", "ref_R134a": "r134a_label",
-        "electricity_fr": "elec_label", "district_heat": "heat_label",
-        "grey_fleet_avg": "grey_label", "flight_avg": "flight_label", "hotel_night_avg": "hotel_label"
-    }
-    t_key = map_keys.get(key, key)
-    raw_label = TRANSLATIONS[lang].get(t_key, key)
-    return raw_label.split("(")[0].strip()
-
-def calculate_emissions(inputs, factors, lang):
-    rows = []
-    # Force Scope Order for Table: S1 -> S2 -> S3
-    order = [
-        "natural_gas", "heating_oil", "propane", "diesel", "petrol", "ref_R410A", "ref_R32", "ref_R134a", # S1
-        "electricity_fr", "district_heat", # S2
-        "grey_fleet_avg", "flight_avg", "hotel_night_avg" # S3
-    ]
-    
-    for key in order:
-        if key in inputs:
-            act = inputs[key]
-            if act.quantity <= 0: continue
-            
-            factor = factors.get(key)
-            if not factor: continue
-            
-            emissions = act.quantity * factor.value
-            display_label = get_activity_label(key, lang)
-            
-            rows.append({
-                "Scope": act.category.split(" - ")[0], 
-                "Category": act.category,
-                "Activity": display_label,
-                "Quantity": act.quantity,
-                "Unit": act.unit,
-                "FactorRef": f"{factor.value} ({factor.unit})",
-                "Emissions_kgCO2e": emissions,
-                "Source": f"{factor.source} [{factor.id}]"
-            })
-    return pd.DataFrame(rows)
-
-def summarize(df):
-    if df.empty: return {"scope1": 0.0, "scope2": 0.0, "scope3": 0.0, "total": 0.0}
-    s1 = df[df["Scope"] == "Scope 1"]["Emissions_kgCO2e"].sum()
-    s2 = df[df["Scope"] == "Scope 2"]["Emissions_kgCO2e"].sum()
-    s3 = df[df["Scope"] == "Scope 3"]["Emissions_kgCO2e"].sum()
-    return {"scope1": s1, "scope2": s2, "scope3": s3, "total": s1 + s2 + s3}
-
-# --- 3. PDF GENERATOR ---
-def build_pdf(company_name, country, year, revenue, currency, df, totals, evidence_files, signer_name, input_keys, lang):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"Carbon Footprint - {company_name}", topMargin=30, bottomMargin=60)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    T = TRANSLATIONS[lang]
-
-    # 1. HEADER
-    date_str = datetime.now().strftime('%d %b %Y')
-    story.append(Paragraph(f"<b>{T['pdf_title']}</b>", styles['Title']))
-    story.append(Spacer(1, 12))
-    story.append(Paragraph(T['pdf_method'], styles['Normal']))
-    story.append(Paragraph(f"{T['pdf_date']} {date_str}", styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # 2. COMPANY DETAILS
-    info_text = f"""
-    <b>{T['pdf_company']}</b> {company_name}<br/>
-    <b>{T['pdf_country']}</b> {country}<br/>
-    <b>{T['pdf_period']}</b> {year}<br/>
-    <b>{T['pdf_revenue']}</b> {revenue:,.2f} {currency}<br/>
-    """
-    story.append(Paragraph(info_text, styles['Normal']))
-    story.append(Spacer(1, 15))
-
-    # 3. BOUNDARY STATEMENT
-    story.append(Paragraph(T['pdf_boundary_text'], styles['Normal']))
-    story.append(Spacer(1, 20))
-
-    # 4. SUMMARY DASHBOARD
-    carbon_intensity = (totals['total'] / revenue) if revenue > 0 else 0
-    
-    story.append(Paragraph(f"<b>{T['pdf_summary_title']}</b>", styles['Heading3']))
-    story.append(Spacer(1, 5))
-
-    summary_data = [
-        [T['pdf_col_metric'], T['pdf_col_value']], 
-        [T['pdf_s1'], f"{totals['scope1']:,.2f} kgCO2e"],
-        [T['pdf_s2'], f"{totals['scope2']:,.2f} kgCO2e"],
-        [T['pdf_s3'], f"{totals['scope3']:,.2f} kgCO2e"],
-        [T['pdf_total'], f"{totals['total']:,.2f} kgCO2e"], 
-        [T['pdf_intensity'], f"{carbon_intensity:.2f} kgCO2e / {currency}"] 
-    ]
-    
-    t_summary = Table(summary_data, colWidths=[250, 150])
-    t_summary.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-        ('FONTNAME', (0, 1), (0, 3), 'Helvetica'),
-        ('BACKGROUND', (0, 4), (-1, 4), colors.navy),
-        ('TEXTCOLOR', (0, 4), (-1, 4), colors.white),
-        ('FONTNAME', (0, 4), (-1, 4), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 4), (-1, 4), 11),
-        ('TOPPADDING', (0, 4), (-1, 4), 8),
-        ('BOTTOMPADDING', (0, 4), (-1, 4), 8),
-        ('BACKGROUND', (0, 5), (-1, 5), colors.aliceblue),
-        ('FONTNAME', (0, 5), (-1, 5), 'Helvetica-Oblique'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-    ]))
-    story.append(t_summary)
-    story.append(Spacer(1, 20))
-
-    # 5. DETAILED TABLE
-    if not df.empty:
-        story.append(Paragraph(f"<b>{T['pdf_detail_title']}</b>", styles['Heading4']))
-        data = [[T['pdf_tab_scope'], T['pdf_tab_act'], T['pdf_tab_qty'], T['pdf_tab_emi']]]
-        for _, row in df.iterrows():
-            qty_clean = f"{row['Quantity']:,.2f} {row['Unit']}"
-            data.append([
-                row['Scope'],
-                row['Activity'],
-                qty_clean,
-                f"{row['Emissions_kgCO2e']:,.2f}"
-            ])
-        
-        t = Table(data, colWidths=[60, 140, 80, 100])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.navy),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
-        ]))
-        story.append(t)
-        story.append(Spacer(1, 20))
-
-    # --- 6. CLOSING BLOCK ---
-    closing_elements = []
-
-    # A. EVIDENCE (STRICT SORTING S1->S2->S3)
-    closing_elements.append(Paragraph(f"<b>{T['pdf_evidence_title']}</b>", styles['Heading4']))
-    
-    required_evidence = []
-    
-    # Scope 1
-    if any(k in input_keys for k in ["natural_gas"]): required_evidence.append(T['ev_gas'])
-    if any(k in input_keys for k in ["heating_oil"]): required_evidence.append(T['ev_oil'])
-    if any(k in input_keys for k in ["propane"]): required_evidence.append(T['ev_prop'])
-    if any(k in input_keys for k in ["diesel"]): required_evidence.append(T['ev_diesel'])
-    if any(k in input_keys for k in ["petrol"]): required_evidence.append(T['ev_petrol'])
-    if any(k in input_keys for k in ["ref_R410A", "ref_R32", "ref_R134a"]): required_evidence.append(T['ev_hvac'])
-    
-    # Scope 2
-    if any(k in input_keys for k in ["electricity_fr"]): required_evidence.append(T['ev_elec'])
-    if any(k in input_keys for k in ["district_heat"]): required_evidence.append(T['ev_heat'])
-    
-    # Scope 3
-    if any(k in input_keys for k in ["grey_fleet_avg"]): required_evidence.append(T['ev_travel'])
-    if any(k in input_keys for k in ["flight_avg"]): required_evidence.append(T['ev_flight'])
-    if any(k in input_keys for k in ["hotel_night_avg"]): required_evidence.append(T['ev_hotel'])
-
-    if not required_evidence:
-        evidence_html = f"{T['pdf_no_mat']}<br/>"
-    else:
-        evidence_html = ""
-        # We iterate through required_evidence list which is ALREADY in order (s1, s2, s3)
-        for item in required_evidence:
-            evidence_html += f"&bull; {item}<br/>"
-    
-    file_msg = f"({len(evidence_files)} {T['pdf_attached']})" if evidence_files else f"({T['pdf_no_files']})"
-    
-    evidence_text = f"""
-    {T['pdf_assurance_level']}<br/><br/>
-    {T['pdf_doc_retained']}<br/>
-    {evidence_html}
-    <i>{T['pdf_avail']} {file_msg}</i>
-    """
-    closing_elements.append(Paragraph(evidence_text, styles['Normal']))
-    closing_elements.append(Spacer(1, 30))
-
-    # B. ATTESTATION
-    sig_text = f"""
-    <b>{T['pdf_attest_title']}</b><br/>
-    {T['pdf_attest_text'].format(signer=signer_name)}
-    <br/><br/>
-    __________________________<br/>
-    {T['pdf_sig']}
-    """
-    closing_elements.append(Paragraph(sig_text, styles['Normal']))
-    closing_elements.append(Spacer(1, 20))
-    
-    # C. DISCLAIMER (STRUCTURED BULLETS + VERTICAL SUB-LIST)
-    closing_elements.append(Paragraph(f"<b>{T['pdf_disc_title']}</b>", styles['Heading4']))
-    
-    # Build Vertical Exclusion List
-    excluded_labels = []
-    
-    if "natural_gas" not in input_keys: excluded_labels.append(T['ex_gas'])
-    if "heating_oil" not in input_keys: excluded_labels.append(T['ex_oil'])
-    if "propane" not in input_keys: excluded_labels.append(T['ex_prop'])
-    if "diesel" not in input_keys: excluded_labels.append(T['ex_diesel'])
-    if "petrol" not in input_keys: excluded_labels.append(T['ex_petrol'])
-    
-    # Check if ANY refrigerant was present. If not, exclude "Refrigerants"
-    has_ref = any(k in input_keys for k in ["ref_R410A", "ref_R32", "ref_R134a"])
-    if not has_ref: excluded_labels.append(T['ex_ref'])
-        
-    if "electricity_fr" not in input_keys: excluded_labels.append(T['ex_elec'])
-    if "district_heat" not in input_keys: excluded_labels.append(T['ex_heat'])
-    if "grey_fleet_avg" not in input_keys: excluded_labels.append(T['ex_grey'])
-    if "flight_avg" not in input_keys: excluded_labels.append(T['ex_flight'])
-    if "hotel_night_avg" not in input_keys: excluded_labels.append(T['ex_hotel'])
-
-    if excluded_labels:
-        # Create HTML list items with indentation
-        exclusion_html = ""
-        for label in excluded_labels:
-            exclusion_html += f"<br/>&nbsp;&nbsp;• {label}"
-        
-        disc_excl_text = f"{T['disc_p3_intro']}{exclusion_html}"
-    else:
-        disc_excl_text = T['disc_p3_none']
-
-    bullet_style = ParagraphStyle('Bullet', parent=styles['Normal'], fontSize=7, leading=9, leftIndent=10, bulletIndent=0)
-    
-    closing_elements.append(Paragraph(T['disc_p1'], bullet_style, bulletText='•'))
-    closing_elements.append(Paragraph(T['disc_p2'], bullet_style, bulletText='•'))
-    closing_elements.append(Paragraph(disc_excl_text, bullet_style, bulletText='•'))
-    closing_elements.append(Paragraph(T['disc_p4'], bullet_style, bulletText='•'))
-    closing_elements.append(Paragraph(T['disc_p5'], bullet_style, bulletText='•'))
-
-    story.append(KeepTogether(closing_elements))
-
-    # --- 7. FOOTER ---
-    def add_footer(canvas, doc):
-        canvas.saveState()
-        canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(colors.grey)
-        canvas.drawCentredString(A4[0]/2, 42, T['footer_l1'])
-        canvas.drawCentredString(A4[0]/2, 32, T['footer_l2'])
-        canvas.drawCentredString(A4[0]/2, 22, T['footer_l3'])
-        canvas.drawCentredString(A4[0]/2, 12, T['footer_l4'])
-        canvas.restoreState()
-
-    doc.build(story, onFirstPage=add_footer, onLaterPages=add_footer)
-    return buffer.getvalue()
-
-# --- 4. APP UI ---
+# --- APP UI ---
 st.set_page_config(page_title="VSME Enterprise OS", page_icon="🏢")
 
-FACTORS = {
-    "natural_gas": Factor("natural_gas", 0.244, "kgCO2e/kWh", "ADEME", "GAS-NAT"),
-    "heating_oil": Factor("heating_oil", 3.2, "kgCO2e/L", "ADEME", "OIL-HEAT"),
-    "propane": Factor("propane", 3.1, "kgCO2e/kg", "ADEME", "LPG-PROP"),
-    "diesel": Factor("diesel", 3.16, "kgCO2e/L", "ADEME", "FUEL-DSL"),
-    "petrol": Factor("petrol", 2.8, "kgCO2e/L", "ADEME", "FUEL-PET"),
-    "ref_R410A": Factor("ref_R410A", 2088, "kgCO2e/kg", "ADEME", "REF-R410A"),
-    "ref_R32": Factor("ref_R32", 675, "kgCO2e/kg", "ADEME", "REF-R32"),
-    "ref_R134a": Factor("ref_R134a", 1430, "kgCO2e/kg", "ADEME", "REF-R134a"),
-    "electricity_fr": Factor("electricity_fr", 0.052, "kgCO2e/kWh", "ADEME", "ELEC-FR"),
-    "district_heat": Factor("district_heat", 0.170, "kgCO2e/kWh", "ADEME", "HEAT-NET"),
-    "grey_fleet_avg": Factor("grey_fleet_avg", 0.218, "kgCO2e/km", "ADEME", "TRAVEL-CAR-AVG"),
-    "flight_avg": Factor("flight_avg", 0.14, "kgCO2e/km", "ADEME", "FLIGHT-AVG"),
-    "hotel_night_avg": Factor("hotel_night_avg", 6.9, "kgCO2e/night", "ADEME", "HOTEL-FR-AVG")
-}
-
 if "lang" not in st.session_state: st.session_state.lang = "fr"
 if "step" not in st.session_state: st.session_state.step = 1
 
 with st.sidebar:
-    lang_choice = st.radio("Language / Langue", ["Français", "English"])
-    st.session_state.lang = "fr" if lang_choice == "Français" else "en"
+    st.session_state.lang = st.radio("Language / Langue", list(LANGUAGE_NAMES), format_func=LANGUAGE_NAMES.get)
 
 T = TRANSLATIONS[st.session_state.lang]
 
+# Process-wide tables, shared by every session (Streamlit keeps one instance per worker)
+@st.cache_resource
+def shared_factors(country, year):
+    from factor_registry import factors_for
+    return factors_for(country, year)
+
+@st.cache_resource
+def result_store():
+    from sessions import RESULTS
+    return RESULTS
+
+def go_to(step):
+    metrics.inc("esg_step_transitions_total", from_step=st.session_state.step, to_step=step)
+    st.session_state.step = step
+    st.rerun()
+
 st.title(T["title"])
 st.caption(T["caption"])
 st.progress(st.session_state.step / 3)
@@ -584,48 +55,113 @@ if st.session_state.step == 1:
         
     if st.button(T["btn_start"]):
         if st.session_state.company and st.session_state.revenue > 0:
-            st.session_state.step = 2
-            st.rerun()
+            go_to(2)
         else:
             st.error(T["err_company"])
 
 elif st.session_state.step == 2:
     st.header(T["step2_header"])
-    
+
+    imported_file = st.file_uploader(T["import_label"], type=["csv", "xlsx"])
+    if imported_file is None:
+        st.session_state.imported = {}
+        st.session_state.import_id = None
+        st.session_state.import_error = None
+    elif st.session_state.get("import_id") != (imported_file.name, imported_file.size):
+        from importer import stream_activity_totals
+        try:
+            summary = stream_activity_totals(imported_file)  # pandas ParserError / UnicodeDecodeError are ValueErrors
+        except (ValueError, ImportError) as e:
+            st.session_state.imported = {}
+            st.session_state.import_error = T["import_error"].format(error=e)
+        else:
+            st.session_state.imported = summary.totals
+            st.session_state.import_error = None
+            st.session_state.import_msg = T["import_done"].format(rows=summary.rows_read, skipped=summary.rows_skipped)
+        st.session_state.import_id = (imported_file.name, imported_file.size)
+    if st.session_state.get("import_error"): st.error(st.session_state.import_error)
+    elif st.session_state.imported: st.success(st.session_state.import_msg)
+    pre = st.session_state.imported
+
+    # Monthly series over the reporting year and the one before; edits only recompute the changed months
+    with st.expander(T["monthly_header"]):
+        from timeseries import ActivitySeries, reporting_year, period_labels
+        from engine import ACTIVITY_ORDER, get_activity_label
+        import pandas as pd
+        last = reporting_year(st.session_state.year)
+        series_id = (st.session_state.country, last)
+        if st.session_state.get("series_id") != series_id:
+            st.session_state.series = ActivitySeries(last - 1, last, lambda y: shared_factors(st.session_state.country, y))
+            st.session_state.series_id = series_id
+        series = st.session_state.series
+        st.caption(T["monthly_caption"])
+        year = st.selectbox(T["monthly_year"], series.years[::-1])
+        grid = pd.DataFrame(series.year_grid(year), index=[get_activity_label(k, st.session_state.lang) for k in ACTIVITY_ORDER],
+                            columns=period_labels(year, year))
+        edited = st.data_editor(grid, key=f"monthly_{year}")
+        series.set_year(year, edited.to_numpy())
+        if series.has_data():
+            st.line_chart(series.monthly_totals()[["scope1", "scope2", "scope3"]])
+            annual = series.annual_totals()
+            if annual.loc[last - 1, "total"] > 0:
+                st.caption(T["monthly_yoy"].format(year=last, total=f"{annual.loc[last, 'total']:,.2f}",
+                                                   change=f"{annual.loc[last, 'yoy_pct']:+.1f}%"))
+    if st.session_state.series.has_data():
+        pre = {**pre, **{k: v for k, v in st.session_state.series.annual_quantities(last).items() if v > 0}}
+
     st.subheader(T["s1_header"])
     st.markdown(T["s1_stat"])
     c1, c2, c3 = st.columns(3)
-    with c1: gas = st.number_input(T["gas_label"], min_value=0.0, format="%.2f")
-    with c2: fioul = st.number_input(T["oil_label"], min_value=0.0, format="%.2f")
-    with c3: propane = st.number_input(T["propane_label"], min_value=0.0, format="%.2f")
+    with c1: gas = st.number_input(T["gas_label"], min_value=0.0, value=pre.get("natural_gas", 0.0), format="%.2f")
+    with c2: fioul = st.number_input(T["oil_label"], min_value=0.0, value=pre.get("heating_oil", 0.0), format="%.2f")
+    with c3: propane = st.number_input(T["propane_label"], min_value=0.0, value=pre.get("propane", 0.0), format="%.2f")
 
     st.markdown(T["s1_mobile"])
     c4, c5 = st.columns(2)
-    with c4: diesel = st.number_input(T["diesel_label"], min_value=0.0, format="%.2f")
-    with c5: petrol = st.number_input(T["petrol_label"], min_value=0.0, format="%.2f")
+    with c4: diesel = st.number_input(T["diesel_label"], min_value=0.0, value=pre.get("diesel", 0.0), format="%.2f")
+    with c5: petrol = st.number_input(T["petrol_label"], min_value=0.0, value=pre.get("petrol", 0.0), format="%.2f")
         
     st.markdown(T["s1_fugitive"])
     c6, c7, c8 = st.columns(3)
-    with c6: r410a = st.number_input(T["r410a_label"], min_value=0.0, format="%.2f")
-    with c7: r32 = st.number_input(T["r32_label"], min_value=0.0, format="%.2f")
-    with c8: r134a = st.number_input(T["r134a_label"], min_value=0.0, format="%.2f")
+    with c6: r410a = st.number_input(T["r410a_label"], min_value=0.0, value=pre.get("ref_R410A", 0.0), format="%.2f")
+    with c7: r32 = st.number_input(T["r32_label"], min_value=0.0, value=pre.get("ref_R32", 0.0), format="%.2f")
+    with c8: r134a = st.number_input(T["r134a_label"], min_value=0.0, value=pre.get("ref_R134a", 0.0), format="%.2f")
 
     st.divider()
     st.subheader(T["s2_header"])
     c9, c10 = st.columns(2)
-    with c9: elec = st.number_input(T["elec_label"], min_value=0.0, format="%.2f")
-    with c10: heat = st.number_input(T["heat_label"], min_value=0.0, format="%.2f")
+    with c9: elec = st.number_input(T["elec_label"], min_value=0.0, value=pre.get("electricity_fr", 0.0), format="%.2f")
+    with c10: heat = st.number_input(T["heat_label"], min_value=0.0, value=pre.get("district_heat", 0.0), format="%.2f")
 
     st.divider()
     st.subheader(T["s3_header"])
     st.caption(T["s3_desc"])
     
     c11, c12, c13 = st.columns(3)
-    with c11: grey_km = st.number_input(T["grey_label"], min_value=0.0, format="%.2f")
-    with c12: flight_km = st.number_input(T["flight_label"], min_value=0.0, format="%.2f")
-    with c13: hotel_nights = st.number_input(T["hotel_label"], min_value=0.0, format="%.0f")
+    with c11: grey_km = st.number_input(T["grey_label"], min_value=0.0, value=pre.get("grey_fleet_avg", 0.0), format="%.2f")
+    with c12: flight_km = st.number_input(T["flight_label"], min_value=0.0, value=pre.get("flight_avg", 0.0), format="%.2f")
+    with c13: hotel_nights = st.number_input(T["hotel_label"], min_value=0.0, value=pre.get("hotel_night_avg", 0.0), format="%.0f")
 
     st.divider()
+    sites_file = st.file_uploader(T["sites_label"], type=["csv", "xlsx"])
+    if sites_file is None:
+        st.session_state.sites = None
+        st.session_state.sites_error = None
+    elif st.session_state.get("sites_id") != (sites_file.name, sites_file.size):
+        from sites import read_sites
+        try:
+            st.session_state.sites = read_sites(sites_file, st.session_state.country)
+        except (ValueError, ImportError) as e:  # duplicate site names, unknown units, unreadable file
+            st.session_state.sites = None
+            st.session_state.sites_error = T["sites_error"].format(error=e)
+        else:
+            st.session_state.sites_error = None
+            # Content hash: the shared result store is keyed by it, across sessions
+            st.session_state.sites_digest = hashlib.sha256(sites_file.getvalue()).hexdigest()
+        st.session_state.sites_id = (sites_file.name, sites_file.size)
+    if st.session_state.get("sites_error"): st.error(st.session_state.sites_error)
+    elif st.session_state.sites is not None: st.info(T["sites_done"].format(n=len(st.session_state.sites)))
+
     files = st.file_uploader(T["upload_label"], accept_multiple_files=True)
     signer = st.text_input(T["signer_label"])
 
@@ -633,48 +169,104 @@ elif st.session_state.step == 2:
         if not signer or len(signer) < 3:
             st.error(T["err_signer"])
         else:
-            inputs = {
-                "natural_gas": ActivityInput("natural_gas", gas, "kWh", "Scope 1 - Stationary"),
-                "heating_oil": ActivityInput("heating_oil", fioul, "Liters", "Scope 1 - Stationary"),
-                "propane": ActivityInput("propane", propane, "kg", "Scope 1 - Stationary"),
-                "diesel": ActivityInput("diesel", diesel, "Liters", "Scope 1 - Mobile"),
-                "petrol": ActivityInput("petrol", petrol, "Liters", "Scope 1 - Mobile"),
-                "ref_R410A": ActivityInput("ref_R410A", r410a, "kg", "Scope 1 - Fugitive"),
-                "ref_R32": ActivityInput("ref_R32", r32, "kg", "Scope 1 - Fugitive"),
-                "ref_R134a": ActivityInput("ref_R134a", r134a, "kg", "Scope 1 - Fugitive"),
-                "electricity_fr": ActivityInput("electricity_fr", elec, "kWh", "Scope 2 - Energy"),
-                "district_heat": ActivityInput("district_heat", heat, "kWh", "Scope 2 - Energy"),
-                "grey_fleet_avg": ActivityInput("grey_fleet_avg", grey_km, "km", "Scope 3 - Business Travel"),
-                "flight_avg": ActivityInput("flight_avg", flight_km, "km", "Scope 3 - Business Travel"),
-                "hotel_night_avg": ActivityInput("hotel_night_avg", hotel_nights, "night", "Scope 3 - Business Travel"),
-            }
-            active_keys = [k for k, v in inputs.items() if v.quantity > 0]
-            df = calculate_emissions(inputs, FACTORS, st.session_state.lang)
-            st.session_state.results_df = df
-            st.session_state.totals = summarize(df)
-            st.session_state.evidence = [f.name for f in files] if files else []
+            # The session keeps only these compact inputs and a key into the shared result store
+            st.session_state.quantities = (gas, fioul, propane, diesel, petrol, r410a, r32, r134a,
+                                           elec, heat, grey_km, flight_km, hotel_nights)  # ACTIVITY_ORDER
+            st.session_state.calc_lang = st.session_state.lang  # labels stay as calculated; the PDF follows the sidebar
+            st.session_state.saved_digest = None
+            for k in ("imported", "import_id", "import_msg", "series", "series_id"): st.session_state.pop(k, None)
+            if files:
+                # Streamed into the shared content-addressed store; the session keeps only name + hash
+                from evidence import get_evidence_store
+                evidence_store = get_evidence_store()
+                st.session_state.evidence = [evidence_store.put_file(f, f.name)[0] for f in files]
+            else:
+                st.session_state.evidence = []
             st.session_state.signer = signer
-            st.session_state.input_keys = active_keys
-            st.session_state.step = 3
-            st.rerun()
+            go_to(3)
 
 elif st.session_state.step == 3:
     st.header(T["step3_header"])
-    t = st.session_state.totals
+    from sessions import result_key, assess
+    sites = st.session_state.get("sites")
+    key = result_key(st.session_state.country, st.session_state.year, st.session_state.calc_lang,
+                     st.session_state.quantities, st.session_state.get("sites_digest") if sites is not None else None)
+    factors = shared_factors(st.session_state.country, st.session_state.year)
+    res = result_store().get_or_build(key, lambda: assess(st.session_state.country, st.session_state.year, st.session_state.calc_lang,
+                                                          st.session_state.quantities, factors, sites))
+    t = res.totals
+    ci = res.uncertainty
+    ci_text = lambda k: T["ci_caption"].format(low=f"{ci[k][0]:,.2f}", high=f"{ci[k][1]:,.2f}")
     c1, c2, c3 = st.columns(3)
     c1.metric("Scope 1", f"{t['scope1']:,.2f}", "kgCO2e")
+    c1.caption(ci_text("scope1"))
     c2.metric("Scope 2", f"{t['scope2']:,.2f}", "kgCO2e")
+    c2.caption(ci_text("scope2"))
     c3.metric("Scope 3", f"{t['scope3']:,.2f}", "kgCO2e")
+    c3.caption(ci_text("scope3"))
     st.metric(T["total_footprint"], f"{t['total']:,.2f} kgCO2e")
-    
-    pdf_data = build_pdf(
+    st.caption(ci_text("total") + " kgCO2e")
+    if res.site_totals is not None:
+        with st.expander(T["sites_header"].format(n=len(res.site_totals))):
+            st.dataframe(res.site_totals.style.format("{:,.2f}", subset=["scope1", "scope2", "scope3", "total"]))
+
+    # PDF bytes stay in the process-wide cache (or the disk spool), never in session state
+    from pdf_cache import build_pdf_cached
+    pdf_data = build_pdf_cached(
         st.session_state.company, st.session_state.country, st.session_state.year,
         st.session_state.revenue, st.session_state.currency,
-        st.session_state.results_df, st.session_state.totals, st.session_state.evidence, st.session_state.signer,
-        st.session_state.input_keys, st.session_state.lang
+        res.rows, res.totals, st.session_state.evidence, st.session_state.signer,
+        res.input_keys, st.session_state.lang, res.uncertainty,
+        digest=res.digest
     )
+    # Persist each completed assessment once (reruns and language switches reuse it)
+    if st.session_state.get("saved_digest") != res.digest:
+        from store import get_store
+        st.session_state.report_id = get_store().save_assessment(
+            st.session_state.company, st.session_state.country, st.session_state.year,
+            st.session_state.revenue, st.session_state.currency,
+            res.rows, res.totals, st.session_state.evidence, st.session_state.signer,
+            st.session_state.lang, factors, pdf_data
+        )
+        st.session_state.saved_digest = res.digest
     
-    st.download_button(T["btn_download"], data=pdf_data, file_name="Carbon_Pack.pdf", mime="application/pdf")
+    if isinstance(pdf_data, str):
+        # Large report spooled to disk: download_button reads it into Streamlit's media store, not session state
+        with open(pdf_data, "rb") as pdf_file:
+            st.download_button(T["btn_download"], data=pdf_file, file_name="Carbon_Pack.pdf", mime="application/pdf")
+    else:
+        st.download_button(T["btn_download"], data=pdf_data, file_name="Carbon_Pack.pdf", mime="application/pdf")
+
+    # What-if sweep over the activities the supplier reported (evaluated on demand). It applies one factor
+    # set, so multi-site results (one factor set per country) leave it out
+    df_res = res.rows
+    if not df_res.empty and res.site_totals is None:
+        with st.expander(T["whatif_header"]):
+            from engine import make_inputs, get_activity_label
+            from scenarios import sweep
+            import pandas as pd
+            labels = {get_activity_label(k, st.session_state.lang): k for k in df_res["Key"]}
+            picked = st.multiselect(T["whatif_keys"], list(labels), max_selections=4)
+            refs = [k for k in ("ref_R410A", "ref_R134a") if k in labels.values()]
+            switch = st.checkbox(T["whatif_ref"]) if refs else False
+            if picked or switch:
+                inputs = make_inputs(df_res.groupby("Key")["Quantity"].sum().to_dict())
+                ranked = sweep(inputs, factors,
+                               [labels[p] for p in picked], substitutions={k: "ref_R32" for k in refs} if switch else None)
+                st.caption(T["whatif_result"].format(n=len(ranked)))
+                view = ranked.head(10)
+                shown = {}
+                for col in [c for c in view.columns if ":" in c]:
+                    kind, keys = col.split(":")
+                    name = get_activity_label(keys.split(">")[0], st.session_state.lang)
+                    shown[name + (" → R32" if kind == "substitute" else "")] = view[col].map("{:+.0%}".format if kind == "scale" else "{:.0%}".format)
+                shown[T["whatif_delta"]] = view["delta_total"].map("{:,.2f}".format)
+                shown[T["whatif_pct"]] = view["change_pct"].map("{:+.1f}%".format)
+                st.dataframe(pd.DataFrame(shown), hide_index=True)
     if st.button(T["btn_new"]):
-        st.session_state.step = 1
-        st.rerun()
+        go_to(1)
+
+from sessions import record_session
+ctx = get_script_run_ctx()
+record_session(ctx.session_id if ctx is not None else "local", st.session_state)
+finish_rerun(RERUN_STARTED, st.session_state.step)
@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import FACTORS, make_inputs, calculate_emissions, calculate_rows, summarize, calculate_emissions_batch
+from report import build_pdf
+from sites import calculate_sites
+from synthetic import synthetic_suppliers, long_activity_table, synthetic_site_table, TYPICAL_QTY
+
+# --- REPORT PIPELINE BENCHMARK ---
+# Per-supplier stages (calculate_emissions / calculate_rows, summarize, build_pdf from a frame
+# or from ResultRows) are timed call by call; the batch engine is timed once per size. Peak memory is measured in a separate tracemalloc
+# pass so it does not distort the timings.
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [1, 1000, 100_000]
+# Sites per entity for the multi-site stages (one entity, one PDF per size)
+DEFAULT_SITE_SIZES = [10, 100, 500]
+# Detail rows in a single large report (chunked detail table); should render in seconds
+DEFAULT_DETAIL_ROWS = [1000, 10_000]
+# build_pdf costs ~20 ms/doc: above this many suppliers it is measured on the first N (see --full)
+PDF_SAMPLE = 1000
+MEMORY_SAMPLE = 200
+# A stage regresses when its throughput drops or its p99 grows by more than this fraction
+DEFAULT_TOLERANCE = 0.25
+# Runs shorter than this are too noisy to compare throughput on
+MIN_COMPARE_SECONDS = 0.05
+
+def percentile(sorted_values, q):
+    if not sorted_values: return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))]
+
+def _prepare(suppliers):
+    cases = []
+    for s in suppliers:
+        inputs = make_inputs(s["quantities"])
+        keys = [k for k, v in inputs.items() if v.quantity > 0]
+        cases.append((s, inputs, keys))
+    return cases
+
+def _stage_calc(case):
+    s, inputs, _ = case
+    return calculate_emissions(inputs, FACTORS, s["lang"])
+
+def _stage_rows(case):
+    _, inputs, _ = case
+    return calculate_rows(inputs, FACTORS)
+
+def _pdf_args(case, df):
+    s, _, keys = case
+    evidence = [e for e in s["evidence"].split(";") if e]
+    return (s["company"], s["country"], s["year"], s["revenue"], s["currency"], df, summarize(df),
+            evidence, s["signer"], keys, s["lang"])
+
+def time_calls(fn, args_list):
+    if args_list: fn(*args_list[0])  # warm caches and lazy imports outside the measurement
+    lat = []
+    start = time.perf_counter()
+    for args in args_list:
+        t = time.perf_counter()
+        fn(*args)
+        lat.append(time.perf_counter() - t)
+    wall = time.perf_counter() - start
+    lat.sort()
+    return {"calls": len(lat), "seconds": wall, "throughput_per_s": len(lat) / wall if wall > 0 else 0.0,
+            "p50_ms": percentile(lat, 50) * 1e3, "p99_ms": percentile(lat, 99) * 1e3}
+
+def peak_kib(fn, args_list):
+    # Largest single-call peak over the sample
+    peak = 0
+    tracemalloc.start()
+    try:
+        for args in args_list:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn(*args)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+def bench_size(n, full=False, seed=42):
+    suppliers = synthetic_suppliers(n, seed)
+    cases = _prepare(suppliers)
+    out = {}
+
+    calc_args = [(c,) for c in cases]
+    out["calculate_emissions"] = time_calls(_stage_calc, calc_args)
+    out["calculate_emissions"]["peak_kib"] = peak_kib(_stage_calc, calc_args[:MEMORY_SAMPLE])
+
+    out["calculate_rows"] = time_calls(_stage_rows, calc_args)
+    out["calculate_rows"]["peak_kib"] = peak_kib(_stage_rows, calc_args[:MEMORY_SAMPLE])
+
+    frames = [_stage_calc(c) for c in cases]
+    out["summarize"] = time_calls(summarize, [(df,) for df in frames])
+    out["summarize"]["peak_kib"] = peak_kib(summarize, [(df,) for df in frames[:MEMORY_SAMPLE]])
+
+    n_pdf = n if full else min(n, PDF_SAMPLE)
+    pdf_args = [_pdf_args(c, df) for c, df in zip(cases[:n_pdf], frames[:n_pdf])]
+    out["build_pdf"] = time_calls(build_pdf, pdf_args)
+    out["build_pdf"]["peak_kib"] = peak_kib(build_pdf, pdf_args[:min(n_pdf, 50)])
+    out["build_pdf"]["sampled_of"] = n
+    rows_args = [_pdf_args(c, _stage_rows(c)) for c in cases[:n_pdf]]
+    out["build_pdf_rows"] = time_calls(build_pdf, rows_args)
+    out["build_pdf_rows"]["peak_kib"] = peak_kib(build_pdf, rows_args[:min(n_pdf, 50)])
+    out["build_pdf_rows"]["sampled_of"] = n
+
+    table = long_activity_table(suppliers)
+    batch = time_calls(lambda: calculate_emissions_batch(table, FACTORS, "fr"), [()])
+    batch["throughput_per_s"] = n / batch["seconds"] if batch["seconds"] > 0 else 0.0
+    batch["peak_kib"] = peak_kib(lambda: calculate_emissions_batch(table, FACTORS, "fr"), [()])
+    out["calculate_emissions_batch"] = batch
+    return out
+
+def bench_sites(n_sites, seed=42):
+    # One entity with n_sites sites: calculate_sites and the PDF with per-site detail tables.
+    # Throughput is in sites per second, so linear scaling shows as a flat line across sizes.
+    table = synthetic_site_table(n_sites, seed)
+    calc = time_calls(lambda: calculate_sites(table, "2025", "fr", "France"), [()])
+    rows, _ = calculate_sites(table, "2025", "fr", "France")
+    args = ("ENTITY SAS", "France", "2025", 1e8, "EUR", rows, summarize(rows), [], "Jean Dupont", list(rows["Key"].unique()), "fr")
+    pdf = time_calls(build_pdf, [args])
+    for r in (calc, pdf):
+        r["throughput_per_s"] = n_sites / r["seconds"] if r["seconds"] > 0 else 0.0
+    calc["peak_kib"] = peak_kib(lambda: calculate_sites(table, "2025", "fr", "France"), [()])
+    pdf["peak_kib"] = peak_kib(build_pdf, [args])
+    return {"calculate_sites": calc, "build_pdf_sites": pdf}
+
+def bench_detail_rows(n_rows):
+    # One report whose detail table has n_rows lines (every activity repeated); throughput in rows/s
+    one = calculate_emissions(make_inputs(TYPICAL_QTY), FACTORS, "fr")
+    df = one.iloc[[i % len(one) for i in range(n_rows)]].reset_index(drop=True)
+    args = ("LARGE SAS", "France", "2025", 1e8, "EUR", df, summarize(df), [], "Jean Dupont", list(one["Key"]), "fr")
+    r = time_calls(build_pdf, [args])
+    r["throughput_per_s"] = n_rows / r["seconds"] if r["seconds"] > 0 else 0.0
+    r["peak_kib"] = peak_kib(build_pdf, [args])
+    return {"build_pdf_detail_rows": r}
+
+def run(sizes, full=False, site_sizes=(), detail_rows=()):
+    results = {str(n): bench_size(n, full) for n in sizes}
+    for n in site_sizes:
+        results.setdefault(str(n), {}).update(bench_sites(n))
+    for n in detail_rows:
+        results.setdefault(str(n), {}).update(bench_detail_rows(n))
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "cpus": os.cpu_count(), "when": time.strftime("%Y-%m-%dT%H:%M:%S"), "libs": lib_versions()},
+        "results": results,
+    }
+
+def print_report(result):
+    print(f"{'size':>8} {'stage':<26} {'calls':>7} {'thru/s':>11} {'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>10}")
+    for size, stages in result["results"].items():
+        for stage, r in stages.items():
+            print(f"{size:>8} {stage:<26} {r['calls']:>7} {r['throughput_per_s']:>11,.1f} "
+                  f"{r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['peak_kib']:>10,.1f}")
+
+def lib_versions():
+    # pandas/numpy/reportlab releases move these timings by more than the tolerance on their own
+    import numpy, pandas, reportlab
+    return {"pandas": pandas.__version__, "numpy": numpy.__version__, "reportlab": reportlab.Version}
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    # -> list of regression messages (stages/sizes missing from the baseline are skipped)
+    problems = []
+    then, now = baseline.get("meta", {}).get("libs"), result["meta"]["libs"]
+    if then != now: print(f"warning: baseline recorded with {then or 'unknown library versions'}, now {now}; re-save it")
+    for size, stages in result["results"].items():
+        for stage, r in stages.items():
+            b = baseline.get("results", {}).get(size, {}).get(stage)
+            if not b: continue
+            if r["seconds"] >= MIN_COMPARE_SECONDS and r["throughput_per_s"] < b["throughput_per_s"] * (1 - tolerance):
+                problems.append(f"{stage}@{size}: throughput {r['throughput_per_s']:,.1f}/s vs baseline {b['throughput_per_s']:,.1f}/s")
+            if r["calls"] > 1 and r["p99_ms"] > b["p99_ms"] * (1 + tolerance):
+                problems.append(f"{stage}@{size}: p99 {r['p99_ms']:.3f} ms vs baseline {b['p99_ms']:.3f} ms")
+    return problems
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark calculate_emissions / summarize / build_pdf.")
+    p.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    p.add_argument("--sites", type=int, nargs="*", default=DEFAULT_SITE_SIZES, help="sites per entity for the multi-site stages")
+    p.add_argument("--detail-rows", type=int, nargs="*", default=DEFAULT_DETAIL_ROWS, help="detail rows for the large single-report stage")
+    p.add_argument("--full", action="store_true", help=f"render every PDF instead of the first {PDF_SAMPLE}")
+    p.add_argument("--save-baseline", action="store_true", help=f"write results to {BASELINE_PATH}")
+    p.add_argument("--compare", action="store_true", help="fail if slower than the stored baseline")
+    p.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    p.add_argument("--json", help="also write the results to this file")
+    args = p.parse_args(argv)
+
+    result = run(args.sizes, args.full, args.sites, args.detail_rows)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f: json.dump(result, f, indent=2)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f: json.dump(result, f, indent=2)
+        print(f"baseline written to {BASELINE_PATH}")
+    if args.compare:
+        with open(BASELINE_PATH) as f: problems = compare(result, json.load(f), args.tolerance)
+        for msg in problems: print("REGRESSION " + msg)
+        if problems: return 1
+        print("no regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
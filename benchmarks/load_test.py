@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import ACTIVITY_ORDER
+from translations import TRANSLATIONS, ACTIVITY_LABEL_KEYS
+from synthetic import TYPICAL_QTY, synthetic_supplier
+
+# --- LOAD TEST: CONCURRENT SUPPLIERS WALKING STEPS 1-3 OF app.py ---
+# Each virtual supplier drives the real script headlessly (streamlit.testing AppTest) in this process,
+# so every session shares the same module-level caches, factor tables and result store a server
+# worker would: company profile -> activity data -> Step 3 (PDF) -> one Step 3 rerun.
+# Latency is recorded per step, and each supplier's session-state size after Step 3; CPU and RSS of
+# the process are sampled over the whole run.
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+STEPS = ["step1_load", "step1_submit", "step2_submit", "step3_rerun"]
+DEFAULT_MIX = "typical=0.8,full=0.1,empty=0.1"
+SAMPLE_INTERVAL_S = 0.5
+PAGE_BYTES = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def parse_mix(text):
+    # "typical=0.8,full=0.1,empty=0.1" -> [(kind, weight)]
+    mix = []
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in ("typical", "full", "empty"): raise ValueError(f"unknown input kind: {kind}")
+        mix.append((kind.strip(), float(weight or 1)))
+    return mix
+
+def supplier_input(rng, i, kind, langs):
+    s = synthetic_supplier(rng, i)
+    if kind == "empty":
+        s["quantities"] = {k: 0.0 for k in ACTIVITY_ORDER}
+    elif kind == "full":
+        s["quantities"] = {k: round(TYPICAL_QTY[k] * rng.lognormvariate(0, 1), 2) for k in ACTIVITY_ORDER}
+    s["lang"] = rng.choice(langs)
+    s["kind"] = kind
+    return s
+
+# --- RESOURCE SAMPLING ---
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * PAGE_BYTES
+    except OSError:
+        import resource  # peak, not current, where /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class Sampler(threading.Thread):
+    # (seconds since start, RSS MiB, CPU % of one core) every interval
+    def __init__(self, interval=SAMPLE_INTERVAL_S):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._done = threading.Event()
+
+    def run(self):
+        start = last_wall = time.perf_counter()
+        last_cpu = time.process_time()
+        while not self._done.wait(self.interval):
+            wall, cpu = time.perf_counter(), time.process_time()
+            self.samples.append((wall - start, rss_bytes() / 2**20, 100 * (cpu - last_cpu) / (wall - last_wall)))
+            last_wall, last_cpu = wall, cpu
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+# --- ONE PROCESS-WIDE RUNTIME ---
+def share_runtime():
+    # AppTest installs a fresh mock Runtime (and sets global.appTest) for each run and clears it
+    # afterwards, so with overlapping sessions one run's teardown pulls the runtime from under another.
+    # Give every session one runtime and one compiled-script cache, as a server process has (parallel
+    # ast.parse of the script is not thread-safe on 3.11), and send AppTest's per-run runtime swap to a
+    # subclass nothing reads. The config option is set up front so per-run restores leave it on.
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+    if app_test.Runtime is not Runtime: return
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    app_test.Runtime = type("PerRunRuntime", (Runtime,), {})
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    config.set_option("global.appTest", True)
+
+# --- ONE VIRTUAL SUPPLIER ---
+def _number_input(at, label):
+    return next(w for w in at.number_input if w.label == label)
+
+def _text_input(at, label):
+    return next(w for w in at.text_input if w.label == label)
+
+def _button(at, label):
+    return next(w for w in at.button if w.label == label)
+
+def _run(at):
+    # A script error on any rerun fails the supplier, not only on the Step 3 run
+    at.run()
+    if at.exception: raise RuntimeError(str(at.exception[0].value))
+
+def _timed(lat, step, at):
+    t = time.perf_counter()
+    _run(at)
+    lat[step] = time.perf_counter() - t
+
+def walk(s, app_path=APP_PATH, timeout=120):
+    # -> ({step: seconds}, session-state bytes after Step 3); raises if the flow does not reach Step 3
+    from streamlit.testing.v1 import AppTest
+    from sessions import state_footprint
+    T = TRANSLATIONS[s["lang"]]
+    lat = {}
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    _timed(lat, "step1_load", at)
+    at.sidebar.radio[0].set_value(s["lang"])
+    _run(at)
+    _text_input(at, T["company_label"]).input(s["company"])
+    _text_input(at, T["year_label"]).input(s["year"])
+    _number_input(at, T["revenue_label"]).set_value(s["revenue"])
+    _button(at, T["btn_start"]).click()
+    _timed(lat, "step1_submit", at)
+    if at.session_state.step != 2: raise RuntimeError("Step 1 did not advance")
+
+    for k in ACTIVITY_ORDER:
+        _number_input(at, T[ACTIVITY_LABEL_KEYS[k]]).set_value(s["quantities"][k])
+    _text_input(at, T["signer_label"]).input(s["signer"])
+    _button(at, T["btn_gen"]).click()
+    _timed(lat, "step2_submit", at)  # includes the Step 3 run: calculation, PDF, store
+    if at.session_state.step != 3: raise RuntimeError("Step 2 did not advance")
+
+    _timed(lat, "step3_rerun", at)  # widget interaction on Step 3: result store and PDF cache hits
+    # Measured here rather than through sessions.session_stats: every AppTest shares one session id
+    return lat, state_footprint(at.session_state.to_dict())
+
+# --- RUN ---
+def percentile(sorted_values, q):
+    if not sorted_values: return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))]
+
+def run(suppliers=200, concurrency=8, mix=DEFAULT_MIX, langs=("fr", "en"), think_s=0.0, seed=42, app_path=APP_PATH):
+    rng = random.Random(seed)
+    kinds, weights = zip(*parse_mix(mix))
+    inputs = [supplier_input(rng, i, rng.choices(kinds, weights)[0], list(langs)) for i in range(suppliers)]
+    results, failures, state_bytes, lock = {step: [] for step in STEPS}, [], [], threading.Lock()
+
+    def user(s):
+        if think_s: time.sleep(rng.uniform(0, think_s))
+        try:
+            lat, size = walk(s, app_path)
+        except Exception as e:
+            with lock: failures.append((s["supplier_id"], s["kind"], f"{type(e).__name__}: {e}"))
+            return
+        with lock:
+            for step, v in lat.items(): results[step].append(v)
+            state_bytes.append(size)
+
+    share_runtime()
+    # One uncounted walk first: compiles the script and imports the app's modules on one thread
+    walk(supplier_input(random.Random(seed), -1, "typical", list(langs)), app_path)
+    sampler = Sampler()
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool: list(pool.map(user, inputs))
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    steps = {}
+    for step, values in results.items():
+        values.sort()
+        steps[step] = {"n": len(values), "p50_ms": percentile(values, 50) * 1e3, "p90_ms": percentile(values, 90) * 1e3,
+                       "p99_ms": percentile(values, 99) * 1e3, "max_ms": (values[-1] if values else 0.0) * 1e3}
+    rss = [r for _, r, _ in sampler.samples]
+    cpu = [c for _, _, c in sampler.samples]
+    return {
+        "config": {"suppliers": suppliers, "concurrency": concurrency, "mix": mix, "langs": list(langs),
+                   "think_s": think_s, "cpus": os.cpu_count()},
+        "seconds": wall,
+        "completed": suppliers - len(failures),
+        "suppliers_per_s": (suppliers - len(failures)) / wall if wall > 0 else 0.0,
+        "failures": failures,
+        "steps": steps,
+        "rss_mib": {"start": rss[0] if rss else 0.0, "peak": max(rss, default=0.0), "end": rss[-1] if rss else 0.0},
+        "sessions": {"measured": len(state_bytes), "bytes_total": sum(state_bytes), "bytes_max": max(state_bytes, default=0),
+                     "bytes_avg": sum(state_bytes) / len(state_bytes) if state_bytes else 0.0},
+        "cpu_pct": {"avg": sum(cpu) / len(cpu) if cpu else 0.0, "peak": max(cpu, default=0.0)},
+        "timeline": [{"t": round(t, 2), "rss_mib": round(r, 1), "cpu_pct": round(c, 1)} for t, r, c in sampler.samples],
+    }
+
+def print_report(result):
+    c = result["config"]
+    print(f"{result['completed']}/{c['suppliers']} suppliers in {result['seconds']:.1f}s at concurrency {c['concurrency']} "
+          f"({result['suppliers_per_s']:.2f}/s, mix {c['mix']})")
+    print(f"{'step':<14} {'n':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for step, r in result["steps"].items():
+        print(f"{step:<14} {r['n']:>6} {r['p50_ms']:>9.1f} {r['p90_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}")
+    rss, cpu = result["rss_mib"], result["cpu_pct"]
+    print(f"RSS MiB start {rss['start']:.0f} / peak {rss['peak']:.0f} / end {rss['end']:.0f}; CPU avg {cpu['avg']:.0f}% / peak {cpu['peak']:.0f}%")
+    sess = result["sessions"]
+    print(f"session state: {sess['measured']} sessions, avg {sess['bytes_avg'] / 1024:.1f} KiB / max {sess['bytes_max'] / 1024:.1f} KiB")
+    for sid, kind, err in result["failures"][:10]: print(f"FAILED {sid} ({kind}): {err}")
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Simulate concurrent suppliers walking Steps 1-3 of app.py.")
+    p.add_argument("--suppliers", type=int, default=200, help="total supplier sessions to run")
+    p.add_argument("--concurrency", type=int, nargs="+", default=[8], help="concurrent sessions; several values run a sweep")
+    p.add_argument("--mix", default=DEFAULT_MIX, help="input mix, e.g. typical=0.8,full=0.1,empty=0.1")
+    p.add_argument("--langs", nargs="+", default=["fr", "en"], choices=list(TRANSLATIONS))
+    p.add_argument("--think", type=float, default=0.0, help="max random pause before each session starts (s)")
+    p.add_argument("--p99-budget-ms", type=float, default=None, help="fail if Step 3 p99 exceeds this")
+    p.add_argument("--app", default=APP_PATH)
+    p.add_argument("--json", help="write results (with the RSS/CPU timeline) to this file")
+    p.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "esg_load_test.db"),
+                   help="report store the simulated suppliers write to (kept apart from esg_reports.db)")
+    args = p.parse_args(argv)
+    os.environ["ESG_DB_PATH"] = args.db  # read when app.py first imports store
+
+    runs = []
+    for n in args.concurrency:
+        result = run(args.suppliers, n, args.mix, args.langs, args.think, app_path=args.app)
+        print_report(result)
+        runs.append(result)
+    if args.json:
+        with open(args.json, "w") as f: json.dump(runs, f, indent=2)
+    over = args.p99_budget_ms is not None and any(r["steps"]["step2_submit"]["p99_ms"] > args.p99_budget_ms for r in runs)
+    if over: print(f"Step 3 p99 over budget ({args.p99_budget_ms:.0f} ms)")
+    return 1 if over or any(r["failures"] for r in runs) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import ACTIVITY_ORDER
+
+# --- SYNTHETIC SUPPLIERS ---
+# Typical annual magnitudes per Step 2 field, so totals and table widths look like real reports
+TYPICAL_QTY = {
+    "natural_gas": 250_000, "heating_oil": 8_000, "propane": 2_000, "diesel": 15_000, "petrol": 6_000,
+    "ref_R410A": 5, "ref_R32": 3, "ref_R134a": 4, "electricity_fr": 400_000, "district_heat": 120_000,
+    "grey_fleet_avg": 60_000, "flight_avg": 90_000, "hotel_night_avg": 150,
+}
+
+# Share of suppliers with no activity at all / every field filled; the rest get a random subset
+EMPTY_SHARE = 0.05
+FULL_SHARE = 0.05
+
+def synthetic_supplier(rng, i):
+    roll = rng.random()
+    if roll < EMPTY_SHARE:
+        active = []
+    elif roll < EMPTY_SHARE + FULL_SHARE:
+        active = list(ACTIVITY_ORDER)
+    else:
+        active = rng.sample(ACTIVITY_ORDER, rng.randint(1, len(ACTIVITY_ORDER) - 1))
+    quantities = {k: round(TYPICAL_QTY[k] * rng.lognormvariate(0, 1), 2) if k in active else 0.0 for k in ACTIVITY_ORDER}
+    return {
+        "supplier_id": f"SUP-{i:06d}",
+        "company": f"SUPPLIER {i:06d} SAS",
+        "country": "France",
+        "year": "2025",
+        "revenue": round(rng.uniform(2e5, 5e8), 2),
+        "currency": rng.choice(["EUR", "EUR", "EUR", "USD", "GBP"]),
+        "signer": "Jean Dupont",
+        "lang": rng.choice(["fr", "en"]),
+        "evidence": ";".join(f"invoice_{j}.pdf" for j in range(rng.randint(0, 4))),
+        "quantities": quantities,
+    }
+
+def synthetic_suppliers(n, seed=42):
+    rng = random.Random(seed)
+    return [synthetic_supplier(rng, i) for i in range(n)]
+
+def long_activity_table(suppliers):
+    # Columnar (supplier_id, key, quantity) table for calculate_emissions_batch
+    import pandas as pd
+    ids, keys, qty = [], [], []
+    for s in suppliers:
+        for k, v in s["quantities"].items():
+            ids.append(s["supplier_id"])
+            keys.append(k)
+            qty.append(v)
+    return pd.DataFrame({"supplier_id": ids, "key": keys, "quantity": qty})
+
+SITE_COUNTRIES = ["France", "Germany", "Spain", "Italy", "Belgium"]
+
+def synthetic_site_table(n_sites, seed=42):
+    # Wide site table for sites.calculate_sites: one synthetic supplier's quantities per site
+    import pandas as pd
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_sites):
+        s = synthetic_supplier(rng, i)
+        rows.append({"site": f"SITE-{i:04d}", "country": rng.choice(SITE_COUNTRIES), **s["quantities"]})
+    return pd.DataFrame(rows)
@@ -0,0 +1,155 @@
+import argparse
+import csv
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from translations import TRANSLATIONS
+from engine import ACTIVITY_ORDER, make_inputs, calculate_rows, summarize
+from report import build_pdf
+from factor_registry import factors_for
+
+# --- BULK CARBON PACK GENERATION (HEADLESS) ---
+# Supplier table: one row per supplier, profile columns + one column per activity key
+# (natural_gas, electricity_fr, ...). Missing activity columns count as 0.
+PROFILE_DEFAULTS = {
+    "company": "", "country": "France", "year": "2025", "revenue": 0.0,
+    "currency": "EUR", "signer": "", "lang": "fr", "evidence": "",
+}
+
+def read_suppliers(path):
+    if str(path).lower().endswith((".xlsx", ".xls")):
+        table = pd.read_excel(path, dtype={"supplier_id": str, "year": str})
+    else:
+        table = pd.read_csv(path, dtype={"supplier_id": str, "year": str})
+    if "supplier_id" not in table.columns:
+        table["supplier_id"] = [str(i + 1) for i in range(len(table))]
+    # Each supplier gets its own PDF: ids that sanitise to the same file name (also on
+    # case-insensitive file systems) would overwrite each other in out_dir and the zip
+    table["supplier_id"] = table["supplier_id"].fillna(pd.Series([str(i + 1) for i in range(len(table))], index=table.index))
+    names = table["supplier_id"].map(pdf_filename).str.lower()
+    clash = table.loc[names.duplicated(keep=False), "supplier_id"]
+    if len(clash): raise ValueError("supplier_id values must give distinct file names: " + ", ".join(clash.astype(str)))
+    return table
+
+def supplier_records(table):
+    for rec in table.to_dict("records"):
+        for k, v in PROFILE_DEFAULTS.items():
+            if k not in rec or pd.isna(rec[k]): rec[k] = v
+        for k in ACTIVITY_ORDER:
+            if k not in rec or pd.isna(rec[k]): rec[k] = 0.0
+        yield rec
+
+def pdf_filename(supplier_id):
+    return "Carbon_Pack_" + re.sub(r"[^A-Za-z0-9._-]+", "_", str(supplier_id)) + ".pdf"
+
+def render_supplier(rec, out=None):
+    # Same validation and calculation path as Steps 1-3 of the app
+    lang = rec["lang"] if rec["lang"] in TRANSLATIONS else "fr"
+    company = str(rec["company"]).strip().upper()
+    revenue = float(rec["revenue"])
+    signer = str(rec["signer"]).strip()
+    if not company or revenue <= 0: raise ValueError(TRANSLATIONS["en"]["err_company"])
+    if len(signer) < 3: raise ValueError(TRANSLATIONS["en"]["err_signer"])
+
+    inputs = make_inputs({k: rec[k] for k in ACTIVITY_ORDER})
+    input_keys = [k for k, v in inputs.items() if v.quantity > 0]
+    df = calculate_rows(inputs, factors_for(rec["country"], rec["year"]))
+    evidence = [e.strip() for e in str(rec["evidence"]).split(";") if e.strip()]
+    return build_pdf(company, str(rec["country"]), str(rec["year"]), revenue, str(rec["currency"]),
+                     df, summarize(df), evidence, signer, input_keys, lang, out=out)
+
+def _render_job(rec, out_dir):
+    # Renders straight into out_dir (or a temp file for zip-only runs) and returns the path
+    if out_dir is None:
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+    else:
+        path = os.path.join(out_dir, pdf_filename(rec["supplier_id"]))
+    try:
+        with open(path, "wb") as f: render_supplier(rec, out=f)
+    except BaseException:
+        if os.path.exists(path): os.remove(path)
+        raise
+    return path
+
+def print_progress(done, total, failed, elapsed):
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"\r{done}/{total} rendered ({failed} failed, {rate:,.1f}/s)", end="", file=sys.stderr, flush=True)
+
+def bulk_render(table, out_dir=None, zip_path=None, workers=None, progress=print_progress, progress_every=50):
+    # Writes one PDF per supplier to out_dir and/or zip_path as workers finish.
+    # Failures go to failures.csv next to the output; returns a run summary.
+    if out_dir is None and zip_path is None: raise ValueError("out_dir or zip_path is required")
+    workers = workers or os.cpu_count() or 1
+    manifest_dir = out_dir or os.path.dirname(os.path.abspath(zip_path))
+    if out_dir: os.makedirs(out_dir, exist_ok=True)
+    records = supplier_records(table)
+    total = len(table)
+    # Workers write files; zip members are then copied from them by this process only
+    max_pending = workers * 4
+
+    done, failures, start = 0, [], time.perf_counter()
+    archive = zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) if zip_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_pending:
+                    rec = next(records, None)
+                    if rec is None:
+                        exhausted = True
+                        break
+                    pending[pool.submit(_render_job, rec, out_dir)] = rec
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    rec = pending.pop(fut)
+                    try:
+                        path = fut.result()
+                        if archive is not None:
+                            archive.write(path, pdf_filename(rec["supplier_id"]))
+                            if not out_dir: os.remove(path)
+                    except Exception as e:
+                        failures.append((rec["supplier_id"], type(e).__name__, str(e)))
+                    done += 1
+                    if progress and (done % progress_every == 0 or done == total):
+                        progress(done, total, len(failures), time.perf_counter() - start)
+    finally:
+        if archive is not None: archive.close()
+    if progress: print(file=sys.stderr)
+
+    manifest = None
+    if failures:
+        manifest = os.path.join(manifest_dir, "failures.csv")
+        with open(manifest, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["supplier_id", "error_type", "error"])
+            w.writerows(failures)
+    return {"total": total, "rendered": done - len(failures), "failed": len(failures),
+            "seconds": time.perf_counter() - start, "failures_manifest": manifest}
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Render one Carbon Pack PDF per supplier row.")
+    p.add_argument("suppliers", help="CSV or Excel supplier table")
+    p.add_argument("--out", help="output directory for the PDFs")
+    p.add_argument("--zip", dest="zip_path", help="write the PDFs into this zip archive")
+    p.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = p.parse_args(argv)
+    if not args.out and not args.zip_path: p.error("one of --out or --zip is required")
+
+    try:
+        table = read_suppliers(args.suppliers)
+    except ValueError as e:
+        p.error(str(e))
+    summary = bulk_render(table, args.out, args.zip_path, args.workers)
+    print(f"{summary['rendered']}/{summary['total']} rendered in {summary['seconds']:.1f}s, {summary['failed']} failed")
+    if summary["failures_manifest"]: print(f"Failures: {summary['failures_manifest']}")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import streamlit as st
+import pandas as pd
+from translations import TRANSLATIONS, LANGUAGE_NAMES
+from store import get_store
+
+# --- BUYER DASHBOARD (streamlit run dashboard.py) ---
+# Reads the running portfolio aggregates kept by the report store; nothing here rescans reports.
+st.set_page_config(page_title="VSME Portfolio", page_icon="📊", layout="wide")
+
+with st.sidebar:
+    lang = st.radio("Language / Langue", list(LANGUAGE_NAMES), format_func=LANGUAGE_NAMES.get)
+T = TRANSLATIONS[lang]
+
+store = get_store()
+years = store.portfolio_years()
+
+st.title(T["dash_title"])
+st.caption(T["dash_caption"])
+if not years:
+    st.info(T["dash_empty"])
+    st.stop()
+
+choice = st.selectbox(T["dash_year"], [T["dash_all_years"]] + years[::-1])
+year = None if choice == T["dash_all_years"] else choice
+
+# --- 1. TOTALS ---
+totals = store.portfolio_totals(year)
+c0, c1, c2, c3, c4 = st.columns(5)
+c0.metric(T["dash_suppliers"], f"{totals['suppliers']:,}")
+c1.metric("Scope 1", f"{totals['scope1']:,.2f}", "kgCO2e")
+c2.metric("Scope 2", f"{totals['scope2']:,.2f}", "kgCO2e")
+c3.metric("Scope 3", f"{totals['scope3']:,.2f}", "kgCO2e")
+c4.metric(T["total_footprint"], f"{totals['total']:,.2f}", "kgCO2e")
+
+# --- 2. INTENSITY DISTRIBUTION ---
+st.subheader(T["dash_intensity"])
+dist = store.intensity_distribution(year)
+st.bar_chart(pd.DataFrame({
+    "bucket": [f"{b['low']:g}–{b['high']:g}" if b["high"] is not None else f"≥ {b['low']:g}" for b in dist],
+    T["dash_suppliers"]: [b["suppliers"] for b in dist],
+}).set_index("bucket"))
+
+# --- 3. TOP EMITTERS ---
+left, right = st.columns(2)
+with left:
+    st.subheader(T["dash_top"])
+    by_choice = st.radio(T["dash_top_by"], [T["dash_by_total"], T["dash_by_intensity"]], horizontal=True)
+    by = "total" if by_choice == T["dash_by_total"] else "intensity"
+    top = store.top_suppliers(year, n=10, by=by)
+    st.dataframe(pd.DataFrame(top, columns=["company", "year", "scope1", "scope2", "scope3", "total", "intensity"]),
+                 hide_index=True, width="stretch")
+
+with right:
+    st.subheader(T["dash_categories"])
+    cats = store.category_totals(year)
+    st.dataframe(pd.DataFrame(cats, columns=["category", "emissions"]), hide_index=True, width="stretch")
+    if cats:
+        category = st.selectbox(T["dash_category"], [c["category"] for c in cats])
+        st.caption(T["dash_top_category"])
+        st.dataframe(pd.DataFrame(store.top_emitters_by_category(category, year, n=10),
+                                  columns=["company", "year", "emissions"]), hide_index=True, width="stretch")
@@ -0,0 +1,329 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from functools import lru_cache
+from translations import TRANSLATIONS, ACTIVITY_LABELS, display_label
+import metrics
+
+# --- 1. DATA CLASSES ---
+@dataclass
+class ActivityInput:
+    key: str
+    quantity: float
+    unit: str
+    category: str
+
+@dataclass
+class Factor:
+    key: str
+    value: float
+    unit: str
+    source: str
+    id: str
+    uncertainty: float = 0.0  # relative half-width of the 95% interval (ADEME "incertitude"), 0.1 = ±10%
+
+FACTORS = {
+    "natural_gas": Factor("natural_gas", 0.244, "kgCO2e/kWh", "ADEME", "GAS-NAT", 0.05),
+    "heating_oil": Factor("heating_oil", 3.2, "kgCO2e/L", "ADEME", "OIL-HEAT", 0.05),
+    "propane": Factor("propane", 3.1, "kgCO2e/kg", "ADEME", "LPG-PROP", 0.05),
+    "diesel": Factor("diesel", 3.16, "kgCO2e/L", "ADEME", "FUEL-DSL", 0.05),
+    "petrol": Factor("petrol", 2.8, "kgCO2e/L", "ADEME", "FUEL-PET", 0.05),
+    "ref_R410A": Factor("ref_R410A", 2088, "kgCO2e/kg", "ADEME", "REF-R410A", 0.3),
+    "ref_R32": Factor("ref_R32", 675, "kgCO2e/kg", "ADEME", "REF-R32", 0.3),
+    "ref_R134a": Factor("ref_R134a", 1430, "kgCO2e/kg", "ADEME", "REF-R134a", 0.3),
+    "electricity_fr": Factor("electricity_fr", 0.052, "kgCO2e/kWh", "ADEME", "ELEC-FR", 0.1),
+    "district_heat": Factor("district_heat", 0.170, "kgCO2e/kWh", "ADEME", "HEAT-NET", 0.2),
+    "grey_fleet_avg": Factor("grey_fleet_avg", 0.218, "kgCO2e/km", "ADEME", "TRAVEL-CAR-AVG", 0.2),
+    "flight_avg": Factor("flight_avg", 0.14, "kgCO2e/km", "ADEME", "FLIGHT-AVG", 0.5),
+    "hotel_night_avg": Factor("hotel_night_avg", 6.9, "kgCO2e/night", "ADEME", "HOTEL-FR-AVG", 0.5)
+}
+
+# Force Scope Order for Table: S1 -> S2 -> S3
+ACTIVITY_ORDER = [
+    "natural_gas", "heating_oil", "propane", "diesel", "petrol", "ref_R410A", "ref_R32", "ref_R134a", # S1
+    "electricity_fr", "district_heat", # S2
+    "grey_fleet_avg", "flight_avg", "hotel_night_avg" # S3
+]
+
+# Unit & GHG category of each Step 2 field
+ACTIVITY_META = {
+    "natural_gas": ("kWh", "Scope 1 - Stationary"),
+    "heating_oil": ("Liters", "Scope 1 - Stationary"),
+    "propane": ("kg", "Scope 1 - Stationary"),
+    "diesel": ("Liters", "Scope 1 - Mobile"),
+    "petrol": ("Liters", "Scope 1 - Mobile"),
+    "ref_R410A": ("kg", "Scope 1 - Fugitive"),
+    "ref_R32": ("kg", "Scope 1 - Fugitive"),
+    "ref_R134a": ("kg", "Scope 1 - Fugitive"),
+    "electricity_fr": ("kWh", "Scope 2 - Energy"),
+    "district_heat": ("kWh", "Scope 2 - Energy"),
+    "grey_fleet_avg": ("km", "Scope 3 - Business Travel"),
+    "flight_avg": ("km", "Scope 3 - Business Travel"),
+    "hotel_night_avg": ("night", "Scope 3 - Business Travel"),
+}
+
+# Scope is stored as a small categorical code: 0 -> Scope 1, 1 -> Scope 2, 2 -> Scope 3
+SCOPES = ["Scope 1", "Scope 2", "Scope 3"]
+SCOPE_DTYPE = pd.CategoricalDtype(SCOPES)
+CATEGORY_SCOPE = {cat: SCOPES.index(cat.split(" - ")[0]) for _, cat in ACTIVITY_META.values()}
+
+def scope_code(category):
+    code = CATEGORY_SCOPE.get(category)
+    if code is None: code = SCOPES.index(category.split(" - ")[0])
+    return code
+
+# Evidence & exclusion lines of the PDF, in S1 -> S2 -> S3 order:
+# (activity keys, evidence label, exclusion label). Any key present -> evidence, none -> exclusion.
+EVIDENCE_GROUPS = [
+    (["natural_gas"], "ev_gas", "ex_gas"),
+    (["heating_oil"], "ev_oil", "ex_oil"),
+    (["propane"], "ev_prop", "ex_prop"),
+    (["diesel"], "ev_diesel", "ex_diesel"),
+    (["petrol"], "ev_petrol", "ex_petrol"),
+    (["ref_R410A", "ref_R32", "ref_R134a"], "ev_hvac", "ex_ref"),
+    (["electricity_fr"], "ev_elec", "ex_elec"),
+    (["district_heat"], "ev_heat", "ex_heat"),
+    (["grey_fleet_avg"], "ev_travel", "ex_grey"),
+    (["flight_avg"], "ev_flight", "ex_flight"),
+    (["hotel_night_avg"], "ev_hotel", "ex_hotel"),
+]
+
+# Active keys as a bitmask: bit i <-> ACTIVITY_ORDER[i]
+KEY_BIT = {k: 1 << i for i, k in enumerate(ACTIVITY_ORDER)}
+_GROUP_MASKS = [(sum(KEY_BIT[k] for k in keys), ev, ex) for keys, ev, ex in EVIDENCE_GROUPS]
+
+def key_mask(input_keys):
+    # list / set / frozenset of keys (or an existing mask) -> int mask; unknown keys are ignored
+    if isinstance(input_keys, int): return input_keys
+    mask = 0
+    for k in input_keys: mask |= KEY_BIT.get(k, 0)
+    return mask
+
+# lang -> ((group bits, evidence label, exclusion label), ...), resolved once per process
+GROUP_LABELS = {lang: tuple((bits, T[ev], T[ex]) for bits, ev, ex in _GROUP_MASKS) for lang, T in TRANSLATIONS.items()}
+
+@lru_cache(maxsize=None)
+def evidence_lists(mask, lang):
+    # (evidence labels, exclusion labels) for one key combination; at most 2^13 per language
+    groups = GROUP_LABELS[lang]
+    evidence = tuple(ev for bits, ev, _ in groups if mask & bits)
+    exclusions = tuple(ex for bits, _, ex in groups if not mask & bits)
+    return evidence, exclusions
+
+RESULT_COLUMNS = ["Scope", "Category", "Activity", "Quantity", "Unit", "FactorRef", "Emissions_kgCO2e", "Source", "Key"]
+# Per-row factor, kept by batch results where rows of one key may come from different factor sets (sites)
+FACTOR_COLUMNS = ["FactorId", "FactorValue", "FactorUncertainty"]
+
+def make_inputs(quantities):
+    # {key: qty} -> {key: ActivityInput}, in form order
+    return {k: ActivityInput(k, float(quantities.get(k, 0.0)), *ACTIVITY_META[k]) for k in ACTIVITY_ORDER}
+
+# --- 2. CALCULATION ---
+def get_activity_label(key, lang):
+    # Precomputed per language in translations.ACTIVITY_LABELS
+    label = ACTIVITY_LABELS[lang].get(key)
+    return label if label is not None else display_label(TRANSLATIONS[lang].get(key, key))
+
+class ResultRows:
+    # Lean calculate_emissions result: parallel arrays, one entry per calculated row (S1 -> S3).
+    # Keys are int8 codes into ACTIVITY_ORDER; labels, factor refs and sources are formatted only
+    # when rendering (to_frame / records / detail_rows), from the shared factor dict.
+    __slots__ = ("key_codes", "scope_codes", "categories", "units", "quantity", "emissions", "factors")
+
+    def __init__(self, key_codes, scope_codes, categories, units, quantity, emissions, factors):
+        self.key_codes = key_codes
+        self.scope_codes = scope_codes
+        self.categories = categories
+        self.units = units
+        self.quantity = quantity
+        self.emissions = emissions
+        self.factors = factors
+
+    def __len__(self):
+        return len(self.key_codes)
+
+    @property
+    def empty(self):
+        return not len(self.key_codes)
+
+    @property
+    def keys(self):
+        return [ACTIVITY_ORDER[c] for c in self.key_codes]
+
+    def summary(self):
+        s1, s2, s3 = np.bincount(self.scope_codes, weights=self.emissions, minlength=len(SCOPES)).tolist()
+        return {"scope1": s1, "scope2": s2, "scope3": s3, "total": s1 + s2 + s3}
+
+    def digest(self):
+        # Stable fingerprint for the PDF cache (values, not formatting)
+        h = hashlib.sha256()
+        for a in (self.key_codes, self.quantity, self.emissions): h.update(np.ascontiguousarray(a).tobytes())
+        h.update(repr([(f.value, f.unit, f.source, f.id) for f in (self.factors[k] for k in self.keys)]).encode("utf-8"))
+        h.update(repr((self.categories, self.units)).encode("utf-8"))
+        return h.hexdigest()
+
+    def detail_rows(self, lang):
+        # (scope, activity label, quantity, unit, emissions) per row, for the PDF detail table
+        return zip([SCOPES[c] for c in self.scope_codes], [get_activity_label(k, lang) for k in self.keys],
+                   self.quantity.tolist(), self.units, self.emissions.tolist())
+
+    def records(self, lang):
+        # calculate_emissions rows as plain dicts (JSON-ready, Scope as text)
+        out = []
+        for key, code, cat, unit, qty, emissions in zip(self.keys, self.scope_codes, self.categories, self.units,
+                                                        self.quantity.tolist(), self.emissions.tolist()):
+            f = self.factors[key]
+            out.append({"Scope": SCOPES[code], "Category": cat, "Activity": get_activity_label(key, lang),
+                        "Quantity": qty, "Unit": unit, "FactorRef": f"{f.value} ({f.unit})",
+                        "Emissions_kgCO2e": emissions, "Source": f"{f.source} [{f.id}]", "Key": key})
+        return out
+
+    def to_frame(self, lang):
+        if self.empty: return pd.DataFrame()
+        keys = self.keys
+        factors = [self.factors[k] for k in keys]
+        return pd.DataFrame({
+            "Scope": pd.Categorical.from_codes(self.scope_codes, dtype=SCOPE_DTYPE),
+            "Category": self.categories,
+            "Activity": [get_activity_label(k, lang) for k in keys],
+            "Quantity": self.quantity,
+            "Unit": self.units,
+            "FactorRef": [f"{f.value} ({f.unit})" for f in factors],
+            "Emissions_kgCO2e": self.emissions,
+            "Source": [f"{f.source} [{f.id}]" for f in factors],
+            "Key": keys,
+        })
+
+@metrics.instrumented("calculate_rows")
+def calculate_rows(inputs, factors):
+    # Same rows as calculate_emissions, without labels or a DataFrame
+    key_codes, scope_codes_, categories, units, qty, emissions = [], [], [], [], [], []
+    for i, key in enumerate(ACTIVITY_ORDER):
+        act = inputs.get(key)
+        if act is None or act.quantity <= 0: continue
+        factor = factors.get(key)
+        if not factor: continue
+        key_codes.append(i)
+        scope_codes_.append(scope_code(act.category))
+        categories.append(act.category)
+        units.append(act.unit)
+        qty.append(act.quantity)
+        emissions.append(act.quantity * factor.value)
+    return ResultRows(np.array(key_codes, dtype=np.int8), np.array(scope_codes_, dtype=np.int8), categories, units,
+                      np.array(qty, dtype=float), np.array(emissions, dtype=float), factors)
+
+@metrics.instrumented("calculate_emissions")
+def calculate_emissions(inputs, factors, lang):
+    return calculate_rows(inputs, factors).to_frame(lang)
+
+def scope_codes(df):
+    if isinstance(df, ResultRows): return df.scope_codes
+    scope = df["Scope"]
+    # dtype equality and Categorical.codes skip the Series round trips (list(categories), .cat.codes)
+    if scope.dtype == SCOPE_DTYPE: return scope.array.codes
+    return pd.Categorical(scope, categories=SCOPES).codes
+
+def float_column(df, col):
+    # to_numpy(dtype=float) takes pandas' conversion path even for float64 columns (~25 µs a call)
+    return np.asarray(df[col].to_numpy(), dtype=float)
+
+def scope_sums(df, groups=None, n_groups=1):
+    # Single pass over the rows: one bincount on (group, scope code) -> (n_groups, 3) matrix
+    codes = scope_codes(df)
+    weights = float_column(df, "Emissions_kgCO2e")
+    keep = codes >= 0
+    if groups is not None:
+        keep &= groups >= 0
+        codes = groups * len(SCOPES) + codes
+    if not keep.all(): codes, weights = codes[keep], weights[keep]
+    sums = np.bincount(codes, weights=weights, minlength=n_groups * len(SCOPES))
+    return sums.reshape(n_groups, len(SCOPES)).astype(float, copy=False)
+
+@metrics.instrumented("summarize")
+def summarize(df):
+    if isinstance(df, ResultRows): return df.summary()
+    if df.empty: return {"scope1": 0.0, "scope2": 0.0, "scope3": 0.0, "total": 0.0}
+    s1, s2, s3 = scope_sums(df)[0]
+    return {"scope1": s1, "scope2": s2, "scope3": s3, "total": s1 + s2 + s3}
+
+def summarize_by(df, by, index=None):
+    # Grouped summarize for multi-supplier frames; index fixes the group order (missing groups -> zeros)
+    index = pd.Index(pd.unique(df[by]) if index is None else index, name=by)
+    sums = scope_sums(df, index.get_indexer(df[by]), len(index))
+    totals = pd.DataFrame(sums, index=index, columns=["scope1", "scope2", "scope3"])
+    totals["total"] = totals["scope1"] + totals["scope2"] + totals["scope3"]
+    return totals
+
+# --- 3. BATCH CALCULATION (MANY SUPPLIERS) ---
+def factor_table(factors, lang):
+    # One row per calculable key: everything calculate_emissions derives from the key alone
+    keys = [k for k in ACTIVITY_ORDER if k in factors]
+    return pd.DataFrame({
+        "Order": range(len(keys)),
+        "Scope": pd.Categorical.from_codes([scope_code(ACTIVITY_META[k][1]) for k in keys], dtype=SCOPE_DTYPE),
+        "Category": [ACTIVITY_META[k][1] for k in keys],
+        "Activity": [get_activity_label(k, lang) for k in keys],
+        "Unit": [ACTIVITY_META[k][0] for k in keys],
+        "FactorId": [factors[k].id for k in keys],
+        "FactorValue": [factors[k].value for k in keys],
+        "FactorUncertainty": [factors[k].uncertainty or 0.0 for k in keys],
+        "FactorRef": [f"{factors[k].value} ({factors[k].unit})" for k in keys],
+        "Source": [f"{factors[k].source} [{factors[k].id}]" for k in keys],
+    }, index=pd.Index(keys, name="key"))
+
+@metrics.instrumented("calculate_emissions_batch")
+def calculate_emissions_batch(activity, factors, lang):
+    # activity: columnar table, one row per supplier x key -> columns supplier_id, key, quantity
+    # Returns (rows, totals): rows in calculate_emissions layout plus supplier_id and FACTOR_COLUMNS,
+    # totals indexed by supplier_id with scope1/scope2/scope3/total (zeros for empty suppliers)
+    table = factor_table(factors, lang)
+    active = activity.loc[activity["quantity"] > 0, ["supplier_id", "key", "quantity"]]
+    df = active.join(table, on="key", how="inner").rename(columns={"key": "Key"})
+    df["Emissions_kgCO2e"] = df["quantity"].to_numpy(dtype=float) * df["FactorValue"].to_numpy()
+    df = df.sort_values(["supplier_id", "Order"], kind="stable").rename(columns={"quantity": "Quantity"})
+    rows = df[["supplier_id"] + RESULT_COLUMNS + FACTOR_COLUMNS].reset_index(drop=True)
+    rows["Quantity"] = rows["Quantity"].astype(float)
+    return rows, summarize_by(rows, "supplier_id", pd.unique(activity["supplier_id"]))
+
+# --- 4. UNCERTAINTY (MONTE CARLO) ---
+MC_DRAWS = 100_000
+MC_LEVEL = 0.95
+# Fixed seed: the same result always gets the same ranges, so reruns and cached PDFs agree
+MC_SEED = 20240101
+Z95 = 1.959963984540054
+
+def uncertainty_ranges(df, factors, draws=MC_DRAWS, level=MC_LEVEL, seed=MC_SEED):
+    # -> {"scope1": (low, high), ..., "total": (low, high)} at the given confidence level.
+    # Each factor is an independent lognormal with mean = its value and a 95% spread of ×/÷ (1 + uncertainty);
+    # all draws for a factor are one array row and the scopes are summed with one matrix product.
+    # Frames carrying FACTOR_COLUMNS (multi-site rows) use their own factors; rows sharing one factor share its draw.
+    if df.empty: return {k: (0.0, 0.0) for k in ("scope1", "scope2", "scope3", "total")}
+    codes = scope_codes(df)
+    keep = codes >= 0
+    if isinstance(df, ResultRows):
+        point, keys = df.emissions[keep], np.array(df.keys, dtype=object)[keep]
+    else:
+        point, keys = float_column(df, "Emissions_kgCO2e")[keep], df["Key"].to_numpy()[keep]
+    codes = codes[keep]
+    if not isinstance(df, ResultRows) and "FactorUncertainty" in df.columns:
+        u = float_column(df, "FactorUncertainty")[keep]
+        ident = (df["FactorId"].astype(str) + "|" + df["FactorValue"].astype(str)).to_numpy()[keep]
+    else:
+        u = np.array([getattr(factors.get(k), "uncertainty", 0.0) or 0.0 for k in keys])
+        ident = keys
+    col, uniq = pd.factorize(ident)
+    first = np.unique(col, return_index=True)[1]
+    sigma = np.log1p(u[first]) / Z95
+
+    weights = np.zeros((len(SCOPES), len(uniq)))
+    np.add.at(weights, (codes, col), point)
+    varying = sigma > 0
+    sims = np.repeat(weights[:, ~varying].sum(axis=1, keepdims=True), draws, axis=1)
+    if varying.any():
+        s = sigma[varying, None]
+        z = np.random.default_rng(seed).standard_normal((int(varying.sum()), draws))
+        sims += weights[:, varying] @ np.exp(s * z - 0.5 * s * s)
+    sims = np.vstack([sims, sims.sum(axis=0)])
+    low, high = np.quantile(sims, [(1 - level) / 2, (1 + level) / 2], axis=1)
+    return {k: (float(lo), float(hi)) for k, lo, hi in zip(("scope1", "scope2", "scope3", "total"), low, high)}
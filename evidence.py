@@ -0,0 +1,110 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+import metrics
+
+# --- EVIDENCE STORE (CONTENT-ADDRESSED, ON DISK) ---
+# Uploads are copied CHUNK_BYTES at a time into a temp file while SHA-256 is computed, then renamed
+# to <root>/<sha[:2]>/<sha>. Identical files (the same invoice sent by several suppliers) land on the
+# same path and are kept once. Memory per upload is one chunk, whatever the file size.
+EVIDENCE_DIR = os.environ.get("ESG_EVIDENCE_DIR", "evidence")
+CHUNK_BYTES = 1024 * 1024
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+@dataclass(frozen=True)
+class EvidenceRef:
+    name: str
+    sha256: str
+    size: int
+
+class EvidenceWriter:
+    # One upload in progress: write() chunks as they arrive, then commit() or abort()
+    def __init__(self, store, max_bytes=None):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        fd, self._tmp = tempfile.mkstemp(dir=store.tmp_dir, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.abort()
+            raise OverflowError(f"evidence file exceeds {self.max_bytes} bytes")
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self, name):
+        # -> (EvidenceRef, duplicate)
+        self._file.close()
+        digest = self._hash.hexdigest()
+        dest = self.store.path(digest)
+        duplicate = os.path.exists(dest)
+        if duplicate:
+            os.remove(self._tmp)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(self._tmp, dest)  # same content under the same name, so a racing writer is harmless
+        metrics.inc("esg_evidence_files_total", duplicate=duplicate)
+        metrics.inc("esg_evidence_bytes_total", self.size, duplicate=duplicate)
+        return EvidenceRef(os.path.basename(str(name or digest)), digest, self.size), duplicate
+
+    def abort(self):
+        if not self._file.closed: self._file.close()
+        if os.path.exists(self._tmp): os.remove(self._tmp)
+
+class EvidenceStore:
+    def __init__(self, root=EVIDENCE_DIR):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def __contains__(self, sha256):
+        # Only a lowercase hex digest names a stored file; anything else ("../..", "/etc/...") is never a path
+        return isinstance(sha256, str) and SHA256_RE.fullmatch(sha256) is not None and os.path.exists(self.path(sha256))
+
+    def ref(self, sha256, name=None):
+        # EvidenceRef for an already stored file, or None
+        if sha256 not in self: return None
+        return EvidenceRef(os.path.basename(str(name or sha256)), sha256, os.path.getsize(self.path(sha256)))
+
+    def writer(self, max_bytes=None):
+        return EvidenceWriter(self, max_bytes)
+
+    def put_chunks(self, chunks, name, max_bytes=None):
+        w = self.writer(max_bytes)
+        try:
+            for chunk in chunks: w.write(chunk)
+        except BaseException:
+            w.abort()
+            raise
+        return w.commit(name)
+
+    def put_file(self, fileobj, name=None, max_bytes=None):
+        # Path or binary file-like (e.g. a Streamlit UploadedFile) -> (EvidenceRef, duplicate)
+        if isinstance(fileobj, str):
+            with open(fileobj, "rb") as f: return self.put_file(f, name or fileobj, max_bytes)
+        if hasattr(fileobj, "seek"): fileobj.seek(0)
+        return self.put_chunks(iter(lambda: fileobj.read(CHUNK_BYTES), b""), name or getattr(fileobj, "name", None), max_bytes)
+
+    def open(self, sha256):
+        if sha256 not in self: raise FileNotFoundError(f"no evidence file {sha256!r}")
+        return open(self.path(sha256), "rb")
+
+_EVIDENCE = None
+_EVIDENCE_LOCK = threading.Lock()
+
+def get_evidence_store(root=EVIDENCE_DIR):
+    # Process-wide store shared by every Streamlit session
+    global _EVIDENCE
+    with _EVIDENCE_LOCK:
+        if _EVIDENCE is None or _EVIDENCE.root != root:
+            _EVIDENCE = EvidenceStore(root)
+        return _EVIDENCE
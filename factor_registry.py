@@ -0,0 +1,195 @@
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+from functools import lru_cache
+import numpy as np
+from engine import Factor, FACTORS, ACTIVITY_ORDER
+
+# --- EMISSION FACTOR REGISTRY (COMPILED, MEMORY-MAPPED) ---
+# Source: CSV with columns key, country, year, value, unit, source, id[, uncertainty] (one row per factor version).
+# country "" = applies everywhere. The CSV is compiled once into a single binary file:
+#   MAGIC | u32 header length | JSON header | 8-byte aligned arrays
+# holding an open-addressing hash table on (key, country, year) plus columnar factor data,
+# so opening it is an mmap and a lookup is one or two array probes.
+FACTORS_CSV = os.environ.get("ESG_FACTORS_CSV", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "factors.csv"))
+FACTORS_REG = os.environ.get("ESG_FACTORS_REG", os.path.splitext(FACTORS_CSV)[0] + ".reg")
+MAGIC = b"ESGFREG1"
+# Seed factors are French; countries without their own rows keep today's behaviour
+DEFAULT_COUNTRY = "france"
+
+def normalize_country(country):
+    return " ".join(str(country or "").split()).casefold()
+
+def _slot_hash(key, country, year):
+    h = hashlib.blake2b(f"{key}\x1f{country}\x1f{int(year)}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(h, "little")
+
+def _value(v):
+    # Keep integral factors as int so FactorRef renders "2088 (...)" exactly as before
+    v = float(v)
+    return int(v) if v.is_integer() else v
+
+# --- 1. COMPILER ---
+def compile_registry(csv_path=FACTORS_CSV, out_path=FACTORS_REG):
+    rows = {}
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for r in csv.DictReader(f):
+            ident = (r["key"].strip(), normalize_country(r.get("country")), int(r["year"]))
+            rows[ident] = r  # later rows override earlier duplicates
+
+    strings, string_idx = [], {}
+    def intern(s):
+        s = str(s or "").strip()
+        if s not in string_idx:
+            string_idx[s] = len(strings)
+            strings.append(s)
+        return string_idx[s]
+
+    n = len(rows)
+    cols = {
+        "key": np.empty(n, np.int32), "country": np.empty(n, np.int32), "year": np.empty(n, np.int32),
+        "value": np.empty(n, np.float64), "unit": np.empty(n, np.int32),
+        "source": np.empty(n, np.int32), "id": np.empty(n, np.int32), "uncertainty": np.empty(n, np.float64),
+    }
+    cap = 1 << max(4, (2 * n - 1).bit_length())  # load factor <= 0.5
+    slot_hash = np.zeros(cap, np.uint64)
+    slot_row = np.full(cap, -1, np.int32)
+    for i, ((key, country, year), r) in enumerate(rows.items()):
+        cols["key"][i], cols["country"][i], cols["year"][i] = intern(key), intern(country), year
+        cols["value"][i] = float(r["value"])
+        cols["uncertainty"][i] = float(r.get("uncertainty") or 0.0)
+        cols["unit"][i], cols["source"][i], cols["id"][i] = intern(r["unit"]), intern(r["source"]), intern(r["id"])
+        h = _slot_hash(key, country, year)
+        s = h & (cap - 1)
+        while slot_row[s] >= 0: s = (s + 1) & (cap - 1)
+        slot_hash[s], slot_row[s] = h, i
+
+    encoded = [s.encode("utf-8") for s in strings]
+    str_offsets = np.zeros(len(encoded) + 1, np.int64)
+    str_offsets[1:] = np.cumsum([len(b) for b in encoded])
+    arrays = dict(cols, slot_hash=slot_hash, slot_row=slot_row, str_offsets=str_offsets,
+                  str_blob=np.frombuffer(b"".join(encoded) or b"\0", np.uint8))
+
+    years = sorted({y for (_, _, y) in rows})
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        layout[name] = {"dtype": arr.dtype.str, "count": int(arr.size), "offset": offset}
+        offset += (arr.nbytes + 7) // 8 * 8
+    header = json.dumps({"rows": n, "capacity": cap, "years": years, "arrays": layout,
+                         "source_csv": os.path.basename(csv_path)}).encode("utf-8")
+    base = (len(MAGIC) + 4 + len(header) + 7) // 8 * 8
+
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + len(header).to_bytes(4, "little") + header)
+        f.write(b"\0" * (base - f.tell()))
+        for name, arr in arrays.items():
+            f.write(arr.tobytes())
+            f.write(b"\0" * ((8 - arr.nbytes % 8) % 8))
+    os.replace(tmp, out_path)
+    return out_path
+
+# --- 2. MEMORY-MAPPED READER ---
+class FactorRegistry:
+    def __init__(self, path=FACTORS_REG):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC: raise ValueError(f"{path} is not a compiled factor registry")
+            header_len = int.from_bytes(f.read(4), "little")
+            self.header = json.loads(f.read(header_len))
+        base = (len(MAGIC) + 4 + header_len + 7) // 8 * 8
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        for name, spec in self.header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            start = base + spec["offset"]
+            setattr(self, "_" + name, self._mm[start:start + spec["count"] * dtype.itemsize].view(dtype))
+        if "uncertainty" not in self.header["arrays"]:  # compiled before factors carried uncertainty
+            self._uncertainty = np.zeros(self.header["rows"], np.float64)
+        self.years = self.header["years"]
+        self._mask = self.header["capacity"] - 1
+        self._strings = {}
+
+    def __len__(self):
+        return self.header["rows"]
+
+    def _string(self, i):
+        s = self._strings.get(i)
+        if s is None:
+            s = bytes(self._str_blob[self._str_offsets[i]:self._str_offsets[i + 1]]).decode("utf-8")
+            self._strings[i] = s
+        return s
+
+    def _row(self, key, country, year):
+        h = _slot_hash(key, country, year)
+        s = h & self._mask
+        while True:
+            row = int(self._slot_row[s])
+            if row < 0: return None
+            if int(self._slot_hash[s]) == h: return row
+            s = (s + 1) & self._mask
+
+    def lookup(self, key, country="", year=None):
+        # Exact country first, then global rows, then the default country; for each, the newest
+        # factor version not later than the reporting year (or the oldest one for earlier years)
+        year = _year(year, self.years)
+        versions = [y for y in reversed(self.years) if y <= year] + [y for y in self.years if y > year]
+        seen = set()
+        for c in (normalize_country(country), "", DEFAULT_COUNTRY):
+            if c in seen: continue
+            seen.add(c)
+            for y in versions:
+                row = self._row(key, c, y)
+                if row is not None:
+                    return Factor(key, _value(self._value[row]), self._string(int(self._unit[row])),
+                                  self._string(int(self._source[row])), self._string(int(self._id[row])),
+                                  float(self._uncertainty[row]))
+        return None
+
+    def factors_for(self, country="", year=None, keys=ACTIVITY_ORDER):
+        # Drop-in replacement for engine.FACTORS
+        out = {}
+        for k in keys:
+            factor = self.lookup(k, country, year)
+            if factor is not None: out[k] = factor
+        return out
+
+def _year(year, years):
+    try:
+        return int(str(year).strip()[:4])
+    except (TypeError, ValueError):
+        return years[-1] if years else 0
+
+# --- 3. PROCESS-WIDE ACCESS ---
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+def get_registry(csv_path=FACTORS_CSV, reg_path=FACTORS_REG):
+    # Compile only when the CSV is newer than the compiled file; otherwise just mmap it
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            stale = not os.path.exists(reg_path) or (
+                os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(reg_path))
+            if stale: compile_registry(csv_path, reg_path)
+            _REGISTRY = FactorRegistry(reg_path)
+        return _REGISTRY
+
+@lru_cache(maxsize=256)
+def _cached_factors(country, year):
+    return get_registry().factors_for(country, year)
+
+def factors_for(country="", year=None):
+    # Factor set for a Step 1 profile; falls back to the built-in FACTORS if no registry is available
+    try:
+        found = _cached_factors(normalize_country(country), str(year))
+    except (OSError, ValueError, KeyError):
+        return FACTORS
+    return dict(found) if found else FACTORS
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else FACTORS_CSV
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".reg"
+    compile_registry(src, dst)
+    print(f"{len(FactorRegistry(dst))} factors compiled -> {dst}")
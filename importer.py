@@ -0,0 +1,234 @@
+import re
+from dataclasses import dataclass, field
+import pandas as pd
+from translations import TRANSLATIONS
+from engine import ACTIVITY_ORDER, ACTIVITY_META, make_inputs, get_activity_label
+
+# --- STREAMING ACTIVITY IMPORT (CSV / EXCEL) ---
+# Two layouts are recognised:
+#   long: one row per invoice/transaction -> an activity column + a quantity column (+ optional unit column)
+#   wide: one column per activity, e.g. "Natural Gas (kWh)", "electricity", "diesel_l"
+# Files are read CHUNK_ROWS rows at a time and only per-key running sums are kept. Quantities are
+# scaled to the form unit (unit column, or the unit in a wide column's header).
+CHUNK_ROWS = 50_000
+
+KEY_COLUMNS = ["activity", "activity_key", "key", "type", "energy", "fuel", "category", "product", "activité", "énergie", "carburant"]
+QTY_COLUMNS = ["quantity", "qty", "amount", "volume", "consumption", "value", "quantité", "consommation", "volume_l"]
+UNIT_COLUMNS = ["unit", "units", "uom", "unité"]
+
+# Extra spellings seen in utility and fuel-card exports (keys and form labels are added below)
+EXTRA_ALIASES = {
+    "gas": "natural_gas", "gaz": "natural_gas", "gaz naturel": "natural_gas", "natural gas": "natural_gas",
+    "fuel oil": "heating_oil", "fioul": "heating_oil", "heating oil": "heating_oil", "lpg": "propane",
+    "gazole": "diesel", "gasoil": "diesel", "b7": "diesel", "sp95": "petrol", "sp98": "petrol", "e10": "petrol",
+    "essence": "petrol", "gasoline": "petrol", "unleaded": "petrol",
+    "r410a": "ref_R410A", "r32": "ref_R32", "r134a": "ref_R134a",
+    "electricity": "electricity_fr", "elec": "electricity_fr", "électricité": "electricity_fr", "electricite": "electricity_fr", "power": "electricity_fr",
+    "district heating": "district_heat", "chauffage urbain": "district_heat", "heat": "district_heat",
+    "mileage": "grey_fleet_avg", "grey fleet": "grey_fleet_avg", "flight": "flight_avg", "flights": "flight_avg",
+    "hotel": "hotel_night_avg", "hotel nights": "hotel_night_avg", "nuitées": "hotel_night_avg",
+}
+
+# Scale to the unit used by the Step 2 form (kWh, Liters, kg, km, night)
+UNIT_SCALE = {
+    "kwh": 1.0, "mwh": 1000.0, "gwh": 1_000_000.0, "wh": 0.001,
+    "l": 1.0, "liter": 1.0, "liters": 1.0, "litre": 1.0, "litres": 1.0, "m3": 1000.0, "hl": 100.0,
+    "kg": 1.0, "t": 1000.0, "tonne": 1000.0, "tonnes": 1000.0, "g": 0.001,
+    "km": 1.0, "night": 1.0, "nights": 1.0, "nuit": 1.0, "nuits": 1.0,
+    "": 1.0,
+}
+
+# Unit of each UNIT_SCALE entry as used by the Step 2 form; a wide column whose header unit
+# belongs to another activity's dimension (e.g. "Diesel (kWh)") is rejected
+UNIT_BASE = {
+    "kwh": "kWh", "mwh": "kWh", "gwh": "kWh", "wh": "kWh",
+    "l": "Liters", "liter": "Liters", "liters": "Liters", "litre": "Liters", "litres": "Liters", "m3": "Liters", "hl": "Liters",
+    "kg": "kg", "t": "kg", "tonne": "kg", "tonnes": "kg", "g": "kg",
+    "km": "km", "night": "night", "nights": "night", "nuit": "night", "nuits": "night",
+}
+_UNIT_SUFFIX = re.compile(r"\s(" + "|".join(sorted((re.escape(u) for u in UNIT_SCALE if u), key=len, reverse=True)) + r")$")
+
+def normalize_name(name):
+    return re.sub(r"[\s_\-]+", " ", str(name)).strip().lower()
+
+def _build_aliases():
+    aliases = {normalize_name(k): k for k in ACTIVITY_ORDER}
+    for lang in TRANSLATIONS:
+        for k in ACTIVITY_ORDER:
+            aliases[normalize_name(get_activity_label(k, lang))] = k
+    for name, k in EXTRA_ALIASES.items():
+        aliases[normalize_name(name)] = k
+    return aliases
+
+ALIASES = _build_aliases()
+
+def resolve_key(name):
+    # "Natural Gas (kWh)" / "diesel_l" / "Gazole" -> activity key, or None
+    norm = normalize_name(name)
+    if norm in ALIASES: return ALIASES[norm]
+    stripped = normalize_name(re.sub(r"\(.*?\)", "", norm))
+    if stripped in ALIASES: return ALIASES[stripped]
+    head = normalize_name(_UNIT_SUFFIX.sub("", stripped))
+    return ALIASES.get(head)
+
+def header_unit(name):
+    # Unit written in a wide-layout header: "Electricity (MWh)" -> "mwh", "diesel_l" -> "l", "" if none.
+    # Only the first word in brackets counts, so Step 2 form labels ("Employee Vehicles (km driven)") read as km.
+    norm = normalize_name(name)
+    if norm in ALIASES: return ""
+    m = re.search(r"\((.*?)\)", norm)
+    if m: return (m.group(1).split() or [""])[0]  # "(km driven)" -> "km"
+    m = _UNIT_SUFFIX.search(norm)
+    return m.group(1) if m else ""
+
+def column_scale(name, key):
+    # Factor from the header's unit to the form unit of key; unknown or mismatched units raise
+    unit = header_unit(name)
+    if unit not in UNIT_SCALE: raise ValueError(f"Column '{name}': unknown unit '{unit}'")
+    base = UNIT_BASE.get(unit)
+    if base is not None and base != ACTIVITY_META[key][0]:
+        raise ValueError(f"Column '{name}': unit '{unit}' does not match {ACTIVITY_META[key][0]}")
+    return UNIT_SCALE[unit]
+
+def to_number(values):
+    # Column -> float Series, NaN where unparseable. Text cells may use decimal commas and spaced
+    # thousands ("1 234,5"), or both separators ("1.234,5" / "1,234.5": the last one is the decimal).
+    if values.dtype.kind in "biuf": return values.astype(float)
+    text = values.astype(str).str.strip().str.replace("[\\s\u00a0\u202f]", "", regex=True)
+    both = text.str.contains(",", regex=False) & text.str.contains(".", regex=False)
+    comma_last = text.str.rfind(",") > text.str.rfind(".")
+    text = text.mask(both & comma_last, text.str.replace(".", "", regex=False))
+    text = text.mask(both & ~comma_last, text.str.replace(",", "", regex=False))
+    return pd.to_numeric(text.str.replace(",", ".", regex=False), errors="coerce")
+
+def unparseable(values, numbers):
+    # Cells that hold something but did not parse as a number
+    return numbers.isna() & values.notna() & (values.astype(str).str.strip() != "")
+
+@dataclass
+class ImportSummary:
+    totals: dict = field(default_factory=dict)
+    rows_read: int = 0
+    rows_skipped: int = 0
+    unmapped: dict = field(default_factory=dict)
+
+    def activity_inputs(self):
+        return make_inputs(self.totals)
+
+def _pick(columns, candidates):
+    norm = {normalize_name(c): c for c in columns}
+    for cand in candidates:
+        if normalize_name(cand) in norm: return norm[normalize_name(cand)]
+    return None
+
+def _is_excel(source):
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    return str(name).lower().endswith((".xlsx", ".xlsm"))
+
+def _iter_excel_chunks(source, chunk_rows, sheet_name=None):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("Excel import requires openpyxl (pip install openpyxl)") from e
+    from zipfile import BadZipFile
+    from openpyxl.utils.exceptions import InvalidFileException
+    try:
+        wb = load_workbook(source, read_only=True, data_only=True)
+    except (BadZipFile, KeyError, InvalidFileException, OSError) as e:
+        raise ValueError(f"Not a readable .xlsx workbook: {e}") from e
+    try:
+        if sheet_name and sheet_name not in wb.sheetnames: raise ValueError(f"No sheet named '{sheet_name}'")
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h) if h is not None else f"col{i}" for i, h in enumerate(next(rows, []))]
+        buf = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunk_rows:
+                yield pd.DataFrame(buf, columns=header)
+                buf = []
+        if buf: yield pd.DataFrame(buf, columns=header)
+    finally:
+        wb.close()
+
+def _sniff_sep(source):
+    # French exports are often ';'-separated; sniff the header so the fast C parser can be used
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8-sig", errors="replace") as f: head = f.readline()
+    elif hasattr(source, "seek"):
+        pos = source.tell()
+        head = source.readline()
+        source.seek(pos)
+        if isinstance(head, bytes): head = head.decode("utf-8", errors="replace")
+    else:
+        return ","
+    return max([",", ";", "\t", "|"], key=head.count)
+
+def _iter_csv_chunks(source, chunk_rows, **read_csv_kwargs):
+    if "sep" not in read_csv_kwargs: read_csv_kwargs["sep"] = _sniff_sep(source)
+    # ';'-separated exports come from French locales, where "1234,5" is a decimal comma
+    if read_csv_kwargs["sep"] == ";": read_csv_kwargs.setdefault("decimal", ",")
+    yield from pd.read_csv(source, chunksize=chunk_rows, **read_csv_kwargs)
+
+def stream_activity_totals(source, key_column=None, quantity_column=None, unit_column=None,
+                           column_map=None, chunk_rows=CHUNK_ROWS, sheet_name=None, **read_csv_kwargs):
+    # source: path or file-like (CSV, or .xlsx via openpyxl read-only mode).
+    # column_map forces the wide layout: {source column: activity key}.
+    chunks = _iter_excel_chunks(source, chunk_rows, sheet_name) if _is_excel(source) else _iter_csv_chunks(source, chunk_rows, **read_csv_kwargs)
+    summary = ImportSummary(totals={k: 0.0 for k in ACTIVITY_ORDER})
+    layout = None
+    value_keys = {}
+    scales = {}
+
+    for chunk in chunks:
+        if layout is None:
+            cols = list(chunk.columns)
+            key_column = None if column_map else (key_column or _pick(cols, KEY_COLUMNS))
+            quantity_column = quantity_column or _pick(cols, QTY_COLUMNS)
+            unit_column = unit_column or _pick(cols, UNIT_COLUMNS)
+            if key_column and quantity_column:
+                layout = "long"
+            else:
+                layout = "wide"
+                column_map = column_map or {c: resolve_key(c) for c in cols if resolve_key(c)}
+                if not column_map: raise ValueError("No activity columns recognised; pass key_column/quantity_column or column_map")
+                scales = {col: column_scale(col, key) for col, key in column_map.items()}
+
+        summary.rows_read += len(chunk)
+        if layout == "long":
+            _add_long(summary, chunk, key_column, quantity_column, unit_column, value_keys)
+        else:
+            bad = pd.Series(False, index=chunk.index)
+            for col, key in column_map.items():
+                if col not in chunk.columns: continue
+                qty = to_number(chunk[col])
+                bad |= unparseable(chunk[col], qty)
+                summary.totals[key] += float(qty[qty > 0].sum()) * scales[col]
+            summary.rows_skipped += int(bad.sum())
+
+    summary.totals = {k: v for k, v in summary.totals.items() if v > 0}
+    return summary
+
+def _add_long(summary, chunk, key_column, quantity_column, unit_column, value_keys):
+    # Activity names repeat heavily in exports: resolve each distinct value once per file
+    names = chunk[key_column].astype(str)
+    for name in names.unique():
+        if name not in value_keys: value_keys[name] = resolve_key(name)
+    keys = names.map(value_keys)
+    qty = to_number(chunk[quantity_column])
+    if unit_column:
+        units = chunk[unit_column].fillna("").astype(str).str.strip().str.lower()
+        # A unit of another dimension ("natural_gas, 100, m3") is skipped, not scaled into kWh
+        base = units.map(UNIT_BASE)
+        form = keys.map({k: unit for k, (unit, _) in ACTIVITY_META.items()})
+        qty = (qty * units.map(UNIT_SCALE)).mask(base.notna() & form.notna() & (base != form))
+    ok = keys.notna() & qty.notna() & (qty > 0)
+    summary.rows_skipped += int((~ok).sum())
+    for name, n in names[keys.isna()].value_counts().items():
+        summary.unmapped[name] = summary.unmapped.get(name, 0) + int(n)
+    for key, total in qty[ok].groupby(keys[ok]).sum().items():
+        summary.totals[key] += float(total)
+
+def import_activity(source, **kwargs):
+    # -> {key: ActivityInput}, ready for calculate_emissions
+    return stream_activity_totals(source, **kwargs).activity_inputs()
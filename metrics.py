@@ -0,0 +1,169 @@
+import functools
+import os
+import threading
+import time
+
+# --- HOT-PATH METRICS (PROMETHEUS TEXT FORMAT) ---
+# Off unless ESG_METRICS=1 (or enable() is called). When off, every hook is one flag check.
+# ESG_METRICS_FILE: if set, write_textfile() dumps there (node_exporter textfile-collector style).
+_enabled = os.environ.get("ESG_METRICS", "0").lower() not in ("", "0", "false", "no")
+METRICS_FILE = os.environ.get("ESG_METRICS_FILE")
+WRITE_INTERVAL_S = 10.0
+
+# Seconds; covers sub-millisecond summarize up to multi-second bulk renders
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "esg_stage_seconds": "Time spent in a pipeline stage or PDF build phase.",
+    "esg_rerun_seconds": "Streamlit script run duration by step.",
+    "esg_step_transitions_total": "Step transitions in the assessment flow.",
+    "esg_api_request_seconds": "HTTP API request latency by route.",
+    "esg_api_rejected_total": "API requests turned away by backpressure.",
+    "esg_evidence_files_total": "Evidence files received, by whether the content was already stored.",
+    "esg_evidence_bytes_total": "Evidence bytes received, by whether the content was already stored.",
+}
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count], sum
+_collectors = []  # callables returning [(name, {labels}, value)] gauges at export time
+_last_write = 0.0
+
+def enabled():
+    return _enabled
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def inc(name, value=1, **labels):
+    if not _enabled: return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, seconds, **labels):
+    if not _enabled: return
+    key = (name, _labels(labels))
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0]
+        counts = h[0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        h[1] += seconds
+
+class _Timer:
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name, labels):
+        self.name, self.labels = name, labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+class _NoopTimer:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NOOP = _NoopTimer()
+
+def timer(name, **labels):
+    # with timer("esg_stage_seconds", stage="build_pdf.table"): ...
+    if not _enabled: return _NOOP
+    return _Timer(name, labels)
+
+def stage(name):
+    return timer("esg_stage_seconds", stage=name)
+
+def instrumented(stage_name):
+    # Decorator: records the call duration as esg_stage_seconds{stage=stage_name}
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled: return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe("esg_stage_seconds", time.perf_counter() - started, stage=stage_name)
+        return wrapper
+    return deco
+
+def register_collector(fn):
+    # fn() -> [(metric name, {labels}, value)], read at export time (e.g. cache sizes)
+    _collectors.append(fn)
+    return fn
+
+# --- EXPORT ---
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items: return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def render_prometheus():
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: ([*v[0]], v[1]) for k, v in _histograms.items()}
+    gauges = {}
+    for fn in _collectors:
+        for name, labels, value in fn():
+            gauges[(name, _labels(labels))] = value
+
+    lines, seen = [], set()
+    def header(name, kind):
+        if name in seen: return
+        seen.add(name)
+        if name in HELP: lines.append(f"# HELP {name} {HELP[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    for (name, labels), value in sorted(gauges.items()):
+        header(name, "gauge")
+        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    for (name, labels), (counts, total) in sorted(histograms.items()):
+        header(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS, counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', repr(bound))])} {cumulative}")
+        cumulative += counts[-1]
+        lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {cumulative}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {total}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path=None, force=False):
+    # Atomic dump, rate-limited to one write per WRITE_INTERVAL_S unless forced
+    global _last_write
+    path = path or METRICS_FILE
+    if not _enabled or not path: return False
+    now = time.monotonic()
+    if not force and now - _last_write < WRITE_INTERVAL_S: return False
+    _last_write = now
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f: f.write(render_prometheus())
+    os.replace(tmp, path)
+    return True
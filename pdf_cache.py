@@ -0,0 +1,231 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+import metrics
+
+# --- PDF CACHE (PROCESS-WIDE, SHARED BY ALL STREAMLIT SESSIONS) ---
+PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PDF_CACHE_MAX_ENTRIES = 2048
+
+class PdfCache:
+    # Content-addressed LRU: key -> PDF bytes, evicted by entry count and total size
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES, max_entries=PDF_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes: return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None: self._bytes -= len(old)
+            self._items[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes or len(self._items) > self.max_entries:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def get_or_build(self, key, builder):
+        data = self.get(key)
+        if data is None:
+            # Built outside the lock: concurrent misses on the same key may both render, last one wins
+            data = builder()
+            self.put(key, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+PDF_CACHE = PdfCache()
+
+@metrics.register_collector
+def _cache_gauges():
+    return [(f"esg_pdf_cache_{k}", {}, v) for k, v in PDF_CACHE.stats().items()]
+
+# --- LARGE PDFS: ON-DISK SPOOL ---
+# Reports with more than PDF_SPOOL_ROWS detail rows are rendered straight into a file here, so
+# rendering never holds the document as bytes (BytesIO + getvalue + cache copy). The API streams the
+# file; Streamlit's download_button still reads it once into its media file store. Same LRU policy
+# as PdfCache, bounded by total file size. Files left by an earlier process are adopted at startup.
+PDF_SPOOL_DIR = os.environ.get("ESG_PDF_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "esg_pdf_spool")
+PDF_SPOOL_MAX_BYTES = 4 * 1024 * 1024 * 1024
+PDF_SPOOL_ROWS = 500
+STREAM_CHUNK_BYTES = 256 * 1024
+# .part files older than this are renders that died with their process
+PDF_SPOOL_STALE_PART_S = 3600
+
+class PdfSpool:
+    def __init__(self, root=PDF_SPOOL_DIR, max_bytes=PDF_SPOOL_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # key -> size
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        # Index the PDFs already on disk (oldest first), drop stale partial renders, then trim to max_bytes
+        if not os.path.isdir(self.root): return
+        now, found = time.time(), []
+        for entry in os.scandir(self.root):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith(".pdf"):
+                found.append((st.st_mtime, entry.name[:-4], st.st_size))
+            elif entry.name.endswith(".part") and now - st.st_mtime > PDF_SPOOL_STALE_PART_S:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        for _, key, size in sorted(found):
+            self._items[key] = size
+            self._bytes += size
+        self._evict()
+
+    def _evict(self):
+        # Caller holds the lock (or is __init__). Readers open the file before streaming it, so
+        # unlinking an evicted file is safe on POSIX
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            old, old_size = self._items.popitem(last=False)
+            self._bytes -= old_size
+            try:
+                os.remove(self.path(old))
+            except OSError:
+                pass
+
+    def path(self, key):
+        return os.path.join(self.root, key + ".pdf")
+
+    def get(self, key):
+        # -> path, or None; an indexed file removed behind our back (tmp cleaners) counts as a miss
+        with self._lock:
+            if key not in self._items: return None
+            if not os.path.exists(self.path(key)):
+                self._bytes -= self._items.pop(key)
+                return None
+            self._items.move_to_end(key)
+            return self.path(key)
+
+    def new_file(self):
+        # Temp path inside the spool (same filesystem, so add() is a rename)
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        os.close(fd)
+        return tmp
+
+    def add(self, key, tmp_path):
+        size = os.path.getsize(tmp_path)
+        dest = self.path(key)
+        with self._lock:
+            os.replace(tmp_path, dest)
+            self._bytes += size - self._items.pop(key, 0)
+            self._items[key] = size
+            self._evict()
+        return dest
+
+    def clear(self):
+        with self._lock:
+            for key in self._items:
+                try:
+                    os.remove(self.path(key))
+                except OSError:
+                    pass
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes}
+
+PDF_SPOOL = PdfSpool()
+
+@metrics.register_collector
+def _spool_gauges():
+    return [(f"esg_pdf_spool_{k}", {}, v) for k, v in PDF_SPOOL.stats().items()]
+
+def spooled(df):
+    return len(df) > PDF_SPOOL_ROWS
+
+def render_to_file(args, path):
+    # build_pdf(*args) written to path; nothing but the layout is kept in memory
+    from report import build_pdf
+    try:
+        with open(path, "wb") as f: build_pdf(*args, out=f)
+    except BaseException:
+        if os.path.exists(path): os.remove(path)
+        raise
+
+def iter_file(path, chunk_bytes=STREAM_CHUNK_BYTES):
+    # Opens now (so a later spool eviction cannot pull the file away) and yields chunks lazily
+    f = open(path, "rb")
+    def chunks():
+        with f:
+            yield from iter(lambda: f.read(chunk_bytes), b"")
+    return chunks()
+
+def pdf_sha256(pdf):
+    # PDF bytes or a spooled path -> hex digest, reading files in chunks
+    if isinstance(pdf, (bytes, bytearray, memoryview)): return hashlib.sha256(pdf).hexdigest()
+    h = hashlib.sha256()
+    for chunk in iter_file(pdf): h.update(chunk)
+    return h.hexdigest()
+
+def results_digest(df):
+    # Stable fingerprint of a calculate_emissions frame; compute once per result, not per rerun
+    if hasattr(df, "digest"): return df.digest()  # engine.ResultRows
+    return hashlib.sha256(repr((list(df.columns), df.to_numpy().tolist())).encode("utf-8")).hexdigest()
+
+def pdf_cache_key(company_name, country, year, revenue, currency, df, totals, evidence_files, signer_name, input_keys, lang, uncertainty=None, digest=None):
+    # The PDF prints today's date, so a new day is a new document
+    header = (company_name, country, year, revenue, currency, lang, signer_name,
+              datetime.now().strftime('%d %b %Y'),
+              tuple(sorted((k, float(v)) for k, v in totals.items())),
+              tuple(evidence_files), input_keys if isinstance(input_keys, int) else tuple(input_keys),
+              digest or results_digest(df),
+              tuple(sorted(uncertainty.items())) if uncertainty is not None else None)
+    return hashlib.sha256(repr(header).encode("utf-8")).hexdigest()
+
+def build_pdf_cached(company_name, country, year, revenue, currency, df, totals, evidence_files, signer_name, input_keys, lang, uncertainty=None, digest=None, cache=PDF_CACHE, spool=PDF_SPOOL):
+    # -> PDF bytes, or the path of a spooled file for reports over PDF_SPOOL_ROWS rows
+    args = (company_name, country, year, revenue, currency, df, totals, evidence_files, signer_name, input_keys, lang, uncertainty)
+    key = pdf_cache_key(*args, digest=digest)
+    if spooled(df):
+        path = spool.get(key)
+        if path is None:
+            tmp = spool.new_file()
+            render_to_file(args, tmp)
+            path = spool.add(key, tmp)
+        return path
+    def build():
+        from report import build_pdf  # ReportLab is only loaded on the first cache miss
+        return build_pdf(*args)
+    return cache.get_or_build(key, build)
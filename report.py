@@ -0,0 +1,285 @@
+import copy
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, KeepTogether
+from datetime import datetime
+from xml.sax.saxutils import escape
+from translations import TRANSLATIONS
+from engine import key_mask, evidence_lists, ResultRows
+import metrics
+
+# --- 1. REPORT TEMPLATE (BUILT ONCE PER LANGUAGE) ---
+STYLES = getSampleStyleSheet()
+BULLET_STYLE = ParagraphStyle('Bullet', parent=STYLES['Normal'], fontSize=7, leading=9, leftIndent=10, bulletIndent=0)
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+    ('FONTNAME', (0, 1), (0, 3), 'Helvetica'),
+    ('BACKGROUND', (0, 4), (-1, 4), colors.navy),
+    ('TEXTCOLOR', (0, 4), (-1, 4), colors.white),
+    ('FONTNAME', (0, 4), (-1, 4), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 4), (-1, 4), 11),
+    ('TOPPADDING', (0, 4), (-1, 4), 8),
+    ('BOTTOMPADDING', (0, 4), (-1, 4), 8),
+    ('BACKGROUND', (0, 5), (-1, 5), colors.aliceblue),
+    ('FONTNAME', (0, 5), (-1, 5), 'Helvetica-Oblique'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+])
+
+# Same table with a third (95% range) column when uncertainty ranges are passed in
+SUMMARY_CI_TABLE_STYLE = TableStyle(SUMMARY_TABLE_STYLE.getCommands() + [('ALIGN', (2, 0), (2, -1), 'RIGHT')])
+
+DETAIL_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.navy),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
+])
+
+# Detail rows per Table (about one A4 page at 9 pt)
+DETAIL_CHUNK_ROWS = 40
+
+@dataclass(frozen=True)
+class ReportTemplate:
+    # Everything in the Carbon Pack that does not depend on the supplier. Paragraphs are
+    # parsed once here; build_pdf takes shallow copies because layout state lives on the flowable.
+    lang: str
+    T: dict
+    title: Paragraph
+    method: Paragraph
+    boundary: Paragraph
+    summary_title: Paragraph
+    detail_title: Paragraph
+    evidence_title: Paragraph
+    disc_title: Paragraph
+    disc_head: tuple
+    disc_tail: tuple
+    detail_header: tuple
+    footer: object
+
+    def para(self, name):
+        return copy.copy(getattr(self, name))
+
+def _footer(T):
+    def add_footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawCentredString(A4[0]/2, 42, T['footer_l1'])
+        canvas.drawCentredString(A4[0]/2, 32, T['footer_l2'])
+        canvas.drawCentredString(A4[0]/2, 22, T['footer_l3'])
+        canvas.drawCentredString(A4[0]/2, 12, T['footer_l4'])
+        canvas.restoreState()
+    return add_footer
+
+@lru_cache(maxsize=None)
+def get_template(lang):
+    T = TRANSLATIONS[lang]
+    return ReportTemplate(
+        lang=lang,
+        T=T,
+        title=Paragraph(f"<b>{T['pdf_title']}</b>", STYLES['Title']),
+        method=Paragraph(T['pdf_method'], STYLES['Normal']),
+        boundary=Paragraph(T['pdf_boundary_text'], STYLES['Normal']),
+        summary_title=Paragraph(f"<b>{T['pdf_summary_title']}</b>", STYLES['Heading3']),
+        detail_title=Paragraph(f"<b>{T['pdf_detail_title']}</b>", STYLES['Heading4']),
+        evidence_title=Paragraph(f"<b>{T['pdf_evidence_title']}</b>", STYLES['Heading4']),
+        disc_title=Paragraph(f"<b>{T['pdf_disc_title']}</b>", STYLES['Heading4']),
+        disc_head=(Paragraph(T['disc_p1'], BULLET_STYLE, bulletText='•'),
+                   Paragraph(T['disc_p2'], BULLET_STYLE, bulletText='•')),
+        disc_tail=(Paragraph(T['disc_p4'], BULLET_STYLE, bulletText='•'),
+                   Paragraph(T['disc_p5'], BULLET_STYLE, bulletText='•')),
+        detail_header=(T['pdf_tab_scope'], T['pdf_tab_act'], T['pdf_tab_qty'], T['pdf_tab_emi']),
+        footer=_footer(T),
+    )
+
+@lru_cache(maxsize=4096)
+def exclusion_paragraph(mask, lang):
+    # The exclusion bullet depends only on which keys are active
+    T = TRANSLATIONS[lang]
+    _, excluded_labels = evidence_lists(mask, lang)
+    if excluded_labels:
+        # Create HTML list items with indentation
+        exclusion_html = ""
+        for label in excluded_labels:
+            exclusion_html += f"<br/>&nbsp;&nbsp;• {label}"
+
+        disc_excl_text = f"{T['disc_p3_intro']}{exclusion_html}"
+    else:
+        disc_excl_text = T['disc_p3_none']
+    return Paragraph(disc_excl_text, BULLET_STYLE, bulletText='•')
+
+def _detail_tables(tpl, rows):
+    # rows: (scope, activity, quantity, unit, emissions) tuples, straight from the result columns.
+    # One Table per DETAIL_CHUNK_ROWS rows, each with its own header: ReportLab lays out and splits
+    # every chunk on its own, so render time stays linear in the row count.
+    tables, data = [], []
+    for scope, activity, qty, unit, emissions in rows:
+        data.append([scope, activity, f"{qty:,.2f} {unit}", f"{emissions:,.2f}"])
+        if len(data) == DETAIL_CHUNK_ROWS:
+            tables.append(_detail_chunk(tpl, data))
+            data = []
+    if data or not tables: tables.append(_detail_chunk(tpl, data))
+    return tables
+
+def _detail_chunk(tpl, data):
+    t = Table([list(tpl.detail_header)] + data, colWidths=[60, 140, 80, 100], repeatRows=1)
+    t.setStyle(DETAIL_TABLE_STYLE)
+    return t
+
+# --- 2. PDF GENERATOR ---
+@metrics.instrumented("build_pdf")
+def build_pdf(company_name, country, year, revenue, currency, df, totals, evidence_files, signer_name, input_keys, lang, uncertainty=None, out=None):
+    # out: path or writable binary file (temp file, response stream, zip member) to render into;
+    # the PDF is then written there and None is returned. Without it the PDF bytes are returned.
+    buffer = BytesIO() if out is None else out
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"Carbon Footprint - {company_name}", topMargin=30, bottomMargin=60)
+    tpl = get_template(lang)
+    T = tpl.T
+    story = []
+
+    # 1. HEADER
+    date_str = datetime.now().strftime('%d %b %Y')
+    story.append(tpl.para('title'))
+    story.append(Spacer(1, 12))
+    story.append(tpl.para('method'))
+    story.append(Paragraph(f"{T['pdf_date']} {date_str}", STYLES['Normal']))
+    story.append(Spacer(1, 20))
+
+    # 2. COMPANY DETAILS
+    sites_line = f"<b>{T['pdf_sites']}</b> {df['Site'].nunique()}<br/>" if 'Site' in getattr(df, 'columns', ()) else ""
+    info_text = f"""
+    <b>{T['pdf_company']}</b> {company_name}<br/>
+    <b>{T['pdf_country']}</b> {country}<br/>
+    <b>{T['pdf_period']}</b> {year}<br/>{sites_line}
+    <b>{T['pdf_revenue']}</b> {revenue:,.2f} {currency}<br/>
+    """
+    story.append(Paragraph(info_text, STYLES['Normal']))
+    story.append(Spacer(1, 15))
+
+    # 3. BOUNDARY STATEMENT
+    story.append(tpl.para('boundary'))
+    story.append(Spacer(1, 20))
+
+    # 4. SUMMARY DASHBOARD
+    carbon_intensity = (totals['total'] / revenue) if revenue > 0 else 0
+
+    story.append(tpl.para('summary_title'))
+    story.append(Spacer(1, 5))
+
+    summary_data = [
+        [T['pdf_col_metric'], T['pdf_col_value']],
+        [T['pdf_s1'], f"{totals['scope1']:,.2f} kgCO2e"],
+        [T['pdf_s2'], f"{totals['scope2']:,.2f} kgCO2e"],
+        [T['pdf_s3'], f"{totals['scope3']:,.2f} kgCO2e"],
+        [T['pdf_total'], f"{totals['total']:,.2f} kgCO2e"],
+        [T['pdf_intensity'], f"{carbon_intensity:.2f} kgCO2e / {currency}"]
+    ]
+
+    if uncertainty is None:
+        t_summary = Table(summary_data, colWidths=[250, 150])
+        t_summary.setStyle(SUMMARY_TABLE_STYLE)
+    else:
+        # Monte Carlo ranges (engine.uncertainty_ranges) as a third column
+        ranges = [uncertainty[k] for k in ("scope1", "scope2", "scope3", "total")]
+        if revenue > 0: ranges.append((uncertainty['total'][0] / revenue, uncertainty['total'][1] / revenue))
+        summary_data[0].append(T['pdf_col_ci'])
+        for row, (low, high) in zip(summary_data[1:], ranges):
+            row.append(f"{low:,.2f} – {high:,.2f}")
+        if revenue <= 0: summary_data[5].append("")
+        t_summary = Table(summary_data, colWidths=[155, 125, 170])
+        t_summary.setStyle(SUMMARY_CI_TABLE_STYLE)
+    story.append(t_summary)
+    if uncertainty is not None:
+        story.append(Spacer(1, 4))
+        story.append(Paragraph(T['pdf_ci_note'], STYLES['Italic']))
+    story.append(Spacer(1, 20))
+
+    # 5. DETAILED TABLE
+    if not df.empty:
+        with metrics.stage("build_pdf.table"):
+            story.append(tpl.para('detail_title'))
+            if isinstance(df, ResultRows):
+                story.extend(_detail_tables(tpl, df.detail_rows(lang)))
+            elif 'Site' in df.columns:
+                # Multi-site entity: one small table per site, so layout cost stays linear in the site count
+                for site, rows in df.groupby('Site', sort=False):
+                    story.append(Paragraph(f"<b>{T['pdf_site']}</b> {site}", STYLES['Normal']))
+                    story.append(Spacer(1, 3))
+                    story.extend(_detail_tables(tpl, zip(rows['Scope'], rows['Activity'], rows['Quantity'], rows['Unit'], rows['Emissions_kgCO2e'])))
+                    story.append(Spacer(1, 10))
+            else:
+                story.extend(_detail_tables(tpl, zip(df['Scope'], df['Activity'], df['Quantity'], df['Unit'], df['Emissions_kgCO2e'])))
+            story.append(Spacer(1, 20))
+
+    # --- 6. CLOSING BLOCK ---
+    with metrics.stage("build_pdf.closing"):
+        closing_elements = []
+
+        # A. EVIDENCE (STRICT SORTING S1->S2->S3)
+        closing_elements.append(tpl.para('evidence_title'))
+
+        mask = key_mask(input_keys)
+        required_evidence, _ = evidence_lists(mask, lang)
+
+        if not required_evidence:
+            evidence_html = f"{T['pdf_no_mat']}<br/>"
+        else:
+            evidence_html = ""
+            # We iterate through required_evidence list which is ALREADY in order (s1, s2, s3)
+            for item in required_evidence:
+                evidence_html += f"&bull; {item}<br/>"
+
+        file_msg = f"({len(evidence_files)} {T['pdf_attached']})" if evidence_files else f"({T['pdf_no_files']})"
+
+        evidence_text = f"""
+        {T['pdf_assurance_level']}<br/><br/>
+        {T['pdf_doc_retained']}<br/>
+        {evidence_html}
+        <i>{T['pdf_avail']} {file_msg}</i>
+        """
+        closing_elements.append(Paragraph(evidence_text, STYLES['Normal']))
+
+        # Files kept in the evidence store are listed with their SHA-256, so the buyer can match them
+        hashed = [e for e in evidence_files if getattr(e, 'sha256', None)]
+        if hashed:
+            hash_html = "".join(f"<br/>{escape(e.name)}: <font face='Courier'>{e.sha256}</font>" for e in hashed)
+            closing_elements.append(Spacer(1, 4))
+            closing_elements.append(Paragraph(f"<b>{T['pdf_evidence_hashes']}</b>{hash_html}", BULLET_STYLE))
+        closing_elements.append(Spacer(1, 30))
+
+        # B. ATTESTATION
+        sig_text = f"""
+        <b>{T['pdf_attest_title']}</b><br/>
+        {T['pdf_attest_text'].format(signer=signer_name)}
+        <br/><br/>
+        __________________________<br/>
+        {T['pdf_sig']}
+        """
+        closing_elements.append(Paragraph(sig_text, STYLES['Normal']))
+        closing_elements.append(Spacer(1, 20))
+
+        # C. DISCLAIMER (STRUCTURED BULLETS + VERTICAL SUB-LIST)
+        closing_elements.append(tpl.para('disc_title'))
+
+        closing_elements.extend(copy.copy(p) for p in tpl.disc_head)
+        closing_elements.append(copy.copy(exclusion_paragraph(mask, lang)))
+        closing_elements.extend(copy.copy(p) for p in tpl.disc_tail)
+
+        story.append(KeepTogether(closing_elements))
+
+    # --- 7. FOOTER ---
+    with metrics.stage("build_pdf.doc_build"):
+        doc.build(story, onFirstPage=tpl.footer, onLaterPages=tpl.footer)
+    if out is not None: return None
+    return buffer.getvalue()
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from engine import ACTIVITY_ORDER, ACTIVITY_META, SCOPES, scope_code
+
+# --- WHAT-IF SCENARIO SWEEP ---
+# A scenario is one choice per lever; a grid is every combination of the lever options.
+# Levers are applied in order to the baseline quantities / factors:
+#   scale(key, -0.3)             quantity of key x (1 - 0.3)
+#   substitute(key, to, 1.0)     move that share of key's quantity onto `to` (same unit), e.g. R410A -> R32
+#   set_factor(key, 0.0)         replace key's emission factor value
+# Only the activities some lever touches are materialised: an (n_scenarios x touched) matrix whose
+# change against the baseline is mapped to scopes with one matrix product.
+MAX_SCENARIOS = 1_000_000
+
+@dataclass(frozen=True)
+class Lever:
+    kind: str
+    key: str
+    options: tuple
+    to: str = None
+
+    @property
+    def name(self):
+        return f"{self.kind}:{self.key}" + (f">{self.to}" if self.to else "")
+
+def scale(key, *changes):
+    return Lever("scale", key, tuple(float(c) for c in changes))
+
+def substitute(key, to, *shares):
+    lever = Lever("substitute", key, tuple(float(s) for s in shares), to)
+    _check(lever)
+    if ACTIVITY_META[key][0] != ACTIVITY_META[to][0]:
+        raise ValueError(f"cannot substitute {key} ({ACTIVITY_META[key][0]}) with {to} ({ACTIVITY_META[to][0]})")
+    return lever
+
+def set_factor(key, *values):
+    return Lever("factor", key, tuple(float(v) for v in values))
+
+def _check(lever):
+    for k in (lever.key, lever.to):
+        if k is not None and k not in ACTIVITY_META: raise ValueError(f"unknown activity key: {k}")
+    if not lever.options: raise ValueError(f"{lever.name}: no options")
+
+def scenario_grid(levers):
+    # -> (n_scenarios x n_levers) array of option values, first lever varying slowest
+    for lever in levers: _check(lever)
+    n = int(np.prod([len(l.options) for l in levers])) if levers else 1
+    if n > MAX_SCENARIOS: raise ValueError(f"{n:,} scenarios exceeds MAX_SCENARIOS ({MAX_SCENARIOS:,})")
+    if not levers: return np.zeros((1, 0))
+    mesh = np.meshgrid(*[np.asarray(l.options) for l in levers], indexing="ij")
+    return np.stack([m.ravel() for m in mesh], axis=1)
+
+def evaluate_scenarios(inputs, factors, levers, top=None):
+    # inputs/factors as for calculate_emissions. Returns one row per scenario, best (largest cut) first:
+    # lever option columns, delta_scope1..3, delta_total, total, change_pct
+    grid = scenario_grid(levers)
+    touched = list(dict.fromkeys(k for l in levers for k in (l.key, l.to) if k is not None))
+    col = {k: i for i, k in enumerate(touched)}
+
+    def qty(k):
+        act = inputs.get(k)
+        return max(act.quantity, 0.0) if act is not None else 0.0
+    def value(k):
+        f = factors.get(k)
+        return float(f.value) if f is not None else 0.0
+
+    # Baseline over every activity, as calculate_emissions would count it
+    base_e = np.array([qty(k) * value(k) for k in ACTIVITY_ORDER])
+    base_scopes = np.bincount([scope_code(ACTIVITY_META[k][1]) for k in ACTIVITY_ORDER], weights=base_e, minlength=len(SCOPES))
+    base_total = base_scopes.sum()
+
+    # Scenario quantities / factors for the touched activities only
+    n = len(grid)
+    Q = np.tile([qty(k) for k in touched], (n, 1))
+    F = np.tile([value(k) for k in touched], (n, 1))
+    for j, lever in enumerate(levers):
+        v, c = grid[:, j], col[lever.key]
+        if lever.kind == "scale":
+            Q[:, c] *= np.maximum(1.0 + v, 0.0)
+        elif lever.kind == "substitute":
+            moved = Q[:, c] * v
+            Q[:, c] -= moved
+            Q[:, col[lever.to]] += moved
+        elif lever.kind == "factor":
+            F[:, c] = v
+        else:
+            raise ValueError(f"unknown lever kind: {lever.kind}")
+
+    # Rows without a factor are skipped by calculate_emissions, so they stay at zero here too
+    has_factor = np.array([k in factors for k in touched])
+    base_t = np.array([qty(k) * value(k) for k in touched])
+    delta_e = np.where(has_factor, Q * F, 0.0) - base_t
+    to_scope = np.zeros((len(touched), len(SCOPES)))
+    to_scope[np.arange(len(touched)), [scope_code(ACTIVITY_META[k][1]) for k in touched]] = 1.0
+    delta = delta_e @ to_scope
+
+    out = pd.DataFrame(grid, columns=[l.name for l in levers])
+    for i in range(len(SCOPES)): out[f"delta_scope{i + 1}"] = delta[:, i]
+    out["delta_total"] = delta.sum(axis=1)
+    out["total"] = base_total + out["delta_total"]
+    out["change_pct"] = out["delta_total"] / base_total * 100 if base_total > 0 else 0.0
+    order = np.argsort(out["delta_total"].to_numpy(), kind="stable")
+    if top is not None: order = order[:top]
+    return out.iloc[order].reset_index(drop=True)
+
+def sweep(inputs, factors, cuts, steps=(0.0, -0.1, -0.2, -0.3, -0.5), substitutions=None, top=None):
+    # Every combination of `steps` on each key in cuts, plus substitutions={"ref_R410A": "ref_R32"}
+    # swept over shares 0 / 0.5 / 1
+    levers = [scale(k, *steps) for k in cuts]
+    for key, to in (substitutions or {}).items():
+        levers.append(substitute(key, to, 0.0, 0.5, 1.0))
+    return evaluate_scenarios(inputs, factors, levers, top)
@@ -0,0 +1,125 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+import metrics
+
+# --- SHARED RESULTS & SESSION FOOTPRINT ---
+# A Streamlit session keeps its compact inputs (13 quantities, profile, evidence refs) and a result
+# key. The calculated rows, totals and ranges live once per process in RESULTS, shared by every
+# session with the same inputs; an evicted entry is simply recomputed from the session's inputs.
+RESULTS_MAX_ENTRIES = 4096
+# Sessions not seen for this long drop out of the footprint gauges
+SESSION_TTL_S = 1800
+
+@dataclass(frozen=True)
+class Assessment:
+    rows: object  # calculate_emissions frame (multi-site: calculate_sites rows)
+    totals: dict
+    uncertainty: dict
+    digest: str
+    input_keys: tuple
+    site_totals: object = None
+
+class ResultStore:
+    # Process-wide LRU: result key -> Assessment
+    def __init__(self, max_entries=RESULTS_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, builder):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item
+            self.misses += 1
+        item = builder()  # outside the lock, like PdfCache
+        with self._lock:
+            self._items[key] = item
+            while len(self._items) > self.max_entries: self._items.popitem(last=False)
+        return item
+
+    def clear(self):
+        with self._lock: self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+RESULTS = ResultStore()
+
+def result_key(country, year, lang, quantities, sites_id=None):
+    # quantities: tuple in ACTIVITY_ORDER; sites_id identifies an uploaded site table instead
+    return hashlib.sha256(repr((country, str(year), lang, tuple(quantities), sites_id)).encode("utf-8")).hexdigest()
+
+def assess(country, year, lang, quantities, factors, sites=None):
+    # Step 2 calculation -> Assessment (the builder behind RESULTS)
+    from engine import ACTIVITY_ORDER, make_inputs, calculate_emissions, summarize, uncertainty_ranges
+    from pdf_cache import results_digest
+    site_totals = None
+    if sites is not None:
+        from sites import calculate_sites
+        df, site_totals = calculate_sites(sites, year, lang, country)
+        input_keys = tuple(df["Key"].unique())
+    else:
+        inputs = make_inputs(dict(zip(ACTIVITY_ORDER, quantities)))
+        df = calculate_emissions(inputs, factors, lang)
+        input_keys = tuple(k for k, v in inputs.items() if v.quantity > 0)
+    # Site rows carry their own factors, which uncertainty_ranges uses in place of the Step 1 ones
+    return Assessment(df, summarize(df), uncertainty_ranges(df, factors), results_digest(df), input_keys, site_totals)
+
+# --- MEMORY PER SESSION ---
+_sessions = {}  # session id -> (bytes, last seen)
+_sessions_lock = threading.Lock()
+
+def footprint(value, _seen=None):
+    # Approximate deep size in bytes; frames and arrays report their buffers
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen: return 0
+    seen.add(id(value))
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes") and hasattr(value, "dtype"):
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(footprint(k, seen) + footprint(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(footprint(v, seen) for v in value)
+    elif hasattr(value, "__dict__"):
+        size += footprint(vars(value), seen)
+    elif hasattr(value, "__slots__"):
+        size += sum(footprint(getattr(value, s, None), seen) for s in value.__slots__)
+    return size
+
+def state_footprint(state):
+    # Bytes held by one session's state mapping (st.session_state or a dict copy of it)
+    return sum(footprint(k) + footprint(v) for k, v in dict(state).items())
+
+def record_session(session_id, state):
+    # state: the session's state mapping (st.session_state); called once per rerun
+    size = state_footprint(state)
+    now = time.monotonic()
+    with _sessions_lock:
+        _sessions[session_id] = (size, now)
+        for sid in [s for s, (_, seen) in _sessions.items() if now - seen > SESSION_TTL_S]: del _sessions[sid]
+    return size
+
+def session_stats():
+    with _sessions_lock:
+        sizes = [b for b, _ in _sessions.values()]
+    return {"active": len(sizes), "bytes_total": sum(sizes), "bytes_max": max(sizes, default=0),
+            "bytes_avg": sum(sizes) / len(sizes) if sizes else 0.0}
+
+@metrics.register_collector
+def _session_gauges():
+    out = [(f"esg_sessions_{k}", {}, v) for k, v in session_stats().items()]
+    out += [(f"esg_results_cache_{k}", {}, v) for k, v in RESULTS.stats().items()]
+    return out
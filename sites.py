@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from engine import ACTIVITY_ORDER, RESULT_COLUMNS, FACTOR_COLUMNS, calculate_emissions_batch
+from factor_registry import factors_for, normalize_country
+from importer import resolve_key, normalize_name, column_scale, to_number, _sniff_sep
+
+# --- MULTI-SITE ASSESSMENTS (ONE LEGAL ENTITY) ---
+# Site table: one row per site -> a site name, its country and one column per activity
+# (keys or Step 2 labels, e.g. "electricity_fr" / "Electricity (MWh)", scaled like a wide import). Missing countries fall back
+# to the entity's Step 1 country. Sites sharing a country share one factor set and one vectorized
+# batch; country groups run on a thread pool and are merged back in site order.
+SITE_COLUMNS = ["site", "site_name", "site_id", "name", "établissement", "site name"]
+COUNTRY_COLUMNS = ["country", "pays", "site country"]
+MAX_SITE_WORKERS = 8
+
+def _pick(columns, candidates):
+    norm = {normalize_name(c): c for c in columns}
+    return next((norm[normalize_name(c)] for c in candidates if normalize_name(c) in norm), None)
+
+def read_sites(source, default_country=""):
+    # CSV / Excel path or upload -> normalized site table: site, country, one float column per key
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    if str(name).lower().endswith((".xlsx", ".xls")):
+        raw = pd.read_excel(source)
+    else:
+        sep = _sniff_sep(source)
+        raw = pd.read_csv(source, sep=sep, decimal="," if sep == ";" else ".")
+    site_col = _pick(raw.columns, SITE_COLUMNS)
+    country_col = _pick(raw.columns, COUNTRY_COLUMNS)
+    # Blank names get the same "Site n" as a table without a site column; names are plain str
+    names = [str(v).strip() if site_col and pd.notna(v) else "" for v in (raw[site_col] if site_col else [None] * len(raw))]
+    table = pd.DataFrame({
+        "site": [name or f"Site {i + 1}" for i, name in enumerate(names)],
+        "country": raw[country_col].fillna(default_country).astype(str).str.strip() if country_col else default_country,
+    })
+    dupes = table.loc[table["site"].duplicated(), "site"].unique()
+    if len(dupes): raise ValueError("Site names must be unique: " + ", ".join(dupes))
+    for col in raw.columns:
+        key = None if col in (site_col, country_col) else resolve_key(col)
+        if key is None: continue
+        qty = (to_number(raw[col]) * column_scale(col, key)).fillna(0.0).clip(lower=0.0)
+        table[key] = table[key] + qty if key in table.columns else qty
+    if not any(k in table.columns for k in ACTIVITY_ORDER): raise ValueError("No activity columns recognised in the site table")
+    return table
+
+def site_activity(table):
+    # Wide site table -> long (supplier_id = site, key, quantity) table for calculate_emissions_batch
+    keys = [k for k in ACTIVITY_ORDER if k in table.columns]
+    qty = table[keys].apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    return pd.DataFrame({
+        "supplier_id": np.repeat(table["site"].to_numpy(), len(keys)),
+        "key": np.tile(keys, len(table)),
+        "quantity": qty.ravel(),
+    })
+
+def calculate_sites(table, year, lang, default_country="", workers=None):
+    # Returns (rows, site_totals): rows in calculate_emissions layout plus Site and FACTOR_COLUMNS (site order,
+    # S1 -> S3 within a site), site_totals indexed by site with country and scope1/scope2/scope3/total
+    if table["site"].duplicated().any():
+        raise ValueError("Site names must be unique: " + ", ".join(table.loc[table["site"].duplicated(), "site"].unique()))
+    countries = table["country"].fillna("").astype(str).replace("", default_country)
+    activity = site_activity(table)
+    groups = list(pd.Series(table["site"].to_numpy()).groupby(countries.map(normalize_country).to_numpy(), sort=False))
+    country_of = dict(zip(table["site"], countries))
+
+    def run(group):
+        code, sites = group
+        part = activity[activity["supplier_id"].isin(set(sites))]
+        return calculate_emissions_batch(part, factors_for(country_of[sites.iloc[0]], year), lang)
+
+    workers = min(workers or MAX_SITE_WORKERS, len(groups), os.cpu_count() or 1) or 1
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool: results = list(pool.map(run, groups))
+    else:
+        results = [run(g) for g in groups]
+
+    order = pd.Index(table["site"], name="site")
+    rows = pd.concat([r for r, _ in results], ignore_index=True).rename(columns={"supplier_id": "Site"})
+    rows = rows.iloc[np.argsort(order.get_indexer(rows["Site"]), kind="stable")].reset_index(drop=True)
+    rows = rows[RESULT_COLUMNS + ["Site"] + FACTOR_COLUMNS]
+    site_totals = pd.concat([t for _, t in results]).reindex(order, fill_value=0.0)
+    site_totals.insert(0, "country", countries.to_numpy())
+    return rows, site_totals
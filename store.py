@@ -0,0 +1,321 @@
+import bisect
+import heapq
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from engine import SCOPES, scope_code
+from pdf_cache import pdf_sha256
+
+# --- REPORT STORE (EMBEDDED SQLITE, WAL) ---
+DB_PATH = os.environ.get("ESG_DB_PATH", "esg_reports.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    company TEXT NOT NULL,
+    country TEXT,
+    year TEXT,
+    revenue REAL,
+    currency TEXT,
+    lang TEXT,
+    signer TEXT,
+    scope1 REAL NOT NULL,
+    scope2 REAL NOT NULL,
+    scope3 REAL NOT NULL,
+    total REAL NOT NULL,
+    intensity REAL,
+    evidence_count INTEGER NOT NULL DEFAULT 0,
+    pdf_sha256 TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_company_year ON reports(company, year);
+CREATE INDEX IF NOT EXISTS idx_reports_year_total ON reports(year, total);
+CREATE INDEX IF NOT EXISTS idx_reports_total ON reports(total);
+
+CREATE TABLE IF NOT EXISTS report_rows (
+    report_id INTEGER NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    scope INTEGER NOT NULL,
+    category TEXT,
+    quantity REAL NOT NULL,
+    unit TEXT,
+    factor_id TEXT,
+    factor_value REAL,
+    emissions REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_report_rows_report ON report_rows(report_id);
+
+-- Evidence files by content hash (the bytes live once in the evidence store, see evidence.py)
+CREATE TABLE IF NOT EXISTS report_evidence (
+    report_id INTEGER NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    sha256 TEXT,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_report_evidence_report ON report_evidence(report_id);
+CREATE INDEX IF NOT EXISTS idx_report_evidence_sha ON report_evidence(sha256);
+
+-- Portfolio: the latest report per (company, year), with running totals kept in step on every save
+CREATE TABLE IF NOT EXISTS portfolio_members (
+    company TEXT NOT NULL,
+    year TEXT NOT NULL,
+    report_id INTEGER NOT NULL,
+    scope1 REAL NOT NULL,
+    scope2 REAL NOT NULL,
+    scope3 REAL NOT NULL,
+    total REAL NOT NULL,
+    intensity REAL,
+    PRIMARY KEY (company, year)
+);
+CREATE INDEX IF NOT EXISTS idx_portfolio_members_total ON portfolio_members(year, total);
+CREATE INDEX IF NOT EXISTS idx_portfolio_members_intensity ON portfolio_members(year, intensity);
+
+CREATE TABLE IF NOT EXISTS portfolio_totals (
+    year TEXT PRIMARY KEY,
+    suppliers INTEGER NOT NULL,
+    scope1 REAL NOT NULL,
+    scope2 REAL NOT NULL,
+    scope3 REAL NOT NULL,
+    total REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS portfolio_categories (
+    company TEXT NOT NULL,
+    year TEXT NOT NULL,
+    category TEXT NOT NULL,
+    emissions REAL NOT NULL,
+    PRIMARY KEY (company, year, category)
+);
+CREATE INDEX IF NOT EXISTS idx_portfolio_categories_rank ON portfolio_categories(year, category, emissions);
+
+CREATE TABLE IF NOT EXISTS portfolio_category_totals (
+    year TEXT NOT NULL,
+    category TEXT NOT NULL,
+    emissions REAL NOT NULL,
+    PRIMARY KEY (year, category)
+);
+
+CREATE TABLE IF NOT EXISTS portfolio_intensity (
+    year TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    suppliers INTEGER NOT NULL,
+    PRIMARY KEY (year, bucket)
+);
+"""
+# Bumped when the portfolio tables change shape; older databases are backfilled from reports on open
+PORTFOLIO_VERSION = 1
+
+# Carbon intensity histogram edges (kgCO2e per unit of revenue); bucket i is [edges[i-1], edges[i])
+INTENSITY_EDGES = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10]
+
+def intensity_bucket(intensity):
+    return bisect.bisect_right(INTENSITY_EDGES, intensity or 0.0)
+
+def bucket_bounds(bucket):
+    lo = INTENSITY_EDGES[bucket - 1] if bucket > 0 else 0.0
+    hi = INTENSITY_EDGES[bucket] if bucket < len(INTENSITY_EDGES) else None
+    return lo, hi
+
+REPORT_COLUMNS = ["id", "company", "country", "year", "revenue", "currency", "lang", "signer",
+                  "scope1", "scope2", "scope3", "total", "intensity", "evidence_count", "pdf_sha256", "created_at"]
+
+class ReportStore:
+    # One connection per thread (Streamlit serves sessions from a thread pool)
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+        if self._conn().execute("PRAGMA user_version").fetchone()[0] < PORTFOLIO_VERSION:
+            self.rebuild_portfolio()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- WRITES ---
+    def save_assessment(self, company, country, year, revenue, currency, df, totals, evidence_files,
+                        signer, lang, factors, pdf_data=None):
+        intensity = (totals["total"] / revenue) if revenue > 0 else 0
+        pdf_sha = pdf_sha256(pdf_data) if pdf_data is not None else None
+        row = (company, country, str(year), float(revenue), currency, lang, signer,
+               float(totals["scope1"]), float(totals["scope2"]), float(totals["scope3"]), float(totals["total"]),
+               float(intensity), len(evidence_files), pdf_sha, datetime.now(timezone.utc).isoformat(timespec="seconds"))
+        detail, categories = [], {}
+        if not df.empty:
+            if "FactorId" in df.columns:  # multi-site rows carry the factor each site was calculated with
+                used = zip(df["FactorId"], df["FactorValue"].astype(float))
+            else:
+                used = ((f.id, float(f.value)) if f else (None, None) for f in map(factors.get, df["Key"]))
+            for key, category, qty, unit, emissions, (factor_id, factor_value) in zip(
+                    df["Key"], df["Category"], df["Quantity"], df["Unit"], df["Emissions_kgCO2e"], used):
+                detail.append((key, scope_code(category), category, float(qty), unit, factor_id, factor_value, float(emissions)))
+                categories[category] = categories.get(category, 0.0) + float(emissions)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(f"INSERT INTO reports ({', '.join(REPORT_COLUMNS[1:])}) VALUES ({', '.join('?' * (len(REPORT_COLUMNS) - 1))})", row)
+            report_id = cur.lastrowid
+            conn.executemany("INSERT INTO report_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [(report_id,) + d for d in detail])
+            conn.executemany("INSERT INTO report_evidence VALUES (?, ?, ?, ?)",
+                             [(report_id, getattr(e, "name", str(e)), getattr(e, "sha256", None), getattr(e, "size", None)) for e in evidence_files])
+            self._portfolio_replace(conn, company, str(year), (report_id,) + row[7:12], categories)
+        return report_id
+
+    def _portfolio_replace(self, conn, company, year, member, categories):
+        # member = (report_id, scope1, scope2, scope3, total, intensity). Makes it the company's entry
+        # for the year and moves every running total by the difference: O(categories), not O(suppliers).
+        old = conn.execute("SELECT * FROM portfolio_members WHERE company = ? AND year = ?", (company, year)).fetchone()
+        delta = [1, *member[1:5]]
+        cat_delta = dict(categories)
+        if old is not None:
+            delta = [0] + [new - old[c] for new, c in zip(member[1:5], ("scope1", "scope2", "scope3", "total"))]
+            for r in conn.execute("SELECT category, emissions FROM portfolio_categories WHERE company = ? AND year = ?", (company, year)):
+                cat_delta[r["category"]] = cat_delta.get(r["category"], 0.0) - r["emissions"]
+            conn.execute("DELETE FROM portfolio_categories WHERE company = ? AND year = ?", (company, year))
+            conn.execute("UPDATE portfolio_intensity SET suppliers = suppliers - 1 WHERE year = ? AND bucket = ?",
+                         (year, intensity_bucket(old["intensity"])))
+        conn.execute("INSERT OR REPLACE INTO portfolio_members VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (company, year) + tuple(member))
+        conn.execute("INSERT INTO portfolio_totals VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(year) DO UPDATE SET "
+                     "suppliers = suppliers + excluded.suppliers, scope1 = scope1 + excluded.scope1, "
+                     "scope2 = scope2 + excluded.scope2, scope3 = scope3 + excluded.scope3, total = total + excluded.total",
+                     [year] + delta)
+        conn.execute("INSERT INTO portfolio_intensity VALUES (?, ?, 1) ON CONFLICT(year, bucket) DO UPDATE SET suppliers = suppliers + 1",
+                     (year, intensity_bucket(member[5])))
+        conn.executemany("INSERT INTO portfolio_categories VALUES (?, ?, ?, ?)", [(company, year, c, e) for c, e in categories.items()])
+        conn.executemany("INSERT INTO portfolio_category_totals VALUES (?, ?, ?) ON CONFLICT(year, category) DO UPDATE SET "
+                         "emissions = emissions + excluded.emissions", [(year, c, e) for c, e in cat_delta.items()])
+
+    def rebuild_portfolio(self):
+        # Recompute every portfolio table from reports (backfill, or to clear float drift after many replacements)
+        conn = self._conn()
+        with conn:
+            for table in ("portfolio_members", "portfolio_totals", "portfolio_categories", "portfolio_category_totals", "portfolio_intensity"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("INSERT INTO portfolio_members SELECT company, year, id, scope1, scope2, scope3, total, intensity "
+                         "FROM reports WHERE id IN (SELECT MAX(id) FROM reports GROUP BY company, year)")
+            conn.execute("INSERT INTO portfolio_totals SELECT year, COUNT(*), SUM(scope1), SUM(scope2), SUM(scope3), SUM(total) "
+                         "FROM portfolio_members GROUP BY year")
+            conn.execute("INSERT INTO portfolio_categories SELECT m.company, m.year, r.category, SUM(r.emissions) "
+                         "FROM portfolio_members m JOIN report_rows r ON r.report_id = m.report_id GROUP BY m.company, m.year, r.category")
+            conn.execute("INSERT INTO portfolio_category_totals SELECT year, category, SUM(emissions) "
+                         "FROM portfolio_categories GROUP BY year, category")
+            hist = {}
+            for r in conn.execute("SELECT year, intensity FROM portfolio_members"):
+                k = (r["year"], intensity_bucket(r["intensity"]))
+                hist[k] = hist.get(k, 0) + 1
+            conn.executemany("INSERT INTO portfolio_intensity VALUES (?, ?, ?)", [k + (n,) for k, n in hist.items()])
+            conn.execute(f"PRAGMA user_version = {PORTFOLIO_VERSION}")
+
+    # --- LOOKUPS ---
+    def get_report(self, report_id):
+        conn = self._conn()
+        rep = conn.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone()
+        if rep is None: return None
+        rows = conn.execute("SELECT key, scope, category, quantity, unit, factor_id, factor_value, emissions "
+                            "FROM report_rows WHERE report_id = ? ORDER BY rowid", (report_id,)).fetchall()
+        out = dict(rep)
+        out["rows"] = [dict(r, scope=SCOPES[r["scope"]]) for r in rows]
+        out["evidence"] = [dict(r) for r in conn.execute(
+            "SELECT name, sha256, size FROM report_evidence WHERE report_id = ? ORDER BY rowid", (report_id,))]
+        return out
+
+    def find_reports(self, company, year=None, limit=100):
+        sql, args = "SELECT * FROM reports WHERE company = ?", [company]
+        if year is not None:
+            sql += " AND year = ?"
+            args.append(str(year))
+        sql += " ORDER BY id DESC LIMIT ?"
+        args.append(limit)
+        return [dict(r) for r in self._conn().execute(sql, args)]
+
+    def latest_report(self, company, year=None):
+        found = self.find_reports(company, year, limit=1)
+        return found[0] if found else None
+
+    def top_emitters(self, year=None, n=10):
+        if year is None:
+            cur = self._conn().execute("SELECT * FROM reports ORDER BY total DESC LIMIT ?", (n,))
+        else:
+            cur = self._conn().execute("SELECT * FROM reports WHERE year = ? ORDER BY total DESC LIMIT ?", (str(year), n))
+        return [dict(r) for r in cur]
+
+    def portfolio_totals(self, year=None, latest_only=True):
+        # Sum across suppliers; latest_only counts each company's most recent report for the year once
+        # (read from the running totals), otherwise every stored report is summed
+        where, args = "", []
+        if year is not None:
+            where, args = "WHERE year = ?", [str(year)]
+        if latest_only:
+            r = self._conn().execute(
+                f"SELECT COALESCE(SUM(suppliers), 0) AS suppliers, COALESCE(SUM(scope1), 0) AS scope1, COALESCE(SUM(scope2), 0) AS scope2, "
+                f"COALESCE(SUM(scope3), 0) AS scope3, COALESCE(SUM(total), 0) AS total FROM portfolio_totals {where}", args).fetchone()
+            return dict(r)
+        r = self._conn().execute(
+            f"SELECT COUNT(*) AS suppliers, COALESCE(SUM(scope1), 0) AS scope1, COALESCE(SUM(scope2), 0) AS scope2, "
+            f"COALESCE(SUM(scope3), 0) AS scope3, COALESCE(SUM(total), 0) AS total FROM reports {where}", args).fetchone()
+        return dict(r)
+
+    # --- PORTFOLIO QUERIES (LATEST REPORT PER COMPANY AND YEAR) ---
+    def portfolio_years(self):
+        return [r["year"] for r in self._conn().execute("SELECT year FROM portfolio_totals WHERE suppliers > 0 ORDER BY year")]
+
+    def _per_year(self, year):
+        return [str(year)] if year is not None else self.portfolio_years()
+
+    def top_suppliers(self, year=None, n=10, by="total"):
+        # Index walk per year (idx_portfolio_members_total / _intensity), merged with a heap across years
+        if by not in ("total", "intensity"): raise ValueError("by must be 'total' or 'intensity'")
+        conn, best = self._conn(), []
+        for y in self._per_year(year):
+            best.extend(dict(r) for r in conn.execute(
+                f"SELECT * FROM portfolio_members WHERE year = ? ORDER BY {by} DESC LIMIT ?", (y, n)))
+        return heapq.nlargest(n, best, key=lambda r: r[by] or 0.0)
+
+    def top_emitters_by_category(self, category, year=None, n=10):
+        conn, best = self._conn(), []
+        for y in self._per_year(year):
+            best.extend(dict(r) for r in conn.execute(
+                "SELECT company, year, category, emissions FROM portfolio_categories "
+                "WHERE year = ? AND category = ? ORDER BY emissions DESC LIMIT ?", (y, category, n)))
+        return heapq.nlargest(n, best, key=lambda r: r["emissions"])
+
+    def category_totals(self, year=None):
+        where, args = ("WHERE year = ?", [str(year)]) if year is not None else ("", [])
+        cur = self._conn().execute(f"SELECT category, SUM(emissions) AS emissions FROM portfolio_category_totals {where} "
+                                   "GROUP BY category ORDER BY emissions DESC", args)
+        return [dict(r) for r in cur]
+
+    def intensity_distribution(self, year=None):
+        # -> [{"low", "high", "suppliers"}] over INTENSITY_EDGES (high None = open-ended)
+        where, args = ("WHERE year = ?", [str(year)]) if year is not None else ("", [])
+        counts = dict(self._conn().execute(f"SELECT bucket, SUM(suppliers) FROM portfolio_intensity {where} GROUP BY bucket", args).fetchall())
+        out = []
+        for b in range(len(INTENSITY_EDGES) + 1):
+            lo, hi = bucket_bounds(b)
+            out.append({"low": lo, "high": hi, "suppliers": counts.get(b, 0)})
+        return out
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+def get_store(path=DB_PATH):
+    # Process-wide store shared by every Streamlit session
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None or _STORE.path != path:
+            _STORE = ReportStore(path)
+        return _STORE
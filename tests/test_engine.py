@@ -0,0 +1,50 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from engine import (ACTIVITY_ORDER, FACTORS, RESULT_COLUMNS, make_inputs, calculate_emissions, summarize,
+                    calculate_emissions_batch, evidence_lists)
+from translations import TRANSLATIONS
+from synthetic import synthetic_suppliers, long_activity_table
+
+def test_batch_matches_calculate_emissions_per_supplier():
+    suppliers = synthetic_suppliers(300, seed=7)
+    rows, totals = calculate_emissions_batch(long_activity_table(suppliers), FACTORS, "fr")
+    assert list(totals.index) == [s["supplier_id"] for s in suppliers]
+    for s in suppliers:
+        one = calculate_emissions(make_inputs(s["quantities"]), FACTORS, "fr")
+        batch = rows.loc[rows["supplier_id"] == s["supplier_id"], RESULT_COLUMNS].reset_index(drop=True)
+        assert len(batch) == len(one)
+        if len(one):
+            for col in RESULT_COLUMNS:
+                assert batch[col].astype(str).tolist() == one[col].astype(str).tolist(), col
+        expected = summarize(one)
+        for k in ("scope1", "scope2", "scope3", "total"):
+            assert totals.loc[s["supplier_id"], k] == pytest.approx(expected[k], rel=1e-12, abs=1e-9)
+
+def _inline_lists(input_keys, T):
+    # The PDF's original per-group checks, before evidence_lists replaced them
+    evidence, excluded = [], []
+    for keys, ev in [(["natural_gas"], "ev_gas"), (["heating_oil"], "ev_oil"), (["propane"], "ev_prop"),
+                     (["diesel"], "ev_diesel"), (["petrol"], "ev_petrol"), (["ref_R410A", "ref_R32", "ref_R134a"], "ev_hvac"),
+                     (["electricity_fr"], "ev_elec"), (["district_heat"], "ev_heat"), (["grey_fleet_avg"], "ev_travel"),
+                     (["flight_avg"], "ev_flight"), (["hotel_night_avg"], "ev_hotel")]:
+        if any(k in input_keys for k in keys): evidence.append(T[ev])
+    for key, ex in [("natural_gas", "ex_gas"), ("heating_oil", "ex_oil"), ("propane", "ex_prop"), ("diesel", "ex_diesel"),
+                    ("petrol", "ex_petrol")]:
+        if key not in input_keys: excluded.append(T[ex])
+    if not any(k in input_keys for k in ["ref_R410A", "ref_R32", "ref_R134a"]): excluded.append(T["ex_ref"])
+    for key, ex in [("electricity_fr", "ex_elec"), ("district_heat", "ex_heat"), ("grey_fleet_avg", "ex_grey"),
+                    ("flight_avg", "ex_flight"), ("hotel_night_avg", "ex_hotel")]:
+        if key not in input_keys: excluded.append(T[ex])
+    return evidence, excluded
+
+@pytest.mark.parametrize("lang", list(TRANSLATIONS))
+def test_evidence_lists_match_inline_checks_for_every_mask(lang):
+    for mask in range(1 << len(ACTIVITY_ORDER)):
+        input_keys = [k for i, k in enumerate(ACTIVITY_ORDER) if mask >> i & 1]
+        evidence, excluded = evidence_lists(mask, lang)
+        assert (list(evidence), list(excluded)) == _inline_lists(input_keys, TRANSLATIONS[lang])
@@ -0,0 +1,44 @@
+import io
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from importer import stream_activity_totals, to_number
+import pandas as pd
+
+def test_semicolon_csv_reads_decimal_commas():
+    src = io.StringIO("activité;quantité;unité\nGaz naturel;1234,5;kWh\nGazole;10,25;L\n")
+    summary = stream_activity_totals(src)
+    assert summary.totals == {"natural_gas": 1234.5, "diesel": 10.25}
+    assert summary.rows_skipped == 0
+
+def test_to_number_handles_locale_separators():
+    values = pd.Series(["1 234,5", "1.234,5", "1,234.5", "12", "n/a", None], dtype=object)
+    out = to_number(values)
+    assert out.iloc[:4].tolist() == [1234.5, 1234.5, 1234.5, 12.0]
+    assert out.iloc[4:].isna().all()
+
+def test_wide_header_unit_is_scaled():
+    src = io.StringIO("Electricity (MWh),diesel_l,Employee Vehicles (km driven)\n2.5,100,50\n1.5,?,\n")
+    summary = stream_activity_totals(src)
+    assert summary.totals == {"electricity_fr": 4000.0, "diesel": 100.0, "grey_fleet_avg": 50.0}
+    assert summary.rows_skipped == 1
+
+def test_wide_header_unknown_or_mismatched_unit_is_rejected():
+    with pytest.raises(ValueError, match="unknown unit"):
+        stream_activity_totals(io.StringIO("Electricity (therms)\n5\n"))
+    with pytest.raises(ValueError, match="does not match"):
+        stream_activity_totals(io.StringIO("Diesel (kWh)\n5\n"))
+
+def test_long_unit_of_another_dimension_is_skipped():
+    src = io.StringIO("activity,quantity,unit\nnatural_gas,100,m3\ndiesel,2,t\nelectricity,5,L\nnatural_gas,2,MWh\n")
+    summary = stream_activity_totals(src)
+    assert summary.totals == {"natural_gas": 2000.0}
+    assert summary.rows_skipped == 3
+
+def test_corrupt_xlsx_is_a_value_error():
+    src = io.BytesIO(b"not a zip file")
+    src.name = "activity.xlsx"
+    with pytest.raises(ValueError, match="xlsx"):
+        stream_activity_totals(src)
@@ -0,0 +1,131 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from engine import ACTIVITY_ORDER, ACTIVITY_META, FACTORS, SCOPES, scope_code, make_inputs
+
+# --- MONTHLY ACTIVITY SERIES ---
+# Quantities for every Step 2 activity, month by month over whole calendar years: one float64 row
+# per key (ACTIVITY_ORDER), one column per month. Emissions and per-month / per-year scope totals
+# are kept alongside, so editing one month only recomputes that month's column and its year.
+MONTHS = 12
+KEY_INDEX = {k: i for i, k in enumerate(ACTIVITY_ORDER)}
+# (3 x keys) one-hot: scope totals of a month = SCOPE_MATRIX @ emissions[:, month]
+SCOPE_MATRIX = np.zeros((len(SCOPES), len(ACTIVITY_ORDER)))
+SCOPE_MATRIX[[scope_code(ACTIVITY_META[k][1]) for k in ACTIVITY_ORDER], np.arange(len(ACTIVITY_ORDER))] = 1.0
+
+def reporting_year(year):
+    # Step 1 "Reporting Period" text -> int year (current year if it does not start with one)
+    try:
+        return int(str(year).strip()[:4])
+    except (TypeError, ValueError):
+        return date.today().year
+
+def period_labels(first_year, last_year):
+    return [f"{y}-{m:02d}" for y in range(first_year, last_year + 1) for m in range(1, MONTHS + 1)]
+
+class ActivitySeries:
+    def __init__(self, first_year, last_year=None, factors_for=None):
+        # factors_for(year) -> factor dict for that year (default: the built-in FACTORS for every year)
+        self.first_year = int(first_year)
+        self.last_year = int(last_year if last_year is not None else first_year)
+        if self.last_year < self.first_year: raise ValueError("last_year is before first_year")
+        self.years = list(range(self.first_year, self.last_year + 1))
+        shape = (len(ACTIVITY_ORDER), len(self.years) * MONTHS)
+        self.quantity = np.zeros(shape)
+        self.factor = np.zeros(shape)
+        for i, y in enumerate(self.years):
+            factors = factors_for(y) if factors_for else FACTORS
+            values = [float(factors[k].value) if k in factors else 0.0 for k in ACTIVITY_ORDER]
+            self.factor[:, i * MONTHS:(i + 1) * MONTHS] = np.array(values)[:, None]
+        self.recompute()
+
+    def covers(self, year):
+        return self.first_year <= int(year) <= self.last_year
+
+    def _period(self, year, month):
+        if not self.covers(year) or not 1 <= month <= MONTHS: raise KeyError(f"{year}-{month:02d} is outside the series")
+        return (int(year) - self.first_year) * MONTHS + int(month) - 1
+
+    def _year_cols(self, year):
+        start = (int(year) - self.first_year) * MONTHS
+        return slice(start, start + MONTHS)
+
+    # --- UPDATES ---
+    def recompute(self):
+        # Full vectorized pass (construction, bulk loads)
+        self.emissions = self.quantity * self.factor
+        self.period_scopes = SCOPE_MATRIX @ self.emissions
+        self.year_scopes = self.period_scopes.reshape(len(SCOPES), len(self.years), MONTHS).sum(axis=2)
+
+    def set(self, key, year, month, quantity):
+        # One month of one activity; returns False if nothing changed
+        k, p = KEY_INDEX[key], self._period(year, month)
+        quantity = max(float(quantity or 0.0), 0.0)
+        if self.quantity[k, p] == quantity: return False
+        self.quantity[k, p] = quantity
+        self.emissions[k, p] = quantity * self.factor[k, p]
+        self.period_scopes[:, p] = SCOPE_MATRIX @ self.emissions[:, p]
+        y = p // MONTHS
+        self.year_scopes[:, y] = self.period_scopes[:, y * MONTHS:(y + 1) * MONTHS].sum(axis=1)
+        return True
+
+    def set_year(self, year, grid):
+        # grid: (keys x 12) quantities for one year, e.g. the Step 2 editor. Only months with a
+        # changed cell are recomputed; returns the number of changed cells.
+        cols = self._year_cols(year)
+        grid = np.maximum(np.nan_to_num(np.asarray(grid, dtype=float)), 0.0)
+        changed = grid != self.quantity[:, cols]
+        if not changed.any(): return 0
+        months = np.flatnonzero(changed.any(axis=0)) + cols.start
+        self.quantity[:, cols] = grid
+        self.emissions[:, months] = self.quantity[:, months] * self.factor[:, months]
+        self.period_scopes[:, months] = SCOPE_MATRIX @ self.emissions[:, months]
+        y = cols.start // MONTHS
+        self.year_scopes[:, y] = self.period_scopes[:, cols].sum(axis=1)
+        return int(changed.sum())
+
+    @classmethod
+    def from_frame(cls, frame, key_column="key", period_column="period", quantity_column="quantity", factors_for=None):
+        # Long table (key, period, quantity) -> series spanning the years present; periods are
+        # anything pandas parses as a date ("2024-03", "2024-03-31", ...). Unknown keys are ignored.
+        periods = pd.to_datetime(frame[period_column])
+        keys = frame[key_column].map(KEY_INDEX)
+        ok = keys.notna() & periods.notna()
+        years, months = periods[ok].dt.year.to_numpy(), periods[ok].dt.month.to_numpy()
+        series = cls(int(years.min()), int(years.max()), factors_for) if ok.any() else cls(date.today().year, factors_for=factors_for)
+        if ok.any():
+            cols = (years - series.first_year) * MONTHS + months - 1
+            qty = pd.to_numeric(frame.loc[ok, quantity_column], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+            np.add.at(series.quantity, (keys[ok].to_numpy(dtype=int), cols), qty)
+            np.maximum(series.quantity, 0.0, out=series.quantity)
+            series.recompute()
+        return series
+
+    # --- VIEWS ---
+    def year_grid(self, year):
+        # (keys x 12) view of one year's quantities
+        return self.quantity[:, self._year_cols(year)]
+
+    def has_data(self):
+        return bool(self.quantity.any())
+
+    def annual_quantities(self, year):
+        return dict(zip(ACTIVITY_ORDER, self.year_grid(year).sum(axis=1).tolist()))
+
+    def to_inputs(self, year):
+        # Annual ActivityInputs for calculate_emissions / the report
+        return make_inputs(self.annual_quantities(year))
+
+    def monthly_totals(self, year=None):
+        cols = self._year_cols(year) if year is not None else slice(None)
+        labels = period_labels(self.first_year, self.last_year)[cols]
+        out = pd.DataFrame(self.period_scopes[:, cols].T, index=pd.Index(labels, name="period"),
+                           columns=["scope1", "scope2", "scope3"])
+        out["total"] = out.sum(axis=1)
+        return out
+
+    def annual_totals(self):
+        out = pd.DataFrame(self.year_scopes.T, index=pd.Index(self.years, name="year"), columns=["scope1", "scope2", "scope3"])
+        out["total"] = out.sum(axis=1)
+        out["yoy_pct"] = out["total"].pct_change() * 100
+        return out
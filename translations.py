@@ -0,0 +1,371 @@
+from types import MappingProxyType
+
+# --- TRANSLATION ENGINE ---
+TRANSLATIONS = {
+    "en": {
+        "title": "🏢 Supplier ESG Enterprise OS",
+        "caption": "Aligned with GHG Protocol (Scope 1, 2 & Business Travel)",
+        "sidebar_lang": "Language / Langue",
+        "step1_header": "Step 1: Company Profile",
+        "company_label": "Company Legal Name",
+        "country_label": "Site Country",
+        "country_default": "France",
+        "year_label": "Reporting Period",
+        "revenue_label": "Annual Revenue",
+        "currency_label": "Currency",
+        "btn_start": "Start Assessment",
+        "err_company": "Company Name and Revenue are required.",
+        
+        "step2_header": "Step 2: Activity Data",
+        "import_label": "Import Activity Data (CSV / Excel, optional)",
+        "import_done": "{rows} rows imported ({skipped} skipped). Values pre-filled below.",
+        "import_error": "The file could not be imported: {error}",
+        "s1_header": "🔥 Scope 1: Direct Emissions",
+        "s1_stat": "**Stationary Combustion**",
+        "gas_label": "Natural Gas (kWh)",
+        "oil_label": "Heating Oil (Liters)",
+        "propane_label": "Propane (kg)",
+        "s1_mobile": "**Mobile Combustion (Company Fleet)**",
+        "diesel_label": "Fleet Diesel (Liters)",
+        "petrol_label": "Fleet Petrol (Liters)",
+        "s1_fugitive": "**Fugitive Emissions (Refrigerants)**",
+        "r410a_label": "R410A Refill (kg)",
+        "r32_label": "R32 Refill (kg)",
+        "r134a_label": "R134a Refill (kg)",
+        "s2_header": "⚡ Scope 2: Indirect Energy",
+        "elec_label": "Electricity (kWh)",
+        "heat_label": "District Heating (kWh)",
+        
+        "s3_header": "✈️ Scope 3: Business Travel",
+        "s3_desc": "Business travel not covered in Scope 1 (Grey Fleet, Flights, Hotels).",
+        "grey_label": "Employee Vehicles (km driven)",
+        "flight_label": "Business Flights (km flown)",
+        "hotel_label": "Hotel Nights (number of nights)",
+        
+        "upload_label": "Upload Evidence",
+        "signer_label": "Full Legal Name of Authorized Signer (e.g. Jean Dupont)",
+        "btn_gen": "Generate Report",
+        "err_signer": "Please enter a valid full name for the attestation signature.",
+        
+        "step3_header": "Step 3: Validated",
+        "total_footprint": "Total Footprint",
+        "btn_download": "Download Corporate Carbon Pack (PDF)",
+        "btn_new": "New Assessment",
+        
+        # PDF Content
+        "pdf_title": "CORPORATE CARBON FOOTPRINT DECLARATION",
+        "pdf_method": "Methodology Aligned with GHG Protocol & ISO 14064-1",
+        "pdf_date": "Date:",
+        "pdf_company": "Company Name:",
+        "pdf_country": "Site Country:",
+        "pdf_period": "Reporting Period:",
+        "pdf_revenue": "Annual Revenue:",
+        "pdf_boundary_title": "BOUNDARY STATEMENT:",
+        "pdf_boundary_text": """
+        This report covers <b>Scope 1</b> (Direct), <b>Scope 2</b> (Energy Indirect), and selected <b>Scope 3</b> 
+        (Business Travel/Grey Fleet). Excludes upstream/downstream Scope 3 categories unless noted.
+        Calculations use <b>ADEME Base Carbone</b> emission factors.
+        """,
+        "pdf_summary_title": "EMISSIONS SUMMARY",
+        "pdf_col_metric": "METRIC",
+        "pdf_col_value": "VALUE",
+        "pdf_s1": "Scope 1 (Direct Emissions)",
+        "pdf_s2": "Scope 2 (Indirect Energy)",
+        "pdf_s3": "Scope 3 (Business Travel)",
+        "pdf_total": "TOTAL FOOTPRINT",
+        "pdf_intensity": "CARBON INTENSITY",
+        "pdf_detail_title": "Detailed Breakdown:",
+        "pdf_tab_scope": "Scope",
+        "pdf_tab_act": "Activity",
+        "pdf_tab_qty": "Qty",
+        "pdf_tab_emi": "Emissions (kg)",
+        "pdf_site": "Site:",
+        "pdf_sites": "Sites:",
+        
+        "pdf_evidence_title": "Evidence & Assurance:",
+        "pdf_assurance_level": "<b>Assurance Level:</b> Limited (self-attested, document trail available)",
+        "pdf_doc_retained": "<b>Supporting documentation retained by supplier:</b>",
+        "pdf_no_mat": "No material emissions reported.",
+        "pdf_avail": "Available upon buyer request",
+        "pdf_attached": "digital files attached",
+        "pdf_no_files": "No digital files attached",
+        "pdf_evidence_hashes": "Attached files (SHA-256):",
+        
+        "pdf_attest_title": "ATTESTATION:",
+        "pdf_attest_text": "I, <b>{signer}</b>, certify that the activity data and revenue provided are accurate to the best of my knowledge.",
+        "pdf_sig": "Authorized Signature",
+        
+        # DISCLAIMER POINTS
+        "pdf_disc_title": "DISCLAIMER & LIMITATIONS:",
+        "disc_p1": "<b>Methodology:</b> Calculations use supplier-provided activity data and ADEME Base Carbone v23.0 emission factors.",
+        "disc_p2": "<b>Assurance:</b> This report is self-declared and has not been independently verified.",
+        "disc_p3_intro": "<b>Boundary Exclusions:</b> The following sources were assessed but excluded due to zero reported activity:",
+        "disc_p3_none": "<b>Boundary Exclusions:</b> None (All standard boundary categories were reported).",
+        "disc_p4": "<b>Liability:</b> Buyers must conduct due diligence for CSRD reporting compliance.",
+        "disc_p5": "<b>Verification:</b> For third-party verification inquiries, contact <b>verify@vsme.io</b>",
+        
+        "footer_l1": "Generated by VSME Supplier ESG OS",
+        "footer_l2": "Aligned with GHG Protocol & ISO 14064-1 quantification methodologies.",
+        "footer_l3": "Supports CSRD ESRS E1 quantitative reporting requirements.",
+        "footer_l4": "Emission Factors: ADEME Base Carbone v23.0 (France)",
+        
+        # Evidence Labels
+        "ev_gas": "Natural Gas Invoices",
+        "ev_oil": "Heating Oil Purchase Receipts",
+        "ev_prop": "Propane Purchase Receipts",
+        "ev_diesel": "Fuel Logs/Receipts (Diesel)",
+        "ev_petrol": "Fuel Logs/Receipts (Petrol)",
+        "ev_hvac": "HVAC Maintenance Log (Refrigerants)",
+        "ev_elec": "Electricity Utility Invoices",
+        "ev_heat": "District Heating Invoices",
+        "ev_travel": "Mileage Claims / Travel Logs",
+        "ev_flight": "Flight Tickets / Travel Agency Reports",
+        "ev_hotel": "Hotel Invoices / Expense Reports",
+        
+        # Exclusions Labels
+        "ex_gas": "Natural Gas",
+        "ex_oil": "Heating Oil",
+        "ex_prop": "Propane",
+        "ex_diesel": "Fleet Diesel",
+        "ex_petrol": "Fleet Petrol",
+        "ex_ref": "Fugitive Emissions (Refrigerants)",
+        "ex_elec": "Electricity",
+        "ex_heat": "District Heating",
+        "ex_grey": "Employee Vehicles",
+        "ex_flight": "Business Flights",
+        "ex_hotel": "Hotel Nights",
+
+        "dash_title": "📊 Supplier Portfolio",
+        "dash_caption": "Latest assessment per supplier and reporting period",
+        "dash_year": "Reporting Period",
+        "dash_all_years": "All periods",
+        "dash_suppliers": "Suppliers",
+        "dash_empty": "No assessments stored yet.",
+        "dash_intensity": "Carbon intensity distribution (kgCO2e / revenue unit)",
+        "dash_top": "Top emitters",
+        "dash_top_by": "Rank by",
+        "dash_by_total": "Total emissions",
+        "dash_by_intensity": "Carbon intensity",
+        "dash_categories": "Emissions by category",
+        "dash_category": "Category",
+        "dash_top_category": "Top emitters in category",
+
+        "ci_caption": "95% range: {low} – {high}",
+        "pdf_col_ci": "95% Range",
+        "pdf_ci_note": "95% ranges from a Monte Carlo simulation of the ADEME emission factor uncertainties.",
+
+        "whatif_header": "🔧 What-if Scenarios",
+        "whatif_keys": "Activities to reduce (0 to -50%)",
+        "whatif_ref": "Include switching refrigerants to R32",
+        "whatif_result": "{n:,} scenarios evaluated. Largest reductions:",
+        "whatif_delta": "Change (kgCO2e)",
+        "whatif_pct": "Change (%)",
+
+        "monthly_header": "📅 Monthly Data (optional)",
+        "monthly_year": "Year",
+        "monthly_caption": "Enter quantities month by month; annual totals below are filled from this table.",
+        "monthly_yoy": "{year}: {total} kgCO2e ({change} vs previous year)",
+
+        "sites_label": "Multi-site Activity Data (CSV / Excel, one row per site with its country, optional)",
+        "sites_done": "{n} sites loaded. Site figures replace the fields above.",
+        "sites_error": "The site table could not be read: {error}",
+        "sites_header": "🏭 Results by Site ({n})"
+    },
+    
+    "fr": {
+        "title": "🏢 VSME Enterprise OS (RSE Fournisseur)",
+        "caption": "Aligné avec le GHG Protocol (Scope 1, 2 & Déplacements Pro)",
+        "sidebar_lang": "Langue / Language",
+        "step1_header": "Étape 1 : Profil de l'Entreprise",
+        "company_label": "Raison Sociale",
+        "country_label": "Pays du Site",
+        "country_default": "France",
+        "year_label": "Période de Reporting",
+        "revenue_label": "Chiffre d'Affaires Annuel",
+        "currency_label": "Devise",
+        "btn_start": "Commencer l'évaluation",
+        "err_company": "Le nom de l'entreprise et le CA sont requis.",
+        
+        "step2_header": "Étape 2 : Données d'Activité",
+        "import_label": "Importer les Données d'Activité (CSV / Excel, optionnel)",
+        "import_done": "{rows} lignes importées ({skipped} ignorées). Valeurs pré-remplies ci-dessous.",
+        "import_error": "Le fichier n'a pas pu être importé : {error}",
+        "s1_header": "🔥 Scope 1 : Émissions Directes",
+        "s1_stat": "**Combustion Stationnaire**",
+        "gas_label": "Gaz Naturel (kWh)",
+        "oil_label": "Fioul Domestique (Litres)",
+        "propane_label": "Propane (kg)",
+        "s1_mobile": "**Combustion Mobile (Flotte Entreprise)**",
+        "diesel_label": "Diesel Flotte (Litres)",
+        "petrol_label": "Essence Flotte (Litres)",
+        "s1_fugitive": "**Émissions Fugitives (Frigorifiques)**",
+        "r410a_label": "Recharge R410A (kg)",
+        "r32_label": "Recharge R32 (kg)",
+        "r134a_label": "Recharge R134a (kg)",
+        "s2_header": "⚡ Scope 2 : Énergie Indirecte",
+        "elec_label": "Électricité (kWh)",
+        "heat_label": "Chauffage Urbain (kWh)",
+        
+        "s3_header": "✈️ Scope 3 : Déplacements Pro",
+        "s3_desc": "Déplacements non inclus dans le Scope 1 (Véhicules Perso, Vols, Hôtels).",
+        "grey_label": "Véhicules Salariés (km parcourus)",
+        "flight_label": "Vols Affaires (km parcourus)",
+        "hotel_label": "Nuitées d'Hôtel (nombre de nuits)",
+        
+        "upload_label": "Télécharger Justificatifs",
+        "signer_label": "Nom complet du signataire autorisé (ex: Jean Dupont)",
+        "btn_gen": "Générer le Rapport",
+        "err_signer": "Veuillez entrer un nom valide pour la signature.",
+        
+        "step3_header": "Étape 3 : Validation",
+        "total_footprint": "Empreinte Totale",
+        "btn_download": "Télécharger le Pack Carbone (PDF)",
+        "btn_new": "Nouvelle Évaluation",
+        
+        # PDF Content
+        "pdf_title": "DÉCLARATION D'EMPREINTE CARBONE",
+        "pdf_method": "Méthodologie alignée avec GHG Protocol & ISO 14064-1",
+        "pdf_date": "Date :",
+        "pdf_company": "Entreprise :",
+        "pdf_country": "Pays du Site :",
+        "pdf_period": "Période :",
+        "pdf_revenue": "Chiffre d'Affaires :",
+        "pdf_boundary_title": "DÉCLARATION DE PÉRIMÈTRE :",
+        "pdf_boundary_text": """
+        Ce rapport couvre le <b>Scope 1</b> (Direct), le <b>Scope 2</b> (Énergie Indirecte), et le <b>Scope 3</b> 
+        sélectionné (Déplacements Pro : Véhicules/Vols/Hôtels). Exclut les autres catégories Scope 3.
+        Calculs basés sur les facteurs d'émission <b>ADEME Base Carbone</b>.
+        """,
+        "pdf_summary_title": "RÉSUMÉ DES ÉMISSIONS",
+        "pdf_col_metric": "MÉTRIQUE",
+        "pdf_col_value": "VALEUR",
+        "pdf_s1": "Scope 1 (Émissions Directes)",
+        "pdf_s2": "Scope 2 (Énergie Indirecte)",
+        "pdf_s3": "Scope 3 (Déplacements Pro)",
+        "pdf_total": "EMPREINTE TOTALE",
+        "pdf_intensity": "INTENSITÉ CARBONE",
+        "pdf_detail_title": "Détail des Calculs :",
+        "pdf_tab_scope": "Scope",
+        "pdf_tab_act": "Activité",
+        "pdf_tab_qty": "Qté",
+        "pdf_tab_emi": "Émissions (kg)",
+        "pdf_site": "Site :",
+        "pdf_sites": "Sites :",
+        
+        "pdf_evidence_title": "Preuves & Assurance :",
+        "pdf_assurance_level": "<b>Niveau d'Assurance :</b> Limité (auto-déclaratif, traçabilité documentaire disponible)",
+        "pdf_doc_retained": "<b>Documentation justificative conservée par le fournisseur :</b>",
+        "pdf_no_mat": "Aucune émission significative déclarée.",
+        "pdf_avail": "Disponible sur demande de l'acheteur",
+        "pdf_attached": "fichiers joints",
+        "pdf_no_files": "Aucun fichier numérique joint",
+        "pdf_evidence_hashes": "Fichiers joints (SHA-256) :",
+        
+        "pdf_attest_title": "ATTESTATION SUR L'HONNEUR :",
+        "pdf_attest_text": "Je soussigné(e), <b>{signer}</b>, certifie que les données d'activité et le CA fournis sont exacts et sincères.",
+        "pdf_sig": "Signature Autorisée",
+        
+        # DISCLAIMER POINTS
+        "pdf_disc_title": "AVERTISSEMENT & LIMITATIONS :",
+        "disc_p1": "<b>Méthodologie :</b> Les calculs utilisent les données d'activité fournies par le fournisseur et les facteurs ADEME Base Carbone v23.0.",
+        "disc_p2": "<b>Assurance :</b> Ce rapport est auto-déclaratif et n'a pas fait l'objet d'une vérification indépendante.",
+        "disc_p3_intro": "<b>Exclusions :</b> Les sources suivantes ont été évaluées mais exclues en raison d'une activité nulle déclarée :",
+        "disc_p3_none": "<b>Exclusions :</b> Aucune (Toutes les catégories standard ont été déclarées).",
+        "disc_p4": "<b>Responsabilité :</b> Les acheteurs doivent effectuer leurs propres vérifications pour la conformité CSRD.",
+        "disc_p5": "<b>Vérification :</b> Pour toute demande de vérification tierce, contacter <b>verify@vsme.io</b>",
+        
+        "footer_l1": "Généré par VSME Supplier ESG OS",
+        "footer_l2": "Aligné avec les méthodologies de quantification GHG Protocol & ISO 14064-1.",
+        "footer_l3": "Supporte les exigences de reporting quantitatif CSRD ESRS E1.",
+        "footer_l4": "Facteurs d'Émission : ADEME Base Carbone v23.0 (France)",
+        
+        # Evidence Labels
+        "ev_gas": "Factures de Gaz Naturel",
+        "ev_oil": "Factures d'achat Fioul",
+        "ev_prop": "Factures d'achat Propane",
+        "ev_diesel": "Relevés/Factures Carburant (Diesel)",
+        "ev_petrol": "Relevés/Factures Carburant (Essence)",
+        "ev_hvac": "Carnet d'entretien CVC (Fluides Frigorigènes)",
+        "ev_elec": "Factures d'Électricité",
+        "ev_heat": "Factures Chauffage Urbain",
+        "ev_travel": "Notes de Frais / Relevés Kilométriques",
+        "ev_flight": "Billets d'Avion / Relevés Agence",
+        "ev_hotel": "Factures d'Hôtel / Notes de Frais",
+        
+        # Exclusions Labels
+        "ex_gas": "Gaz Naturel",
+        "ex_oil": "Fioul Domestique",
+        "ex_prop": "Propane",
+        "ex_diesel": "Diesel Flotte",
+        "ex_petrol": "Essence Flotte",
+        "ex_ref": "Émissions Fugitives (Refrigérants)",
+        "ex_elec": "Électricité",
+        "ex_heat": "Chauffage Urbain",
+        "ex_grey": "Véhicules Salariés",
+        "ex_flight": "Vols Affaires",
+        "ex_hotel": "Nuitées d'Hôtel",
+
+        "dash_title": "📊 Portefeuille Fournisseurs",
+        "dash_caption": "Dernière évaluation par fournisseur et période",
+        "dash_year": "Période de Reporting",
+        "dash_all_years": "Toutes les périodes",
+        "dash_suppliers": "Fournisseurs",
+        "dash_empty": "Aucune évaluation enregistrée.",
+        "dash_intensity": "Distribution de l'intensité carbone (kgCO2e / unité de CA)",
+        "dash_top": "Principaux émetteurs",
+        "dash_top_by": "Classer par",
+        "dash_by_total": "Émissions totales",
+        "dash_by_intensity": "Intensité carbone",
+        "dash_categories": "Émissions par catégorie",
+        "dash_category": "Catégorie",
+        "dash_top_category": "Principaux émetteurs de la catégorie",
+
+        "ci_caption": "Intervalle 95 % : {low} – {high}",
+        "pdf_col_ci": "Intervalle 95 %",
+        "pdf_ci_note": "Intervalles à 95 % issus d'une simulation Monte Carlo des incertitudes des facteurs ADEME.",
+
+        "whatif_header": "🔧 Scénarios de Réduction",
+        "whatif_keys": "Activités à réduire (0 à -50 %)",
+        "whatif_ref": "Inclure le passage des fluides frigorigènes au R32",
+        "whatif_result": "{n:,} scénarios évalués. Meilleures réductions :",
+        "whatif_delta": "Variation (kgCO2e)",
+        "whatif_pct": "Variation (%)",
+
+        "monthly_header": "📅 Données Mensuelles (optionnel)",
+        "monthly_year": "Année",
+        "monthly_caption": "Saisissez les quantités mois par mois ; les totaux annuels ci-dessous sont remplis à partir de ce tableau.",
+        "monthly_yoy": "{year} : {total} kgCO2e ({change} par rapport à l'année précédente)",
+
+        "sites_label": "Données d'Activité Multi-sites (CSV / Excel, une ligne par site avec son pays, optionnel)",
+        "sites_done": "{n} sites chargés. Les données par site remplacent les champs ci-dessus.",
+        "sites_error": "Le tableau des sites n'a pas pu être lu : {error}",
+        "sites_header": "🏭 Résultats par Site ({n})"
+    }
+}
+
+# --- COMPILED CATALOG (BUILT ONCE PER PROCESS) ---
+# The tables above are frozen into read-only mappings and every per-row label of the report is
+# resolved here, per language, at import time. Render paths only do dict lookups, so adding a
+# language adds one entry to each table and nothing to the hot path.
+LANGUAGE_NAMES = {"fr": "Français", "en": "English"}
+
+# Step 2 activity key -> translation key of its form label
+ACTIVITY_LABEL_KEYS = {
+    "natural_gas": "gas_label", "heating_oil": "oil_label", "propane": "propane_label",
+    "diesel": "diesel_label", "petrol": "petrol_label",
+    "ref_R410A": "r410a_label", "ref_R32": "r32_label", "ref_R134a": "r134a_label",
+    "electricity_fr": "elec_label", "district_heat": "heat_label",
+    "grey_fleet_avg": "grey_label", "flight_avg": "flight_label", "hotel_night_avg": "hotel_label"
+}
+
+def display_label(form_label):
+    # "Natural Gas (kWh)" -> "Natural Gas" (report tables show the unit in their own column)
+    return form_label.split("(")[0].strip()
+
+TRANSLATIONS = MappingProxyType({lang: MappingProxyType(strings) for lang, strings in TRANSLATIONS.items()})
+
+# lang -> {activity key: display label}
+ACTIVITY_LABELS = MappingProxyType({
+    lang: MappingProxyType({k: display_label(T.get(t_key, k)) for k, t_key in ACTIVITY_LABEL_KEYS.items()})
+    for lang, T in TRANSLATIONS.items()
+})